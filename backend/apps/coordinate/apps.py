@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CoordinateConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.coordinate"
+
+    def ready(self):
+        # アイテム画像のサムネイル・コーディネートのアイテムレイヤーの削除、登録時に必要なデータのキャッシュの無効化
+        from . import signals  # noqa: F401
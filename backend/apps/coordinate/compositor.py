@@ -0,0 +1,90 @@
+"""
+アイテム画像の合成処理
+PIL（Image.alpha_composite）と NumPy（アルファ乗算済みの配列への合成）の2つの実装を切り替えて使用できる
+（settings.COORDINATE_COMPOSITOR で指定。scripts/coordinate/benchmark_compositor.py で比較）
+"""
+
+import numpy as np
+from django.conf import settings
+from PIL import Image
+
+from .constants import COMPOSITOR
+
+COMPOSITOR_PIL = "pil"
+COMPOSITOR_NUMPY = "numpy"
+
+
+def _visible_box(size, image, x, y):
+    """キャンバスと重なる範囲（キャンバスの座標）。重ならない場合は None"""
+    left, top = max(x, 0), max(y, 0)
+    right, bottom = min(x + image.width, size[0]), min(y + image.height, size[1])
+    if left >= right or top >= bottom:
+        return None
+    return left, top, right, bottom
+
+
+def composite_pil(size, placements):
+    """
+    透明なキャンバスにアイテム画像を順に重ねる（PIL）
+    placements: (RGBA画像, 左上のx座標, 左上のy座標) のリスト（奥のアイテムから順）
+    """
+    layer = Image.new("RGBA", size, (0, 0, 0, 0))
+    for image, x, y in placements:
+        if _visible_box(size, image, x, y) is None:
+            continue
+        # キャンバスからはみ出す部分は切り取る
+        layer.alpha_composite(image, dest=(max(x, 0), max(y, 0)), source=(max(-x, 0), max(-y, 0)))
+    return layer
+
+
+def composite_numpy(size, placements):
+    """
+    透明なキャンバスにアイテム画像を順に重ねる（NumPy）
+    事前に確保したアルファ乗算済みの配列に整数演算で合成し、最後に1回だけ RGBA 画像に変換する
+    """
+    width, height = size
+    # アルファ乗算済みの画素値はアルファ値以下（0〜255）のため、乗算の途中結果も uint16 に収まる
+    canvas = np.zeros((height, width, 4), dtype=np.uint16)
+    scratch = np.empty_like(canvas)
+
+    for image, x, y in placements:
+        # 透明な余白（回転後の四隅など）は合成しない
+        bbox = image.getchannel("A").getbbox()
+        if bbox is None:
+            continue
+        image = image.crop(bbox)
+        x, y = x + bbox[0], y + bbox[1]
+
+        box = _visible_box(size, image, x, y)
+        if box is None:
+            continue
+        left, top, right, bottom = box
+
+        # アルファ乗算済みの画素値に変換（"RGBa" への変換は PIL の整数演算で行う）
+        source = np.asarray(image.convert("RGBa"))[top - y : bottom - y, left - x : right - x]
+        target = canvas[top:bottom, left:right]
+        # 乗算済みのため全チャンネルで同じ式になる: out = src + dst * (255 - src_alpha) / 255
+        np.multiply(target, 255 - source[..., 3:4].astype(np.uint16), out=target)
+        _divide_by_255(target, scratch[: bottom - top, : right - left])
+        target += source
+
+    return Image.fromarray(canvas.astype(np.uint8), "RGBa").convert("RGBA")
+
+
+def _divide_by_255(values, scratch):
+    """0〜255*255 の整数を 255 で割って四捨五入（除算を使わない PIL と同じ計算、インプレース）"""
+    values += 128
+    np.right_shift(values, 8, out=scratch)
+    values += scratch
+    values >>= 8
+
+
+COMPOSITORS = {
+    COMPOSITOR_PIL: composite_pil,
+    COMPOSITOR_NUMPY: composite_numpy,
+}
+
+
+def get_compositor(name=None):
+    """合成処理の実装を取得（指定がない場合は settings.COORDINATE_COMPOSITOR）"""
+    return COMPOSITORS[name or getattr(settings, "COORDINATE_COMPOSITOR", COMPOSITOR)]
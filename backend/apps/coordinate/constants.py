@@ -3,6 +3,38 @@ REFERENCE_HEIGHT = int(REFERENCE_WIDTH * 1.25)
 REFERENCE_ITEM_SIZE = 160
 Y_OFFSET = 30  # 下方向への調整値を追加（若干のずれを修正するため）
 
+# アイテム画像の取得
+IMAGE_FETCH_TIMEOUT = (3.05, 10)  # (接続, 読み込み) のタイムアウト（秒）
+IMAGE_FETCH_RETRIES = 2  # 接続エラー・5xx の場合の再試行回数
+IMAGE_FETCH_MAX_WORKERS = 10  # 同時に取得する画像の最大数（コーディネートのアイテム数の上限）
+# コーディネート画像のWebP圧縮
+WEBP_QUALITIES = list(range(5, 100, 5))  # 選択可能な品質（5〜95、5刻み）
+MAX_COORDINATE_IMAGE_KB = 100  # 圧縮後の最大サイズ（KB）
+# 配置調整中のプレビュー画像
+PREVIEW_SCALE = 0.5  # 基準サイズに対する縮小率（300x375）
+PREVIEW_WEBP_QUALITY = 60  # 固定の品質（サイズに応じた品質の探索は行わない）
+PREVIEW_FORMATS = {"webp": "image/webp", "png": "image/png"}
+MAX_ITEM_SCALE = 5  # アイテムの拡大率の上限（画面上の調整は 0.5〜2.0）
+
+# コーディネート画像の生成モード（settings.COORDINATE_RENDER_MODE で指定）
+RENDER_MODE_SYNC = "sync"  # リクエスト内で画像を生成してから保存
+RENDER_MODE_DEFERRED = "deferred"  # 先に保存し、画像はバックグラウンドで生成
+RENDER_WORKERS = 2  # バックグラウンドで画像を生成するスレッド数（settings.COORDINATE_RENDER_WORKERS で上書き可能）
+# 生成中・生成失敗のまま放置されたとみなすまでの時間（分。manage.py recover_coordinate_renders の既定値）
+RENDER_RECOVERY_AGE_MINUTES = 10
+
+# コーディネート画像の生成状態
+RENDER_STATUS_READY = "ready"
+RENDER_STATUS_RENDERING = "rendering"
+RENDER_STATUS_FAILED = "failed"
+
+# 正規化済みのアイテム画像（サムネイル）の保存先（settings.COORDINATE_THUMBNAIL_CACHE_DIR で上書き可能）
+THUMBNAIL_CACHE_DIR = "/tmp/virtual_closet/item_thumbnails"
+# コーディネートごとのアイテムレイヤー（背景色を除いた合成結果）の保存先（settings.COORDINATE_LAYER_CACHE_DIR で上書き可能）
+LAYER_CACHE_DIR = "/tmp/virtual_closet/coordinate_layers"
+COMPOSITOR = "pil"  # アイテム画像の合成処理の実装（pil / numpy。settings.COORDINATE_COMPOSITOR で上書き可能）
+TRANSFORMED_ITEM_CACHE_SIZE = 32  # プロセス内に保持するスケーリング・回転済みのアイテム画像の数
+
 TAILWIND_COLORS = {
     "bg-white": "white",
     "bg-slate-100": "#f1f5f9",
@@ -0,0 +1,82 @@
+"""
+コーディネート画像の生成に使用するアイテム画像の取得
+すべてのアイテム画像を並列に取得し、接続はセッションで使い回す
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import requests
+from django.conf import settings
+from PIL import Image
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .constants import IMAGE_FETCH_MAX_WORKERS, IMAGE_FETCH_RETRIES, IMAGE_FETCH_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_http_session():
+    """プロセス内で共有するHTTPセッションを取得（Keep-Aliveで接続を再利用）"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=IMAGE_FETCH_RETRIES,
+                backoff_factor=0.2,
+                status_forcelist=[500, 502, 503, 504],
+                allowed_methods=["GET"],
+            )
+            # 並列に取得する数だけ接続を保持する
+            adapter = HTTPAdapter(pool_maxsize=IMAGE_FETCH_MAX_WORKERS, max_retries=retry)
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def load_item_image(item):
+    """アイテム画像を取得してデコード"""
+    if settings.DEBUG:
+        image = Image.open(item.image.path)
+    else:
+        response = get_http_session().get(item.image.url, timeout=IMAGE_FETCH_TIMEOUT)
+        response.raise_for_status()
+        image = Image.open(BytesIO(response.content))
+
+    # デコードも取得と同じスレッドで行う
+    image.load()
+    return image
+
+
+def _load_and_transform(item, transform):
+    item_image = load_item_image(item)
+    return transform(item, item_image) if transform else item_image
+
+
+def fetch_item_images(items, transform=None):
+    """
+    アイテム画像をまとめて取得
+    items: キーとアイテムの辞書。同じキーで画像の辞書を返す（取得できなかったアイテムは含まない）
+    transform: 取得と同じスレッドで画像に適用する処理（引数はアイテムと画像）
+    """
+    if not items:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=min(IMAGE_FETCH_MAX_WORKERS, len(items))) as executor:
+        futures = {key: executor.submit(_load_and_transform, item, transform) for key, item in items.items()}
+
+    images = {}
+    for key, future in futures.items():
+        try:
+            images[key] = future.result()
+        except Exception as e:
+            logger.warning(f"Failed to fetch item image (item={key}): {e}")
+    return images
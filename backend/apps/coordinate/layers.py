@@ -0,0 +1,82 @@
+"""
+コーディネートごとのアイテムレイヤー
+背景色を除いたアイテムの合成結果（透過PNG）をローカルディスクに保存し、
+背景色のみの変更では保存済みのレイヤーを背景色に重ねるだけで画像を生成する
+"""
+
+import hashlib
+import json
+import logging
+import os
+
+from django.conf import settings
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+from .constants import LAYER_CACHE_DIR, REFERENCE_HEIGHT, REFERENCE_ITEM_SIZE, REFERENCE_WIDTH, Y_OFFSET
+from .serializers import to_item_pk
+from .thumbnails import image_version, write_png
+
+logger = logging.getLogger(__name__)
+
+# レイアウトのダイジェストを保存するPNGのテキストチャンクのキー
+LAYOUT_KEY = "layout"
+
+
+def layout_digest(items_data, fashion_items):
+    """
+    アイテムの画像・配置からレイヤーの内容を識別するダイジェストを算出
+    （合成されないアイテムは含めない。同じファイル名で画像が差し替えられた場合・基準サイズが変わった場合も別の内容として扱う）
+    """
+    layout = []
+    for item_data in sorted(items_data, key=lambda x: x["position_data"]["zIndex"]):
+        item = fashion_items.get(to_item_pk(item_data["item"]))
+        if item is None or not item.image:
+            continue
+        position_data = item_data["position_data"]
+        layout.append(
+            [
+                image_version(item),
+                position_data["xPercent"],
+                position_data["yPercent"],
+                position_data["scale"],
+                position_data.get("rotate", 0),
+            ]
+        )
+    payload = json.dumps([REFERENCE_WIDTH, REFERENCE_HEIGHT, REFERENCE_ITEM_SIZE, Y_OFFSET, layout])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _layer_path(coordinate_id):
+    cache_dir = getattr(settings, "COORDINATE_LAYER_CACHE_DIR", LAYER_CACHE_DIR)
+    return os.path.join(cache_dir, f"{coordinate_id}.png")
+
+
+def load_layer(coordinate_id, digest):
+    """保存済みのレイヤーを読み込む（ない場合・アイテムの配置が変わった場合はNone）"""
+    try:
+        layer = Image.open(_layer_path(coordinate_id))
+        if layer.text.get(LAYOUT_KEY) != digest:
+            return None
+        layer.load()
+    except (FileNotFoundError, OSError):
+        return None
+    return layer
+
+
+def save_layer(coordinate_id, digest, layer):
+    """レイヤーをアイテムの配置のダイジェストと共に保存（保存できなくても合成は続ける）"""
+    info = PngInfo()
+    info.add_text(LAYOUT_KEY, digest)
+    try:
+        write_png(_layer_path(coordinate_id), layer, pnginfo=info)
+    except OSError as e:
+        logger.warning(f"Failed to save coordinate layer (coordinate={coordinate_id}): {e}")
+
+
+def delete_layer(coordinate_id):
+    """レイヤーを削除（コーディネートの削除時）"""
+    try:
+        os.remove(_layer_path(coordinate_id))
+    except FileNotFoundError:
+        pass
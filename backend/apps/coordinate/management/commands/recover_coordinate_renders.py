@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.coordinate.constants import RENDER_RECOVERY_AGE_MINUTES
+from apps.coordinate.render_jobs import recover_renders
+
+
+class Command(BaseCommand):
+    help = "Re-render custom coordinate images left in rendering/failed state"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            default=RENDER_RECOVERY_AGE_MINUTES,
+            help="最終更新からの経過時間（分）がこれ以上のものを対象とする",
+        )
+
+    def handle(self, *args, **options):
+        rendered, failed = recover_renders(timedelta(minutes=options["older_than"]))
+        self.stdout.write(f"コーディネート画像を再生成しました（成功: {rendered}件 / 失敗: {failed}件）")
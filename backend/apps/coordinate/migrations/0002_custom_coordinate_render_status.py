@@ -0,0 +1,24 @@
+# Generated by Django 5.1 on 2026-10-18 10:43
+
+import core.utils.storages
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('coordinate', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customcoordinate',
+            name='render_status',
+            field=models.CharField(choices=[('ready', '生成済み'), ('rendering', '生成中'), ('failed', '生成失敗')], default='ready', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='customcoordinate',
+            name='image',
+            field=models.ImageField(blank=True, storage=core.utils.storages.CustomStorage(), upload_to='coordinations/custom/'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("coordinate", "0002_custom_coordinate_render_status"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="photocoordinate",
+            index=models.Index(fields=["user", "-created_at", "-id"], name="photo_coord_user_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="customcoordinate",
+            index=models.Index(fields=["user", "-created_at", "-id"], name="custom_coord_user_created_idx"),
+        ),
+    ]
@@ -5,6 +5,8 @@ from apps.fashion_items.models import FashionItem, Season
 from core.mixins.timestamp_mixin import TimestampMixin
 from core.utils.storages import CustomStorage
 
+from .constants import RENDER_STATUS_FAILED, RENDER_STATUS_READY, RENDER_STATUS_RENDERING
+
 
 # シーン（例：休日）
 class Scene(models.Model):
@@ -30,6 +32,12 @@ class PhotoCoordinate(TimestampMixin, models.Model):
     scenes = models.ManyToManyField(Scene, blank=True)
     tastes = models.ManyToManyField(Taste, blank=True)
 
+    class Meta:
+        indexes = [
+            # 一覧のキーセットによるページネーション（KeysetPagination）用
+            models.Index(fields=["user", "-created_at", "-id"], name="photo_coord_user_created_idx"),
+        ]
+
     def __str__(self):
         return f"Post by {self.user.username}"
 
@@ -40,13 +48,30 @@ class CustomCoordinate(TimestampMixin, models.Model):
     image = models.ImageField(
         upload_to="coordinations/custom/",
         storage=CustomStorage(),
+        blank=True,  # 画像をバックグラウンドで生成する場合は生成完了まで空
     )
     background = models.CharField(max_length=50, default="bg-white")
+    # 画像の生成状態（バックグラウンドで生成する場合に使用）
+    render_status = models.CharField(
+        max_length=20,
+        choices=[
+            (RENDER_STATUS_READY, "生成済み"),
+            (RENDER_STATUS_RENDERING, "生成中"),
+            (RENDER_STATUS_FAILED, "生成失敗"),
+        ],
+        default=RENDER_STATUS_READY,
+    )
     seasons = models.ManyToManyField(Season, blank=True)
     scenes = models.ManyToManyField(Scene, blank=True)
     tastes = models.ManyToManyField(Taste, blank=True)
     items = models.ManyToManyField(FashionItem, through="CoordinateItem", related_name="coordinates")
 
+    class Meta:
+        indexes = [
+            # 一覧のキーセットによるページネーション（KeysetPagination）用
+            models.Index(fields=["user", "-created_at", "-id"], name="custom_coord_user_created_idx"),
+        ]
+
     def __str__(self):
         return f"Coordinate by {self.user.username}"
 
@@ -0,0 +1,129 @@
+"""
+コーディネート画像のバックグラウンド生成
+コーディネートを先に保存し、画像はリクエストとは別のスレッドで生成して保存する
+
+生成はプロセス内のスレッドプールで行うため、ワーカーの再起動・異常終了時には生成中の状態のまま残る。
+生成中・生成失敗のまま一定時間が経過したものは manage.py recover_coordinate_renders で再生成する
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .constants import (
+    RENDER_MODE_DEFERRED,
+    RENDER_MODE_SYNC,
+    RENDER_STATUS_FAILED,
+    RENDER_STATUS_READY,
+    RENDER_STATUS_RENDERING,
+    RENDER_WORKERS,
+)
+from .models import CustomCoordinate
+from .rendering import coordinate_items_data, render_coordinate_image
+from .serializers import load_user_fashion_items
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def is_deferred_rendering():
+    """画像をバックグラウンドで生成するモードかどうか"""
+    return getattr(settings, "COORDINATE_RENDER_MODE", RENDER_MODE_SYNC) == RENDER_MODE_DEFERRED
+
+
+def get_executor():
+    """プロセス内で共有する画像生成用のスレッドプールを取得"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, "COORDINATE_RENDER_WORKERS", RENDER_WORKERS),
+                thread_name_prefix="coordinate-render",
+            )
+        return _executor
+
+
+def schedule_render(coordinate):
+    """トランザクションの確定後に画像の生成を開始（確定前の状態を読まないようにする）"""
+    coordinate_id, updated_at = coordinate.pk, coordinate.updated_at
+    transaction.on_commit(lambda: get_executor().submit(_run_render, coordinate_id, updated_at))
+
+
+def _run_render(coordinate_id, updated_at):
+    """ワーカースレッドでの画像生成（スレッドごとのDB接続を使用後に閉じる）"""
+    close_old_connections()
+    try:
+        render_coordinate(coordinate_id, updated_at)
+    except Exception as e:
+        logger.error(f"Failed to render coordinate image (coordinate={coordinate_id}): {e}", exc_info=True)
+    finally:
+        close_old_connections()
+
+
+def render_coordinate(coordinate_id, updated_at):
+    """
+    保存済みのアイテム・背景色からコーディネート画像を生成して保存
+    生成中にコーディネートが更新された場合（updated_at が変わった場合）は結果を破棄する
+    """
+    coordinate = CustomCoordinate.objects.filter(pk=coordinate_id, updated_at=updated_at).first()
+    if coordinate is None:
+        return
+
+    items_data = coordinate_items_data(coordinate)
+    fashion_items = load_user_fashion_items(coordinate.user_id, items_data)
+
+    try:
+        image = render_coordinate_image(items_data, coordinate.background, fashion_items, coordinate.pk)
+    except Exception:
+        CustomCoordinate.objects.filter(pk=coordinate_id, updated_at=updated_at).update(
+            render_status=RENDER_STATUS_FAILED
+        )
+        raise
+
+    _attach_image(coordinate, image, updated_at)
+
+
+def recover_renders(older_than):
+    """
+    生成中・生成失敗のまま最終更新から older_than（timedelta）以上経過したコーディネートの画像を再生成
+    再生成できた件数と失敗した件数を返す
+    """
+    stale = CustomCoordinate.objects.filter(
+        render_status__in=[RENDER_STATUS_RENDERING, RENDER_STATUS_FAILED],
+        updated_at__lte=timezone.now() - older_than,
+    ).values_list("pk", "updated_at")
+
+    rendered, failed = 0, 0
+    for coordinate_id, updated_at in stale:
+        try:
+            render_coordinate(coordinate_id, updated_at)
+        except Exception as e:
+            logger.error(f"Failed to recover coordinate image (coordinate={coordinate_id}): {e}", exc_info=True)
+            failed += 1
+        else:
+            rendered += 1
+    return rendered, failed
+
+
+def _attach_image(coordinate, image, updated_at):
+    """生成した画像を保存し、コーディネートに設定（古い画像は削除）"""
+    field = coordinate.image.field
+    storage = field.storage
+    image_name = storage.save(field.generate_filename(coordinate, image.name), image)
+    old_image_name = coordinate.image.name
+
+    # 生成中に更新されていない場合のみ設定（updated_at は変更しない）
+    updated = CustomCoordinate.objects.filter(pk=coordinate.pk, updated_at=updated_at).update(
+        image=image_name, render_status=RENDER_STATUS_READY
+    )
+
+    # 設定されなかった画像、または置き換えられた古い画像を削除
+    unused_image_name = old_image_name if updated else image_name
+    if unused_image_name and storage.exists(unused_image_name):
+        storage.delete(unused_image_name)
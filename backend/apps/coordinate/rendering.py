@@ -0,0 +1,278 @@
+"""
+コーディネート画像の合成処理
+"""
+
+import logging
+import math
+import random
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image
+
+from .compositor import get_compositor
+from .constants import (
+    MAX_COORDINATE_IMAGE_KB,
+    PREVIEW_SCALE,
+    PREVIEW_WEBP_QUALITY,
+    REFERENCE_HEIGHT,
+    REFERENCE_WIDTH,
+    TAILWIND_COLORS,
+    TRANSFORMED_ITEM_CACHE_SIZE,
+    WEBP_QUALITIES,
+    Y_OFFSET,
+)
+from .layers import layout_digest, load_layer, save_layer
+from .serializers import to_item_pk
+from .thumbnails import get_item_thumbnails, image_version
+
+logger = logging.getLogger(__name__)
+
+# 前回選択された品質（次回の探索の初期値に使用）
+_last_quality_index = None
+
+# スケーリング・回転済みのアイテム画像（(画像ファイル名, scale, rotate) をキーとするLRU）
+_transformed_items = OrderedDict()
+_transformed_items_lock = threading.Lock()
+
+
+def rotation_affine(source_size, scaled_size, rotate):
+    """
+    スケーリング後に回転した画像の出力サイズと、出力画像の座標から元画像の座標へのアフィン変換の係数を返す
+    出力サイズ・回転の中心は Image.rotate(-rotate, expand=True) と同じ計算で求める
+    """
+    width, height = source_size
+    scaled_width, scaled_height = scaled_size
+
+    angle = math.radians(rotate)
+    a, b = round(math.cos(angle), 15), round(math.sin(angle), 15)
+    d, e = -b, a
+
+    def apply(x, y, c=0.0, f=0.0):
+        return a * x + b * y + c, d * x + e * y + f
+
+    # 回転の中心を画像の中心に合わせる
+    center_x, center_y = scaled_width / 2, scaled_height / 2
+    c, f = apply(-center_x, -center_y)
+    c, f = c + center_x, f + center_y
+
+    # 回転後の画像全体が収まるサイズに拡張
+    corners = [
+        apply(x, y, c, f) for x, y in ((0, 0), (scaled_width, 0), (scaled_width, scaled_height), (0, scaled_height))
+    ]
+    output_width = math.ceil(max(x for x, _ in corners)) - math.floor(min(x for x, _ in corners))
+    output_height = math.ceil(max(y for _, y in corners)) - math.floor(min(y for _, y in corners))
+    c, f = apply(-(output_width - scaled_width) / 2, -(output_height - scaled_height) / 2, c, f)
+
+    # スケーリング後の座標から元画像の座標への変換を合成
+    scale_x = width / scaled_width
+    scale_y = height / scaled_height
+    matrix = (a * scale_x, b * scale_x, c * scale_x, d * scale_y, e * scale_y, f * scale_y)
+    return (output_width, output_height), matrix
+
+
+def transform_item_image(item_image, scale=1, rotate=0):
+    """
+    サムネイルにスケーリングと回転を1回のアフィン変換でまとめて適用
+    回転しない場合はリサイズのみ、1/2 未満に縮小する場合はリサイズ後に回転する
+    """
+    width, height = item_image.size
+    scaled_size = (int(width * scale), int(height * scale))
+
+    if not rotate:
+        if scale == 1:
+            return item_image
+        return item_image.resize(scaled_size, Image.Resampling.LANCZOS)
+
+    if scale < 0.5:
+        # 1/2 未満への縮小はアフィン変換だけではエイリアシングが目立つため、先に LANCZOS で縮小する
+        item_image = item_image.resize(scaled_size, Image.Resampling.LANCZOS)
+
+    output_size, matrix = rotation_affine(item_image.size, scaled_size, rotate)
+    return item_image.transform(output_size, Image.Transform.AFFINE, matrix, resample=Image.Resampling.BICUBIC)
+
+
+def compress_webp(image, max_size_kb):
+    """
+    max_size_kb 以下に収まる最も高い品質でWebPに圧縮
+    品質の二分探索を行い、前回選択された品質とその隣から試すことで通常は2回のエンコードで決定する
+    （どの品質でも収まらない場合は最低品質）。圧縮結果のバッファ・品質・エンコード回数を返す
+    """
+    global _last_quality_index
+
+    # 収まる品質のうち最も高いものを探す（品質が高いほどサイズが大きくなる前提）
+    low, high = 0, len(WEBP_QUALITIES) - 1
+    best_index, best_buffer = None, None
+    hint = _last_quality_index
+    attempts = 0
+
+    while low <= high:
+        index = hint if hint is not None and low <= hint <= high else (low + high) // 2
+        buffer = BytesIO()
+        image.save(buffer, format="WebP", quality=WEBP_QUALITIES[index])
+        attempts += 1
+
+        fits = buffer.tell() / 1024 <= max_size_kb
+        if fits:
+            best_index, best_buffer = index, buffer
+            low = index + 1
+        else:
+            high = index - 1
+
+        # 前回の品質を試した直後のみ隣の品質を試し、以降は二分探索
+        hint = (index + 1 if fits else index - 1) if attempts == 1 and hint is not None else None
+
+    if best_buffer is None:
+        # どの品質でも収まらない場合は最低品質（最後に試した品質）を使用
+        best_index, best_buffer = 0, buffer
+
+    _last_quality_index = best_index
+    return best_buffer, WEBP_QUALITIES[best_index], attempts
+
+
+def get_transformed_item(version, thumbnail, scale=1, rotate=0):
+    """
+    スケーリング・回転済みのアイテム画像を取得（配置が変わっていないアイテムは変換を省略）
+    version: アイテム画像の内容を識別する値（image_version）
+    """
+    key = (version, scale, rotate)
+    with _transformed_items_lock:
+        if key in _transformed_items:
+            _transformed_items.move_to_end(key)
+            return _transformed_items[key]
+
+    transformed = transform_item_image(thumbnail, scale, rotate)
+
+    with _transformed_items_lock:
+        _transformed_items[key] = transformed
+        while len(_transformed_items) > TRANSFORMED_ITEM_CACHE_SIZE:
+            _transformed_items.popitem(last=False)
+    return transformed
+
+
+def coordinate_items_data(coordinate):
+    """保存済みのコーディネートのアイテム・配置を画像生成用の形式で取得"""
+    return [
+        {"item": coordinate_item.item_id, "position_data": coordinate_item.position_data}
+        for coordinate_item in coordinate.coordinate_item_set.all()
+    ]
+
+
+def canvas_size(canvas_scale=1):
+    """基準サイズに縮小率を適用したキャンバスのサイズ"""
+    return int(REFERENCE_WIDTH * canvas_scale), int(REFERENCE_HEIGHT * canvas_scale)
+
+
+def place_items(items_data, fashion_items, canvas_scale=1):
+    """
+    アイテムごとにスケーリング・回転済みの画像と貼り付け位置を求める
+    (画像, 左上のx座標, 左上のy座標) のリストを奥のアイテムから順に返す
+    """
+    width, height = canvas_size(canvas_scale)
+    sorted_items = sorted(items_data, key=lambda x: x["position_data"]["zIndex"])
+
+    # すべてのアイテムのサムネイルを取得してから合成する（未生成のものは元画像を並列に取得）
+    item_images = get_item_thumbnails(fashion_items)
+
+    placements = []
+    for item_data in sorted_items:
+        try:
+            item_pk = to_item_pk(item_data["item"])
+            item_image = item_images.get(item_pk)
+            if item_image is None:
+                continue
+            position_data = item_data["position_data"]
+
+            # 画像の処理（サムネイルにスケーリングと回転を適用）
+            processed_image = get_transformed_item(
+                image_version(fashion_items[item_pk]),
+                item_image,
+                position_data["scale"] * canvas_scale,
+                position_data.get("rotate", 0),
+            )
+
+            # 中心位置の計算（Y_OFFSETを復活）
+            center_x = (position_data["xPercent"] / 100) * width
+            center_y = (position_data["yPercent"] / 100) * height + Y_OFFSET * canvas_scale
+
+            # 貼り付け位置の計算
+            paste_x = int(center_x - (processed_image.width / 2))
+            paste_y = int(center_y - (processed_image.height / 2))
+            placements.append((processed_image, paste_x, paste_y))
+
+        except Exception as e:
+            logger.warning(f"Failed to place coordinate item (item={item_data.get('item')}): {e}", exc_info=True)
+            continue
+
+    return placements
+
+
+def render_items_layer(items_data, fashion_items, canvas_scale=1, compositor=None):
+    """
+    背景色を除いたアイテムのみの透過画像を生成
+    canvas_scale: 基準サイズに対する縮小率（プレビュー用。アイテムの大きさ・位置も同じ比率で縮小）
+    compositor: 合成処理の実装（pil / numpy。指定がない場合は設定値）
+    """
+    placements = place_items(items_data, fashion_items, canvas_scale)
+    return get_compositor(compositor)(canvas_size(canvas_scale), placements)
+
+
+def get_items_layer(items_data, fashion_items, coordinate_id=None):
+    """
+    アイテムレイヤーを取得
+    coordinate_id を指定した場合は保存済みのレイヤーを再利用し、アイテムの配置が変わった場合のみ生成して保存する
+    """
+    if coordinate_id is None:
+        return render_items_layer(items_data, fashion_items)
+
+    digest = layout_digest(items_data, fashion_items)
+    layer = load_layer(coordinate_id, digest)
+    if layer is None:
+        layer = render_items_layer(items_data, fashion_items)
+        save_layer(coordinate_id, digest, layer)
+    return layer
+
+
+def render_coordinate_image(items_data, background, fashion_items, coordinate_id=None):
+    """
+    コーディネート画像を生成する
+    fashion_items: load_user_fashion_items で取得した主キーとアイテムの辞書
+    coordinate_id: 保存済みのコーディネートの場合に指定（アイテムレイヤーを再利用）
+    """
+    bg_color = TAILWIND_COLORS.get(background, "white")
+    base_image = Image.new("RGBA", (REFERENCE_WIDTH, REFERENCE_HEIGHT), bg_color)
+
+    # 背景色にアイテムレイヤーを重ねる
+    base_image.alpha_composite(get_items_layer(items_data, fashion_items, coordinate_id))
+    base_image = base_image.convert("RGB")
+
+    # 画像の保存処理
+    buffer, quality, attempts = compress_webp(base_image, MAX_COORDINATE_IMAGE_KB)
+    logger.info(f"Compressed coordinate image: quality={quality} size={buffer.tell()} attempts={attempts}")
+    timestamp = timezone.now().strftime("%Y%m%d%H%M%S")
+    random_num = str(random.randint(0, 9999)).zfill(4)
+    filename = f"custom_coordinate_{timestamp}_{random_num}.webp"
+
+    return ContentFile(buffer.getvalue(), name=filename)
+
+
+def render_preview_image(items_data, background, fashion_items, image_format="webp"):
+    """
+    配置調整中のプレビュー画像を縮小したキャンバスに生成（固定の品質で1回だけエンコード）
+    image_format: webp / png。エンコード済みのバイト列を返す
+    """
+    bg_color = TAILWIND_COLORS.get(background, "white")
+    preview_image = Image.new("RGBA", canvas_size(PREVIEW_SCALE), bg_color)
+    preview_image.alpha_composite(render_items_layer(items_data, fashion_items, canvas_scale=PREVIEW_SCALE))
+    preview_image = preview_image.convert("RGB")
+
+    buffer = BytesIO()
+    if image_format == "png":
+        preview_image.save(buffer, format="PNG", compress_level=1)
+    else:
+        # 速度を優先したエンコード設定（method=0）
+        preview_image.save(buffer, format="WebP", quality=PREVIEW_WEBP_QUALITY, method=0)
+    return buffer.getvalue()
@@ -1,3 +1,5 @@
+import math
+
 from django.core.exceptions import ValidationError
 from django.db import transaction
 from rest_framework import serializers
@@ -7,6 +9,7 @@ from apps.accounts.constants import IMAGE_SIZE_ERROR, MAX_IMAGE_SIZE
 from apps.fashion_items.models import FashionItem, Season
 from apps.fashion_items.serializers import SeasonSerializer
 
+from .constants import MAX_ITEM_SCALE, PREVIEW_FORMATS
 from .models import CoordinateItem, CustomCoordinate, PhotoCoordinate, Scene, Taste
 
 
@@ -65,8 +68,65 @@ class BaseCoordinateSerializer(serializers.ModelSerializer):
             instance.tastes.set(tastes)
 
 
+def to_item_pk(value):
+    """リクエストのアイテムIDを FashionItem の主キーの型に変換（変換できない場合はNone）"""
+    try:
+        return FashionItem._meta.pk.to_python(value)
+    except ValidationError:
+        return None
+
+
+def load_user_fashion_items(user, items_data):
+    """コーディネートのアイテムを1回のクエリで取得（ユーザーが所有するアイテムのみ、主キーとアイテムの辞書）"""
+    item_pks = {to_item_pk(item_data.get("item")) for item_data in items_data} - {None}
+    return FashionItem.objects.filter(user=user).in_bulk(item_pks)
+
+
+class UserFashionItemField(serializers.PrimaryKeyRelatedField):
+    """
+    ユーザーが所有するアイテムのみを受け付けるフィールド
+    context["fashion_items"] に取得済みのアイテムがあれば再度クエリを発行しない
+    """
+
+    def get_queryset(self):
+        return FashionItem.objects.filter(user=self.context["request"].user)
+
+    def to_internal_value(self, data):
+        fashion_items = self.context.get("fashion_items")
+        if fashion_items:
+            item = fashion_items.get(to_item_pk(data))
+            if item is not None:
+                return item
+        return super().to_internal_value(data)
+
+
+class CoordinatePreviewSerializer(serializers.Serializer):
+    """プレビュー画像の生成条件（作成・更新と同じ items / background の形式）"""
+
+    items = serializers.ListField(child=serializers.DictField(), max_length=10)
+    background = serializers.CharField(required=False, default="bg-white")
+    format = serializers.ChoiceField(choices=list(PREVIEW_FORMATS), required=False, default="webp")
+
+    def validate_items(self, value):
+        for item_data in value:
+            position_data = item_data.get("position_data")
+            if "item" not in item_data or not isinstance(position_data, dict):
+                raise serializers.ValidationError("アイテムと配置情報を指定してください。")
+            for key in ["xPercent", "yPercent", "scale", "rotate", "zIndex"]:
+                number = position_data.get(key, 0 if key == "rotate" else None)
+                # bool は int のサブクラスのため除外する
+                if isinstance(number, bool) or not isinstance(number, (int, float)) or not math.isfinite(number):
+                    raise serializers.ValidationError(f"配置情報の{key}が不正です。")
+            # 拡大率が大きすぎると変換時に巨大な画像を生成するため上限を設ける
+            if not 0 < position_data["scale"] <= MAX_ITEM_SCALE:
+                raise serializers.ValidationError(
+                    f"配置情報のscaleは0より大きく{MAX_ITEM_SCALE}以下で指定してください。"
+                )
+        return value
+
+
 class CoordinateItemSerializer(serializers.ModelSerializer):
-    item = serializers.PrimaryKeyRelatedField(queryset=FashionItem.objects.all())
+    item = UserFashionItemField()
     position_data = serializers.JSONField()
 
     class Meta:
@@ -175,6 +235,8 @@ class CustomCoordinateSerializer(BaseCoordinateSerializer):
             raise serializers.ValidationError("コーディネートには最低2つのアイテムが必要です。")
         if len(value) > 10:
             raise serializers.ValidationError("コーディネートは最大10アイテムまで登録可能です。")
+        if len({item_data["item"].pk for item_data in value}) < len(value):
+            raise serializers.ValidationError("同じアイテムを複数回使用することはできません。")
         return value
 
     @transaction.atomic
@@ -187,11 +249,11 @@ class CustomCoordinateSerializer(BaseCoordinateSerializer):
         user = self.context["request"].user
         coordinate = CustomCoordinate.objects.create(user=user, **validated_data)
 
-        # アイテムの作成
-        for item_data in items_data:
-            CoordinateItem.objects.create(
-                coordinate=coordinate, item=item_data["item"], position_data=item_data["position_data"]
-            )
+        # アイテムの作成（1回のクエリでまとめて作成）
+        CoordinateItem.objects.bulk_create(
+            CoordinateItem(coordinate=coordinate, item=item_data["item"], position_data=item_data["position_data"])
+            for item_data in items_data
+        )
 
         self._set_many_to_many_fields(coordinate, seasons, scenes, tastes)
         return coordinate
@@ -233,14 +295,7 @@ class CustomCoordinateSerializer(BaseCoordinateSerializer):
 
         # アイテムの更新
         if "coordinate_item_set" in validated_data:
-            # 既存のアイテムを削除
-            instance.coordinate_item_set.all().delete()
-
-            # 新しいアイテムを作成
-            for item_data in validated_data["coordinate_item_set"]:
-                CoordinateItem.objects.create(
-                    coordinate=instance, item=item_data["item"], position_data=item_data["position_data"]
-                )
+            self._update_coordinate_items(instance, validated_data["coordinate_item_set"])
 
         # 多対多フィールドの処理
         for field in ["seasons", "scenes", "tastes"]:
@@ -255,6 +310,41 @@ class CustomCoordinateSerializer(BaseCoordinateSerializer):
         instance.save()
         return instance
 
+    def _update_coordinate_items(self, instance, items_data):
+        """
+        既存のアイテムとの差分のみを保存
+        （外されたアイテムの削除・追加されたアイテムの作成・配置が変わったアイテムの更新をそれぞれ1回のクエリで行う）
+        """
+        existing_items = {
+            coordinate_item.item_id: coordinate_item for coordinate_item in instance.coordinate_item_set.all()
+        }
+        new_items = {item_data["item"].pk: item_data for item_data in items_data}
+
+        removed_ids = [
+            coordinate_item.pk for item_id, coordinate_item in existing_items.items() if item_id not in new_items
+        ]
+        if removed_ids:
+            CoordinateItem.objects.filter(pk__in=removed_ids).delete()
+
+        created_items = []
+        changed_items = []
+        for item_id, item_data in new_items.items():
+            coordinate_item = existing_items.get(item_id)
+            if coordinate_item is None:
+                created_items.append(
+                    CoordinateItem(
+                        coordinate=instance, item=item_data["item"], position_data=item_data["position_data"]
+                    )
+                )
+            elif coordinate_item.position_data != item_data["position_data"]:
+                coordinate_item.position_data = item_data["position_data"]
+                changed_items.append(coordinate_item)
+
+        if created_items:
+            CoordinateItem.objects.bulk_create(created_items)
+        if changed_items:
+            CoordinateItem.objects.bulk_update(changed_items, ["position_data"])
+
 
 class DetailedCustomCoordinateSerializer(BaseCoordinateSerializer):
     seasons = SeasonSerializer(many=True, read_only=True)
@@ -263,7 +353,7 @@ class DetailedCustomCoordinateSerializer(BaseCoordinateSerializer):
 
     class Meta:
         model = CustomCoordinate
-        fields = ["id", "image", "seasons", "scenes", "tastes"]
+        fields = ["id", "image", "render_status", "seasons", "scenes", "tastes"]
 
 
 class CoordinatePositionSerializer(serializers.ModelSerializer):
@@ -271,7 +361,7 @@ class CoordinatePositionSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = CustomCoordinate
-        fields = ["items", "background"]
+        fields = ["items", "background", "render_status"]
 
     def get_items(self, obj):
         items = obj.coordinate_item_set.all()
@@ -0,0 +1,38 @@
+from django.db.models.signals import post_delete, pre_save
+from django.dispatch import receiver
+
+from apps.fashion_items.metadata_cache import invalidate_on_change
+from apps.fashion_items.models import FashionItem, Season
+
+from .layers import delete_layer
+from .models import CustomCoordinate, Scene, Taste
+from .thumbnails import delete_thumbnail
+
+
+@receiver(pre_save, sender=FashionItem)
+def invalidate_thumbnail_on_image_change(sender, instance, **kwargs):
+    """アイテム画像が差し替えられた場合は古い画像のサムネイルを削除"""
+    # 新しくアップロードされた画像のみ対象（同じファイル名が再利用される場合があるため）
+    if instance.pk is None or not instance.image or instance.image._committed:
+        return
+
+    old_image_name = FashionItem.objects.filter(pk=instance.pk).values_list("image", flat=True).first()
+    if old_image_name:
+        delete_thumbnail(old_image_name)
+
+
+@receiver(post_delete, sender=FashionItem)
+def delete_thumbnail_on_item_delete(sender, instance, **kwargs):
+    """アイテムの削除時にサムネイルを削除"""
+    if instance.image:
+        delete_thumbnail(instance.image.name)
+
+
+@receiver(post_delete, sender=CustomCoordinate)
+def delete_layer_on_coordinate_delete(sender, instance, **kwargs):
+    """コーディネートの削除時にアイテムレイヤーを削除"""
+    delete_layer(instance.pk)
+
+
+# 登録時に必要なデータのキャッシュをマスタデータの変更時に無効にする
+invalidate_on_change("coordinate", [Season, Scene, Taste])
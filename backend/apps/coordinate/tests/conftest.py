@@ -10,6 +10,7 @@ from rest_framework_simplejwt.tokens import RefreshToken
 
 from apps.accounts.models import CustomUser
 from apps.coordinate.models import CoordinateItem, CustomCoordinate, PhotoCoordinate, Scene, Taste
+from apps.fashion_items.metadata_cache import invalidate
 from apps.fashion_items.models import Brand, Category, Color, Design, FashionItem, PriceRange, Season, SubCategory
 
 
@@ -46,6 +47,20 @@ def media_storage(settings, tmp_path):
     shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
 
 
+@pytest.fixture(autouse=True)
+def thumbnail_cache_dir(settings, tmp_path):
+    """アイテム画像のサムネイルの保存先を一時ディレクトリに設定"""
+    settings.COORDINATE_THUMBNAIL_CACHE_DIR = str(tmp_path / "thumbnails")
+    return settings.COORDINATE_THUMBNAIL_CACHE_DIR
+
+
+@pytest.fixture(autouse=True)
+def layer_cache_dir(settings, tmp_path):
+    """コーディネートのアイテムレイヤーの保存先を一時ディレクトリに設定"""
+    settings.COORDINATE_LAYER_CACHE_DIR = str(tmp_path / "layers")
+    return settings.COORDINATE_LAYER_CACHE_DIR
+
+
 @pytest.fixture
 def test_image(media_storage):
     """
@@ -73,6 +88,13 @@ def sample_image(media_storage):
     return SimpleUploadedFile(name="test_image.jpg", content=b"file_content", content_type="image/jpeg")
 
 
+@pytest.fixture(autouse=True)
+def metadata_cache(settings):
+    """登録時に必要なデータのキャッシュをテストごとに初期化（プロセス内のキャッシュに保存）"""
+    settings.METADATA_CACHE_ALIAS = "default"
+    invalidate("coordinate")
+
+
 @pytest.fixture
 def user():
     """テスト用ユーザーを作成"""
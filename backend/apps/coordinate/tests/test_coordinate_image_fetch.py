@@ -0,0 +1,81 @@
+import time
+from io import BytesIO
+from types import SimpleNamespace
+
+import pytest
+import requests
+from django.test import override_settings
+from PIL import Image
+
+from apps.coordinate import image_fetch
+from apps.coordinate.image_fetch import fetch_item_images
+
+
+def make_png():
+    buffer = BytesIO()
+    Image.new("RGBA", (20, 30), (255, 0, 0, 255)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class FakeResponse:
+    def __init__(self, content, status_code=200):
+        self.content = content
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error")
+
+
+class FakeSession:
+    """一定時間待ってから画像を返すHTTPセッション"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.requests = []
+
+    def get(self, url, timeout=None):
+        self.requests.append((url, timeout))
+        time.sleep(self.delay)
+        if url.endswith("missing.png"):
+            return FakeResponse(b"", status_code=404)
+        return FakeResponse(make_png())
+
+
+def make_item(name):
+    return SimpleNamespace(image=SimpleNamespace(url=f"https://cdn.example.com/{name}"))
+
+
+@pytest.fixture
+def fake_session(mocker):
+    session = FakeSession(delay=0.2)
+    mocker.patch.object(image_fetch, "get_http_session", return_value=session)
+    return session
+
+
+@override_settings(DEBUG=False)
+def test_fetch_item_images_in_parallel(fake_session):
+    """すべてのアイテム画像が並列に取得されることを確認"""
+    items = {i: make_item(f"item{i}.png") for i in range(5)}
+
+    start = time.perf_counter()
+    images = fetch_item_images(items)
+    elapsed = time.perf_counter() - start
+
+    assert sorted(images) == [0, 1, 2, 3, 4]
+    assert images[0].size == (20, 30)
+    # 逐次取得なら 1 秒以上かかる
+    assert elapsed < 0.6
+    assert all(timeout == image_fetch.IMAGE_FETCH_TIMEOUT for _, timeout in fake_session.requests)
+
+
+@override_settings(DEBUG=False)
+def test_fetch_item_images_skips_failures(fake_session):
+    """取得に失敗したアイテムは結果に含まれないことを確認"""
+    images = fetch_item_images({"1": make_item("item1.png"), "2": make_item("missing.png")})
+    assert list(images) == ["1"]
+
+
+def test_http_session_is_shared():
+    """HTTPセッションが使い回されることを確認"""
+    assert image_fetch.get_http_session() is image_fetch.get_http_session()
@@ -0,0 +1,133 @@
+import json
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from apps.coordinate import render_jobs
+from apps.coordinate.models import CustomCoordinate
+from apps.coordinate.render_jobs import render_coordinate
+
+
+class InlineExecutor:
+    """登録された処理をその場で実行するエグゼキューター"""
+
+    def submit(self, fn, *args, **kwargs):
+        fn(*args, **kwargs)
+
+
+@pytest.fixture
+def deferred_rendering(settings, mocker):
+    """画像をバックグラウンドで生成するモード（テストでは同じスレッドで実行）"""
+    settings.COORDINATE_RENDER_MODE = "deferred"
+    mocker.patch.object(render_jobs, "get_executor", return_value=InlineExecutor())
+    # テストのトランザクション内でDB接続が閉じられないようにする
+    mocker.patch.object(render_jobs, "close_old_connections")
+
+
+def make_items_data(fashion_items):
+    return [
+        {
+            "item": item.id,
+            "position_data": {"xPercent": 50, "yPercent": 50, "scale": 1, "rotate": 0, "zIndex": index},
+        }
+        for index, item in enumerate(fashion_items)
+    ]
+
+
+@pytest.mark.django_db
+def test_create_renders_in_background(
+    auth_client, deferred_rendering, fashion_items, django_capture_on_commit_callbacks
+):
+    """作成時は画像を生成せずに保存し、確定後に画像が設定されることのテスト"""
+    data = {"data": {"items": make_items_data(fashion_items), "background": "bg-white"}}
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        response = auth_client.post(
+            reverse("custom-coordination-list"), json.dumps(data), content_type="application/json"
+        )
+
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert response.json()["render_status"] == "rendering"
+    coordinate = CustomCoordinate.objects.get(id=response.json()["id"])
+    assert not coordinate.image
+    assert coordinate.coordinate_item_set.count() == 2
+
+    for callback in callbacks:
+        callback()
+
+    coordinate.refresh_from_db()
+    assert coordinate.render_status == "ready"
+    assert coordinate.image.name.endswith(".webp")
+
+    response = auth_client.get(reverse("custom-coordination-detail", kwargs={"pk": coordinate.id}))
+    assert response.json()["render_status"] == "ready"
+
+
+@pytest.mark.django_db
+def test_update_renders_in_background(
+    auth_client, deferred_rendering, custom_coordinate, fashion_items, django_capture_on_commit_callbacks
+):
+    """アイテム更新時は生成中の状態で保存し、確定後に画像が差し替えられることのテスト"""
+    old_image_name = custom_coordinate.image.name
+    url = reverse("custom-coordination-detail", kwargs={"pk": custom_coordinate.id})
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = auth_client.patch(url, {"data": {"items": make_items_data(fashion_items)}}, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["render_status"] == "rendering"
+
+    custom_coordinate.refresh_from_db()
+    assert custom_coordinate.render_status == "ready"
+    assert custom_coordinate.image.name != old_image_name
+    assert not custom_coordinate.image.storage.exists(old_image_name)
+
+
+@pytest.mark.django_db
+def test_render_discarded_when_updated(custom_coordinate):
+    """生成中にコーディネートが更新された場合は生成結果を破棄することのテスト"""
+    stale_updated_at = custom_coordinate.updated_at
+    custom_coordinate.render_status = "rendering"
+    custom_coordinate.save()
+
+    render_coordinate(custom_coordinate.id, stale_updated_at)
+
+    custom_coordinate.refresh_from_db()
+    assert custom_coordinate.render_status == "rendering"
+
+
+@pytest.mark.django_db
+def test_render_failure(custom_coordinate, mocker):
+    """画像の生成に失敗した場合は失敗状態になることのテスト"""
+    mocker.patch.object(render_jobs, "render_coordinate_image", side_effect=OSError("fetch failed"))
+
+    with pytest.raises(OSError):
+        render_coordinate(custom_coordinate.id, custom_coordinate.updated_at)
+
+    custom_coordinate.refresh_from_db()
+    assert custom_coordinate.render_status == "failed"
+
+
+@pytest.mark.django_db
+def test_recover_stale_renders(custom_coordinate, coordinate_item):
+    """生成中・生成失敗のまま一定時間が経過したコーディネートを再生成するコマンドのテスト"""
+    coordinate_item.position_data = {"xPercent": 50, "yPercent": 50, "scale": 1, "rotate": 0, "zIndex": 1}
+    coordinate_item.save()
+    old_image_name = custom_coordinate.image.name
+    CustomCoordinate.objects.filter(pk=custom_coordinate.pk).update(
+        render_status="rendering", updated_at=timezone.now() - timedelta(minutes=30)
+    )
+
+    # 最終更新からの経過時間が指定より短いものは対象外
+    call_command("recover_coordinate_renders", "--older-than", "60")
+    custom_coordinate.refresh_from_db()
+    assert custom_coordinate.render_status == "rendering"
+
+    call_command("recover_coordinate_renders", "--older-than", "10")
+    custom_coordinate.refresh_from_db()
+    assert custom_coordinate.render_status == "ready"
+    assert custom_coordinate.image.name != old_image_name
@@ -0,0 +1,242 @@
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+from apps.coordinate import rendering
+from apps.coordinate.compositor import composite_numpy, composite_pil, get_compositor
+from apps.coordinate.constants import REFERENCE_HEIGHT, REFERENCE_WIDTH, Y_OFFSET
+from apps.coordinate.rendering import (
+    compress_webp,
+    get_items_layer,
+    render_items_layer,
+    render_preview_image,
+    transform_item_image,
+)
+
+
+@pytest.fixture
+def thumbnail():
+    """透明な背景に楕円の被写体があるサムネイル"""
+    image = Image.new("RGBA", (160, 200), (0, 0, 0, 0))
+    ImageDraw.Draw(image).ellipse((10, 10, 150, 190), fill=(200, 30, 30, 255))
+    return image
+
+
+def legacy_transform(item_image, scale, rotate):
+    """リサイズ後に回転する従来の処理"""
+    width, height = item_image.size
+    if scale != 1:
+        item_image = item_image.resize((int(width * scale), int(height * scale)), Image.Resampling.LANCZOS)
+    if rotate:
+        item_image = item_image.rotate(-rotate, expand=True, resample=Image.Resampling.BICUBIC)
+    return item_image
+
+
+@pytest.mark.parametrize(("scale", "rotate"), [(1, 0), (1.5, 0), (1, 30), (1.5, 45), (0.7, -20), (0.3, 90)])
+def test_matches_resize_and_rotate(thumbnail, scale, rotate):
+    """リサイズ・回転を順に行った場合と同じサイズ・ほぼ同じ画素値になることを確認"""
+    expected = legacy_transform(thumbnail, scale, rotate)
+    actual = transform_item_image(thumbnail, scale, rotate)
+
+    assert actual.mode == "RGBA"
+    assert actual.size == expected.size
+    diff = np.abs(np.asarray(actual, dtype=np.int16) - np.asarray(expected, dtype=np.int16))
+    assert diff[..., 3].mean() < 2
+
+
+def make_canvas(seed):
+    """ランダムな図形を配置したコーディネート画像"""
+    rng = np.random.default_rng(seed)
+    canvas = Image.new("RGB", (600, 750), "white")
+    draw = ImageDraw.Draw(canvas)
+    for _ in range(30):
+        x, y = rng.integers(0, 600), rng.integers(0, 750)
+        color = tuple(int(v) for v in rng.integers(0, 255, 3))
+        draw.ellipse((x, y, x + rng.integers(20, 200), y + rng.integers(20, 200)), fill=color)
+    noise = rng.integers(-20, 20, (750, 600, 3))
+    return Image.fromarray(np.clip(np.asarray(canvas, dtype=np.int16) + noise, 0, 255).astype(np.uint8))
+
+
+def linear_search_quality(image, max_size_kb):
+    """品質95から5ずつ下げていく従来の探索"""
+    for quality in range(95, 0, -5):
+        buffer = BytesIO()
+        image.save(buffer, format="WebP", quality=quality)
+        if buffer.tell() / 1024 <= max_size_kb:
+            return quality
+    return 5
+
+
+@pytest.mark.parametrize("max_size_kb", [30, 60, 100, 1000, 1])
+def test_compress_webp_matches_linear_search(monkeypatch, max_size_kb):
+    """従来の探索と同じ品質を、より少ないエンコード回数で選択することを確認"""
+    monkeypatch.setattr(rendering, "_last_quality_index", None)
+    canvas = make_canvas(0)
+
+    buffer, quality, attempts = compress_webp(canvas, max_size_kb)
+
+    assert quality == linear_search_quality(canvas, max_size_kb)
+    assert attempts <= 5
+    assert buffer.tell() / 1024 <= max_size_kb or quality == 5
+    assert Image.open(buffer).format == "WEBP"
+
+
+def test_compress_webp_starts_from_previous_quality(monkeypatch):
+    """前回の品質から探索を始め、似た画像では2回のエンコードで決定することを確認"""
+    monkeypatch.setattr(rendering, "_last_quality_index", None)
+    _, quality, _ = compress_webp(make_canvas(1), 60)
+
+    _, next_quality, attempts = compress_webp(make_canvas(1), 60)
+
+    assert next_quality == quality
+    assert attempts == 2
+
+
+@pytest.fixture
+def layer_items(monkeypatch, thumbnail):
+    """2つのアイテムとそのサムネイル（サムネイルの取得回数を記録）"""
+    monkeypatch.setattr(rendering, "_transformed_items", rendering.OrderedDict())
+    updated_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    fashion_items = {
+        1: SimpleNamespace(image=SimpleNamespace(name="a.png"), updated_at=updated_at),
+        2: SimpleNamespace(image=SimpleNamespace(name="b.png"), updated_at=updated_at),
+    }
+    calls = []
+    thumbnails = {}
+
+    def get_item_thumbnails(items):
+        calls.append(items)
+        return {key: thumbnails.get(key, thumbnail) for key in items}
+
+    # テストからアイテムごとのサムネイルを差し替えられるようにする
+    get_item_thumbnails.thumbnails = thumbnails
+
+    monkeypatch.setattr(rendering, "get_item_thumbnails", get_item_thumbnails)
+    items_data = [
+        {"item": 1, "position_data": {"xPercent": 2, "yPercent": 40, "scale": 1.2, "rotate": 30, "zIndex": 2}},
+        {"item": 2, "position_data": {"xPercent": 60, "yPercent": 50, "scale": 1, "rotate": 0, "zIndex": 1}},
+    ]
+    return items_data, fashion_items, calls
+
+
+def test_items_layer_matches_direct_paste(layer_items, thumbnail):
+    """背景色にアイテムレイヤーを重ねた結果が、背景に直接貼り付けた場合とほぼ同じになることを確認"""
+    items_data, fashion_items, _ = layer_items
+    expected = Image.new("RGB", (REFERENCE_WIDTH, REFERENCE_HEIGHT), "#e0f2fe")
+    for item_data in sorted(items_data, key=lambda x: x["position_data"]["zIndex"]):
+        position_data = item_data["position_data"]
+        image = transform_item_image(thumbnail, position_data["scale"], position_data["rotate"])
+        x = int(position_data["xPercent"] / 100 * REFERENCE_WIDTH - image.width / 2)
+        y = int(position_data["yPercent"] / 100 * REFERENCE_HEIGHT + Y_OFFSET - image.height / 2)
+        expected.paste(image, (x, y), image.split()[3])
+
+    actual = Image.new("RGBA", (REFERENCE_WIDTH, REFERENCE_HEIGHT), "#e0f2fe")
+    actual.alpha_composite(render_items_layer(items_data, fashion_items))
+
+    diff = np.abs(np.asarray(actual.convert("RGB"), dtype=np.int16) - np.asarray(expected, dtype=np.int16))
+    assert diff.max() <= 2
+
+
+def test_items_layer_reused_until_layout_changes(layer_items):
+    """保存済みのレイヤーはアイテムの配置が変わるまで再利用されることを確認"""
+    items_data, fashion_items, calls = layer_items
+
+    first = get_items_layer(items_data, fashion_items, coordinate_id=1)
+    second = get_items_layer(items_data, fashion_items, coordinate_id=1)
+
+    assert len(calls) == 1
+    assert np.array_equal(np.asarray(first), np.asarray(second))
+
+    items_data[1]["position_data"]["xPercent"] = 30
+    get_items_layer(items_data, fashion_items, coordinate_id=1)
+
+    assert len(calls) == 2
+    # 配置が変わっていないアイテムは変換結果を再利用
+    assert len(rendering._transformed_items) == 2
+
+
+def test_image_replaced_under_same_name(layer_items):
+    """同じファイル名で画像が差し替えられた場合は変換結果・レイヤーを再利用しないことを確認"""
+    items_data, fashion_items, calls = layer_items
+    before = np.asarray(get_items_layer(items_data, fashion_items, coordinate_id=1))
+
+    # アイテム2の画像を同じファイル名の別の画像（青い矩形）に差し替え
+    rendering.get_item_thumbnails.thumbnails[2] = Image.new("RGBA", (160, 200), (30, 30, 200, 255))
+    fashion_items[2].updated_at += timedelta(minutes=1)
+    after = np.asarray(get_items_layer(items_data, fashion_items, coordinate_id=1))
+
+    assert len(calls) == 2
+    assert not np.array_equal(before, after)
+    # 差し替えた画像の中心（xPercent=60, yPercent=50）が新しい画像の色になっている
+    x = int(0.6 * REFERENCE_WIDTH)
+    y = int(0.5 * REFERENCE_HEIGHT + Y_OFFSET)
+    assert tuple(after[y, x]) == (30, 30, 200, 255)
+
+
+def test_preview_matches_downscaled_layout(layer_items):
+    """プレビュー画像が基準サイズの合成結果を縮小した場合とほぼ同じ配置になることを確認"""
+    items_data, fashion_items, _ = layer_items
+    full = Image.new("RGBA", (REFERENCE_WIDTH, REFERENCE_HEIGHT), "white")
+    full.alpha_composite(render_items_layer(items_data, fashion_items))
+    expected = full.convert("RGB").resize((300, 375), Image.Resampling.LANCZOS)
+
+    preview = Image.open(BytesIO(render_preview_image(items_data, "bg-white", fashion_items, image_format="png")))
+
+    assert preview.size == (300, 375)
+    diff = np.abs(np.asarray(preview, dtype=np.int16) - np.asarray(expected, dtype=np.int16))
+    assert diff.mean() < 3
+
+
+def random_placements(seed, count=8):
+    """半透明の図形を持つアイテム画像と貼り付け位置（キャンバスからはみ出すものを含む）"""
+    rng = np.random.default_rng(seed)
+    placements = []
+    for _ in range(count):
+        width, height = (int(v) for v in rng.integers(40, 260, 2))
+        image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+        color = tuple(int(v) for v in rng.integers(0, 255, 3)) + (int(rng.integers(80, 256)),)
+        ImageDraw.Draw(image).ellipse((0, 0, width - 1, height - 1), fill=color)
+        image = image.rotate(int(rng.integers(0, 90)), expand=True, resample=Image.Resampling.BICUBIC)
+        x, y = int(rng.integers(-150, 600)), int(rng.integers(-150, 750))
+        placements.append((image, x, y))
+    return placements
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_numpy_compositor_matches_pil(seed):
+    """NumPy による合成が PIL による合成とほぼ同じ結果になることを確認"""
+    placements = random_placements(seed)
+
+    expected = composite_pil((REFERENCE_WIDTH, REFERENCE_HEIGHT), placements)
+    actual = composite_numpy((REFERENCE_WIDTH, REFERENCE_HEIGHT), placements)
+
+    assert actual.mode == "RGBA"
+    assert actual.size == expected.size
+    # 背景色に重ねた結果で比較（透明な画素の色は比較しない）
+    background = Image.new("RGBA", expected.size, "#e0f2fe")
+    diff = np.abs(
+        np.asarray(Image.alpha_composite(background, actual), dtype=np.int16)
+        - np.asarray(Image.alpha_composite(background, expected), dtype=np.int16)
+    )
+    assert diff.max() <= 3
+
+
+def test_compositor_selected_by_setting(settings, layer_items):
+    """settings.COORDINATE_COMPOSITOR で合成処理の実装を切り替えられることを確認"""
+    items_data, fashion_items, _ = layer_items
+
+    settings.COORDINATE_COMPOSITOR = "numpy"
+    assert get_compositor() is composite_numpy
+    numpy_layer = render_items_layer(items_data, fashion_items)
+
+    settings.COORDINATE_COMPOSITOR = "pil"
+    assert get_compositor() is composite_pil
+    pil_layer = render_items_layer(items_data, fashion_items)
+
+    assert numpy_layer.size == pil_layer.size
+    diff = np.abs(np.asarray(numpy_layer, dtype=np.int16) - np.asarray(pil_layer, dtype=np.int16))
+    assert diff[..., 3].max() <= 1
@@ -1,13 +1,18 @@
 import pytest
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from apps.accounts.constants import MAX_IMAGE_SIZE
+from apps.accounts.models import CustomUser
+from apps.coordinate.models import CoordinateItem
 from apps.coordinate.serializers import (
     CustomCoordinateSerializer,
     MetaDataSerializer,
     PhotoCoordinateSerializer,
     SceneSerializer,
     TasteSerializer,
+    load_user_fashion_items,
 )
 from apps.fashion_items.models import Category, FashionItem, SubCategory
 
@@ -232,6 +237,80 @@ class TestCustomCoordinateSerializer:
         assert updated_coordinate.coordinate_item_set.count() == 2  # 2つのアイテムが存在することを確認
         assert updated_coordinate.image is not None
 
+    def test_items_of_other_user(self, valid_data, dummy_request):
+        """異常系: 他のユーザーのアイテムは受け付けないことのテスト"""
+        other_user = CustomUser.objects.create_user(
+            email="other@example.com", password="testpass123", username="otheruser", is_active=True
+        )
+        FashionItem.objects.filter(id=valid_data["items"][0]["item"]).update(user=other_user)
+
+        serializer = CustomCoordinateSerializer(data=valid_data, context={"request": dummy_request})
+        assert not serializer.is_valid()
+        assert "items" in serializer.errors
+
+    def test_reuses_loaded_items(self, valid_data, dummy_request):
+        """正常系: 取得済みのアイテムがある場合はアイテムを再取得しないことのテスト"""
+        fashion_items = load_user_fashion_items(dummy_request.user, valid_data["items"])
+        assert len(fashion_items) == 2
+
+        serializer = CustomCoordinateSerializer(
+            data=valid_data, context={"request": dummy_request, "fashion_items": fashion_items}
+        )
+        with CaptureQueriesContext(connection) as queries:
+            assert serializer.is_valid(), serializer.errors
+
+        assert not any(FashionItem._meta.db_table in query["sql"] for query in queries.captured_queries)
+
+    def test_duplicate_items(self, valid_data, dummy_request):
+        """異常系: 同じアイテムを複数回使用できないことのテスト"""
+        valid_data["items"] = [valid_data["items"][0], valid_data["items"][0]]
+
+        serializer = CustomCoordinateSerializer(data=valid_data, context={"request": dummy_request})
+        assert not serializer.is_valid()
+        assert "items" in serializer.errors
+
+    def test_update_items_diff(self, custom_coordinate, fashion_item, fashion_items, subcategory, user, dummy_request):
+        """正常系: アイテムの更新では差分のみを保存することのテスト"""
+        added_item = FashionItem.objects.create(user=user, sub_category=subcategory)
+        kept, moved, removed = (
+            CoordinateItem.objects.create(
+                coordinate=custom_coordinate,
+                item=item,
+                position_data={"xPercent": 10 * index, "yPercent": 50, "scale": 1, "rotate": 0, "zIndex": index},
+            )
+            for index, item in enumerate([fashion_item, *fashion_items])
+        )
+        moved_position = {**moved.position_data, "xPercent": 80}
+        update_data = {
+            "items": [
+                {"item": kept.item_id, "position_data": kept.position_data},
+                {"item": moved.item_id, "position_data": moved_position},
+                {"item": added_item.id, "position_data": {"xPercent": 50, "yPercent": 50, "scale": 1, "zIndex": 3}},
+            ]
+        }
+
+        serializer = CustomCoordinateSerializer(
+            custom_coordinate, data=update_data, partial=True, context={"request": dummy_request}
+        )
+        assert serializer.is_valid(), serializer.errors
+        with CaptureQueriesContext(connection) as queries:
+            serializer.save()
+
+        coordinate_items = {item.item_id: item for item in custom_coordinate.coordinate_item_set.all()}
+        assert set(coordinate_items) == {kept.item_id, moved.item_id, added_item.id}
+        # 変更のないアイテム・配置が変わったアイテムは同じ行のまま
+        assert coordinate_items[kept.item_id].pk == kept.pk
+        assert coordinate_items[moved.item_id].pk == moved.pk
+        assert coordinate_items[moved.item_id].position_data == moved_position
+        assert not CoordinateItem.objects.filter(pk=removed.pk).exists()
+
+        item_writes = [
+            query["sql"]
+            for query in queries.captured_queries
+            if CoordinateItem._meta.db_table in query["sql"] and not query["sql"].startswith("SELECT")
+        ]
+        assert len(item_writes) == 3  # 削除・作成・更新をそれぞれ1回
+
 
 @pytest.mark.django_db
 class TestMetaDataSerializer:
@@ -0,0 +1,77 @@
+from io import BytesIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.test import override_settings
+from PIL import Image
+
+from apps.coordinate import thumbnails
+from apps.coordinate.thumbnails import get_item_thumbnails, load_thumbnail, normalize_item_image
+
+
+def make_png(size):
+    buffer = BytesIO()
+    Image.new("RGB", size, (200, 30, 30)).save(buffer, format="PNG")
+    return ContentFile(buffer.getvalue(), name="item.png")
+
+
+@pytest.fixture
+def item_with_image(fashion_item):
+    """実際の画像を持つアイテム"""
+    fashion_item.image.save("item.png", make_png((400, 300)))
+    return fashion_item
+
+
+@pytest.mark.parametrize(
+    ("size", "expected"),
+    [
+        ((400, 300), (160, 120)),  # 横長: 幅を基準サイズに合わせる
+        ((300, 600), (100, 200)),  # 縦長: 高さを基準サイズ（4:5）に合わせる
+    ],
+)
+def test_normalize_item_image(size, expected):
+    """RGBAに変換され、アスペクト比を維持して基準サイズに収まることを確認"""
+    thumbnail = normalize_item_image(Image.new("RGB", size))
+    assert thumbnail.mode == "RGBA"
+    assert thumbnail.size == expected
+
+
+@pytest.mark.django_db
+@override_settings(DEBUG=True)
+def test_thumbnail_is_reused(item_with_image, mocker):
+    """2回目以降は元画像を取得せずに保存済みのサムネイルを使用することを確認"""
+    first = get_item_thumbnails({1: item_with_image})
+    assert first[1].size == (160, 120)
+    assert load_thumbnail(item_with_image.image.name) is not None
+
+    fetch = mocker.patch.object(thumbnails, "fetch_item_images", return_value={})
+    second = get_item_thumbnails({1: item_with_image})
+
+    assert second[1].tobytes() == first[1].tobytes()
+    fetch.assert_called_once_with({}, transform=mocker.ANY)
+
+
+@pytest.mark.django_db
+@override_settings(DEBUG=True)
+def test_thumbnail_invalidated_on_image_change(item_with_image):
+    """アイテム画像を差し替えた場合は古いサムネイルが削除されることを確認"""
+    old_image_name = item_with_image.image.name
+    get_item_thumbnails({1: item_with_image})
+
+    item_with_image.image = make_png((300, 600))
+    item_with_image.save()
+
+    assert load_thumbnail(old_image_name) is None
+    assert get_item_thumbnails({1: item_with_image})[1].size == (100, 200)
+
+
+@pytest.mark.django_db
+@override_settings(DEBUG=True)
+def test_thumbnail_deleted_with_item(item_with_image):
+    """アイテムの削除時にサムネイルが削除されることを確認"""
+    image_name = item_with_image.image.name
+    get_item_thumbnails({1: item_with_image})
+
+    item_with_image.delete()
+
+    assert load_thumbnail(image_name) is None
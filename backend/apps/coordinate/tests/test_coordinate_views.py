@@ -1,13 +1,18 @@
+import io
 import json
 
 import pytest
-from django.test.utils import override_settings
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
 from django.urls import reverse
+from PIL import Image
 from rest_framework import status
 from rest_framework.test import APIRequestFactory, force_authenticate
 
-from apps.coordinate.models import CustomCoordinate, PhotoCoordinate
+from apps.coordinate.models import CustomCoordinate, PhotoCoordinate, Scene, Taste
 from apps.coordinate.views import CoordinateCountView
+from apps.fashion_items.models import Season
 
 
 @pytest.mark.django_db
@@ -30,6 +35,33 @@ class TestMetaDataView:
         assert "scenes" in response.data
         assert "tastes" in response.data
 
+    def test_not_modified(self, auth_client, season, scene, taste):
+        """ETag が一致する場合はマスタデータを参照せずに 304 を返すことのテスト"""
+        url = reverse("coordinate_metadata")
+        etag = auth_client.get(url)["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = auth_client.get(url, HTTP_IF_NONE_MATCH=f"W/{etag}")
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        master_tables = [model._meta.db_table for model in [Season, Scene, Taste]]
+        assert not [
+            query["sql"]
+            for query in queries.captured_queries
+            if query["sql"].startswith("SELECT") and any(f'"{table}"' in query["sql"] for table in master_tables)
+        ]
+
+    def test_invalidated_on_change(self, auth_client, scene):
+        """マスタデータの変更時・削除時にキャッシュが無効になることのテスト"""
+        url = reverse("coordinate_metadata")
+        etag = auth_client.get(url)["ETag"]
+
+        scene.delete()
+
+        response = auth_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["scenes"] == []
+
 
 @pytest.mark.django_db
 class TestPhotoCoordinateViewSet:
@@ -43,6 +75,20 @@ class TestPhotoCoordinateViewSet:
         assert response.status_code == status.HTTP_200_OK
         assert len(response.data) >= 1
 
+    def test_cursor_pagination(self, auth_client, user, sample_image):
+        """キーセットによるページネーションで作成日時が同じコーディネートも順に取得できることのテスト"""
+        coordinates = [PhotoCoordinate.objects.create(user=user, image=sample_image) for _ in range(12)]
+        PhotoCoordinate.objects.update(created_at=coordinates[0].created_at)
+
+        response = auth_client.get(f"{reverse('photo-coordination-list')}?cursor=")
+        assert "count" not in response.data
+        received = [coordinate["id"] for coordinate in response.data["results"]]
+        response = auth_client.get(response.data["next"])
+        received += [coordinate["id"] for coordinate in response.data["results"]]
+
+        assert received == [coordinate.id for coordinate in reversed(coordinates)]
+        assert response.data["next"] is None
+
     def test_retrieve_coordinate(self, auth_client, photo_coordinate):
         """個別取得のテスト"""
         url = reverse("photo-coordination-detail", kwargs={"pk": photo_coordinate.id})
@@ -78,6 +124,13 @@ class TestCustomCoordinateViewSet:
         assert response.status_code == status.HTTP_200_OK
         assert len(response.data) >= 1
 
+    def test_cursor_pagination(self, auth_client, custom_coordinate):
+        """キーセットによるページネーションのテスト"""
+        response = auth_client.get(f"{reverse('custom-coordination-list')}?cursor=")
+        assert response.status_code == status.HTTP_200_OK
+        assert [coordinate["id"] for coordinate in response.data["results"]] == [custom_coordinate.id]
+        assert response.data["next"] is None
+
     def test_retrieve_coordinate(self, auth_client, custom_coordinate):
         """個別取得のテスト"""
         url = reverse("custom-coordination-detail", kwargs={"pk": custom_coordinate.id})
@@ -132,6 +185,74 @@ class TestCustomCoordinateViewSet:
         response = auth_client.patch(url, data, format="json")
         assert response.status_code == status.HTTP_200_OK
 
+    def test_update_background_only(self, auth_client, custom_coordinate, coordinate_item, mocker):
+        """背景色のみの更新では保存済みのアイテムで画像を再生成するテスト"""
+        buffer = io.BytesIO()
+        Image.new("RGB", (10, 10), "white").save(buffer, format="WebP")
+        render = mocker.patch(
+            "apps.coordinate.views.render_coordinate_image", return_value=ContentFile(buffer.getvalue(), name="c.webp")
+        )
+        url = reverse("custom-coordination-detail", kwargs={"pk": custom_coordinate.id})
+
+        # 背景色が変わらない場合は再生成しない
+        response = auth_client.patch(url, {"data": {"background": "bg-white"}}, format="json")
+        assert response.status_code == status.HTTP_200_OK
+        render.assert_not_called()
+
+        response = auth_client.patch(url, {"data": {"background": "bg-sky-100"}}, format="json")
+        assert response.status_code == status.HTTP_200_OK
+        items_data, background, _, coordinate_id = render.call_args.args
+        assert items_data == [{"item": coordinate_item.item_id, "position_data": coordinate_item.position_data}]
+        assert background == "bg-sky-100"
+        assert coordinate_id == custom_coordinate.id
+
+    @override_settings(DEBUG=True)
+    def test_preview(self, auth_client, fashion_items):
+        """プレビュー画像の生成のテスト（保存はしない）"""
+        url = reverse("custom-coordination-preview")
+        items_data = [
+            {
+                "item": fashion_items[0].id,
+                "position_data": {"xPercent": 50, "yPercent": 50, "scale": 1, "rotate": 30, "zIndex": 1},
+            },
+        ]
+
+        response = auth_client.post(url, {"data": {"items": items_data, "background": "bg-sky-100"}}, format="json")
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"] == "image/webp"
+        assert Image.open(io.BytesIO(response.content)).size == (300, 375)
+
+        response = auth_client.post(url, {"data": {"items": items_data, "format": "png"}}, format="json")
+        assert response["Content-Type"] == "image/png"
+        assert CustomCoordinate.objects.count() == 0
+
+    def test_preview_invalid_position(self, auth_client, fashion_items):
+        """配置情報が不正な場合のプレビューのテスト"""
+        url = reverse("custom-coordination-preview")
+        items_data = [{"item": fashion_items[0].id, "position_data": {"xPercent": "left"}}]
+
+        response = auth_client.post(url, {"data": {"items": items_data}}, format="json")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.parametrize(
+        "position_data",
+        [
+            {"xPercent": 50, "yPercent": 50, "scale": 1e5, "rotate": 0, "zIndex": 1},
+            {"xPercent": 50, "yPercent": 50, "scale": 0, "rotate": 0, "zIndex": 1},
+            {"xPercent": 50, "yPercent": 50, "scale": True, "rotate": 0, "zIndex": 1},
+            {"xPercent": 50, "yPercent": 50, "scale": 1, "rotate": "30", "zIndex": 1},
+        ],
+    )
+    def test_preview_rejects_out_of_range_position(self, auth_client, fashion_items, position_data, mocker):
+        """拡大率が範囲外・真偽値などの配置情報は画像を生成せずに 400 を返すテスト"""
+        render = mocker.patch("apps.coordinate.views.render_preview_image")
+        url = reverse("custom-coordination-preview")
+        items_data = [{"item": fashion_items[0].id, "position_data": position_data}]
+
+        response = auth_client.post(url, {"data": {"items": items_data}}, format="json")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        render.assert_not_called()
+
     def test_delete_coordinate(self, auth_client, custom_coordinate):
         """削除のテスト"""
         url = reverse("custom-coordination-detail", kwargs={"pk": custom_coordinate.id})
@@ -0,0 +1,133 @@
+"""
+コーディネート画像の合成に使用するアイテム画像のサムネイル
+RGBA変換・基準サイズへのリサイズ済みの画像をローカルディスクに保存し、元画像の再取得・再デコードを省略する
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+
+from django.conf import settings
+from PIL import Image
+
+from .constants import REFERENCE_ITEM_SIZE, THUMBNAIL_CACHE_DIR
+from .image_fetch import fetch_item_images
+
+logger = logging.getLogger(__name__)
+
+
+def image_version(item):
+    """
+    アイテム画像の内容を識別する値（ファイル名・アイテムの更新日時）
+    ファイル名は再利用される場合があるため、プロセス内の変換結果・保存済みのレイヤーの識別には更新日時も含める
+    """
+    return f"{item.image.name}@{item.updated_at.isoformat()}"
+
+
+def maintain_aspect_ratio(image, target_width, target_height):
+    """元の画像のアスペクト比を維持しながら、指定された最大幅・高さに収まるようにリサイズ"""
+    original_width, original_height = image.size
+    original_aspect = original_width / original_height
+    target_aspect = target_width / target_height
+
+    if original_aspect > target_aspect:
+        # 横長の画像の場合
+        new_width = target_width
+        new_height = int(target_width / original_aspect)
+    else:
+        # 縦長の画像の場合
+        new_height = target_height
+        new_width = int(target_height * original_aspect)
+
+    return new_width, new_height
+
+
+def normalize_item_image(item_image, base_size=REFERENCE_ITEM_SIZE):
+    """アイテム画像をRGBAに変換し、4:5の基準サイズの範囲内にリサイズ（アイテムごとに不変）"""
+    # 1. まず画像をRGBAに変換
+    item_image = item_image.convert("RGBA")
+
+    # 2. 基準サイズを4:5の比率で設定
+    base_width = base_size
+    base_height = int(base_size * 1.25)
+
+    # 3. アスペクト比を維持しながら基準サイズの範囲内にリサイズ
+    new_width, new_height = maintain_aspect_ratio(item_image, base_width, base_height)
+    return item_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+
+
+def _cache_path(image_name):
+    """画像ファイル名と基準サイズからサムネイルの保存先を決定"""
+    cache_dir = getattr(settings, "COORDINATE_THUMBNAIL_CACHE_DIR", THUMBNAIL_CACHE_DIR)
+    digest = hashlib.sha256(f"{image_name}:{REFERENCE_ITEM_SIZE}".encode()).hexdigest()
+    return os.path.join(cache_dir, digest[:2], f"{digest}.png")
+
+
+def load_thumbnail(image_name):
+    """保存済みのサムネイルを読み込む（ない場合はNone）"""
+    try:
+        thumbnail = Image.open(_cache_path(image_name))
+        thumbnail.load()
+    except (FileNotFoundError, OSError):
+        return None
+    return thumbnail
+
+
+def write_png(path, image, **params):
+    """PNGで保存（書き込み途中のファイルを読まれないよう一時ファイルから置き換える）"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            # 読み込み速度を優先して圧縮率は下げる
+            image.save(f, format="PNG", compress_level=1, **params)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+def save_thumbnail(image_name, thumbnail):
+    """サムネイルを保存"""
+    write_png(_cache_path(image_name), thumbnail)
+
+
+def delete_thumbnail(image_name):
+    """サムネイルを削除（アイテム画像の変更・アイテムの削除時）"""
+    try:
+        os.remove(_cache_path(image_name))
+    except FileNotFoundError:
+        pass
+
+
+def _normalize_and_save(item, item_image):
+    """取得した元画像からサムネイルを生成して保存"""
+    thumbnail = normalize_item_image(item_image)
+    try:
+        save_thumbnail(item.image.name, thumbnail)
+    except OSError as e:
+        # 保存できなくても合成は続ける
+        logger.warning(f"Failed to save item thumbnail ({item.image.name}): {e}")
+    return thumbnail
+
+
+def get_item_thumbnails(items):
+    """
+    アイテムのサムネイルをまとめて取得
+    items: キーとアイテムの辞書。同じキーでサムネイルの辞書を返す（取得できなかったアイテムは含まない）
+    """
+    thumbnails = {}
+    missing_items = {}
+    for key, item in items.items():
+        if not item.image:
+            continue
+        thumbnail = load_thumbnail(item.image.name)
+        if thumbnail is None:
+            missing_items[key] = item
+        else:
+            thumbnails[key] = thumbnail
+
+    # 保存されていないものだけ元画像を取得し、取得と同じスレッドでサムネイルを生成
+    thumbnails.update(fetch_item_images(missing_items, transform=_normalize_and_save))
+    return thumbnails
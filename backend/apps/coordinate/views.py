@@ -1,28 +1,30 @@
-import random
-from io import BytesIO
-
-import requests
-from django.conf import settings
-from django.core.files.base import ContentFile
-from django.utils import timezone
-from PIL import Image
+import time
+
+from django.http import HttpResponse
 from rest_framework import serializers, status
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet
 
-from apps.fashion_items.models import FashionItem, Season
+from apps.fashion_items.metadata_cache import metadata_response
+from apps.fashion_items.models import Season
+from core.utils.pagination import KeysetPagination
 
-from .constants import REFERENCE_HEIGHT, REFERENCE_ITEM_SIZE, REFERENCE_WIDTH, TAILWIND_COLORS, Y_OFFSET
+from .constants import PREVIEW_FORMATS, RENDER_STATUS_READY, RENDER_STATUS_RENDERING
 from .models import CustomCoordinate, PhotoCoordinate, Scene, Taste
+from .render_jobs import is_deferred_rendering, schedule_render
+from .rendering import coordinate_items_data, render_coordinate_image, render_preview_image
 from .serializers import (
     CoordinatePositionSerializer,
+    CoordinatePreviewSerializer,
     CustomCoordinateSerializer,
     DetailedCustomCoordinateSerializer,
     DetailedPhotoCoordinateSerializer,
     MetaDataSerializer,
     PhotoCoordinateSerializer,
+    load_user_fashion_items,
 )
 
 
@@ -34,6 +36,11 @@ class MetaDataView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
+        # マスタデータが変更されるまではシリアライズ済みのデータを返す（ETag が一致する場合は 304）
+        return metadata_response(request, "coordinate", self.build)
+
+    @staticmethod
+    def build():
         data = {
             "seasons": Season.objects.all(),
             "scenes": Scene.objects.all(),
@@ -41,7 +48,7 @@ class MetaDataView(APIView):
         }
 
         serializer = MetaDataSerializer(data)
-        return Response(serializer.data)
+        return serializer.data
 
 
 class PhotoCoordinateViewSet(ModelViewSet):
@@ -49,6 +56,7 @@ class PhotoCoordinateViewSet(ModelViewSet):
 
     queryset = PhotoCoordinate.objects.all()
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination  # ?cursor= でキーセットによるページネーション
 
     def get_serializer_class(self):
         if self.action in ["create", "update", "partial_update"]:
@@ -57,7 +65,7 @@ class PhotoCoordinateViewSet(ModelViewSet):
 
     # ユーザーが所有するアイテムのみをフィルタリング
     def get_queryset(self):
-        return PhotoCoordinate.objects.filter(user=self.request.user).order_by("-created_at")
+        return PhotoCoordinate.objects.filter(user=self.request.user).order_by("-created_at", "-id")
 
     def perform_create(self, serializer):
         user = self.request.user
@@ -127,6 +135,7 @@ class CustomCoordinateViewSet(ModelViewSet):
 
     queryset = CustomCoordinate.objects.all()
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination  # ?cursor= でキーセットによるページネーション
 
     def get_serializer_class(self):
         if self.action == "retrieve":
@@ -136,115 +145,7 @@ class CustomCoordinateViewSet(ModelViewSet):
         return DetailedCustomCoordinateSerializer
 
     def get_queryset(self):
-        return CustomCoordinate.objects.filter(user=self.request.user).order_by("-created_at")
-
-    def _compress_image(self, image, max_size_kb=100):
-        """画像を指定されたサイズ以下に圧縮する"""
-        quality = 95
-        buffer = BytesIO()
-
-        while True:
-            buffer.seek(0)
-            buffer.truncate()
-            image.save(buffer, format="WebP", quality=quality)
-            size_kb = buffer.tell() / 1024
-
-            if size_kb <= max_size_kb or quality <= 5:
-                break
-
-            quality -= 5
-
-        return buffer
-
-    def maintain_aspect_ratio(self, image, target_width, target_height):
-        """元の画像のアスペクト比を維持しながら、指定された最大幅・高さに収まるようにリサイズ"""
-        original_width, original_height = image.size
-        original_aspect = original_width / original_height
-        target_aspect = target_width / target_height
-
-        if original_aspect > target_aspect:
-            # 横長の画像の場合
-            new_width = target_width
-            new_height = int(target_width / original_aspect)
-        else:
-            # 縦長の画像の場合
-            new_height = target_height
-            new_width = int(target_height * original_aspect)
-
-        return new_width, new_height
-
-    def _process_item_image(self, item_image, position_data, base_size):
-        """アイテム画像の処理を一貫した順序で行う"""
-        # 1. まず画像をRGBAに変換
-        item_image = item_image.convert("RGBA")
-
-        # 2. 基準サイズを4:5の比率で設定
-        base_width = base_size
-        base_height = int(base_size * 1.25)
-
-        # 3. アスペクト比を維持しながら基準サイズの範囲内にリサイズ
-        new_width, new_height = self.maintain_aspect_ratio(item_image, base_width, base_height)
-        item_image = item_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-        # 4. スケーリングを適用
-        scale = position_data["scale"]
-        if scale != 1:
-            scaled_width = int(new_width * scale)
-            scaled_height = int(new_height * scale)
-            item_image = item_image.resize((scaled_width, scaled_height), Image.Resampling.LANCZOS)
-
-        # 5. 回転を適用（必要な場合）
-        rotate = position_data.get("rotate", 0)
-        if rotate:
-            item_image = item_image.rotate(-rotate, expand=True, resample=Image.Resampling.BICUBIC)
-
-        return item_image
-
-    def _generate_coordinate_image(self, items_data, background):
-        """コーディネート画像を生成する"""
-        bg_color = TAILWIND_COLORS.get(background, "white")
-        base_image = Image.new("RGB", (REFERENCE_WIDTH, REFERENCE_HEIGHT), bg_color)
-
-        sorted_items = sorted(items_data, key=lambda x: x["position_data"]["zIndex"])
-
-        for item_data in sorted_items:
-            try:
-                item = FashionItem.objects.get(id=item_data["item"])
-                position_data = item_data["position_data"]
-
-                # 画像の取得
-                if settings.DEBUG:
-                    item_image = Image.open(item.image.path)
-                else:
-                    response = requests.get(item.image.url)
-                    item_image = Image.open(BytesIO(response.content))
-
-                # 画像の処理
-                processed_image = self._process_item_image(item_image, position_data, REFERENCE_ITEM_SIZE)
-
-                # 中心位置の計算（Y_OFFSETを復活）
-                center_x = (position_data["xPercent"] / 100) * REFERENCE_WIDTH
-                center_y = (position_data["yPercent"] / 100) * REFERENCE_HEIGHT + Y_OFFSET
-
-                # 貼り付け位置の計算
-                paste_x = int(center_x - (processed_image.width / 2))
-                paste_y = int(center_y - (processed_image.height / 2))
-
-                # アルファチャンネルを使用して合成
-                mask = processed_image.split()[3]
-                base_image.paste(processed_image, (paste_x, paste_y), mask)
-
-            except Exception as e:
-                print(f"Error processing item: {str(e)}")
-                continue
-
-        # 画像の保存処理
-        buffer = self._compress_image(base_image)
-        timestamp = timezone.now().strftime("%Y%m%d%H%M%S")
-        random_num = str(random.randint(0, 9999)).zfill(4)
-        filename = f"custom_coordinate_{timestamp}_{random_num}.webp"
-
-        return ContentFile(buffer.getvalue(), name=filename)
+        return CustomCoordinate.objects.filter(user=self.request.user).order_by("-created_at", "-id")
 
     def create(self, request, *args, **kwargs):
         try:
@@ -252,12 +153,11 @@ class CustomCoordinateViewSet(ModelViewSet):
             items_data = request_data.get("items", [])
             background = request_data.get("background", "bg-white")
 
-            # 画像を生成
-            generated_image = self._generate_coordinate_image(items_data, background)
+            # アイテムをまとめて取得し、画像の生成とバリデーションで共有する
+            fashion_items = load_user_fashion_items(request.user, items_data)
 
             # データの準備
             data = {
-                "image": generated_image,
                 "items": items_data,
                 "background": background,
                 "seasons": request.data.get("seasons", []),
@@ -265,7 +165,23 @@ class CustomCoordinateViewSet(ModelViewSet):
                 "tastes": request.data.get("tastes", []),
             }
 
-            serializer = self.get_serializer(data=data, context=self.get_serializer_context())
+            if is_deferred_rendering():
+                # 先にコーディネートを保存し、画像はバックグラウンドで生成する
+                serializer = self.get_serializer(data=data, context=self.get_serializer_context(fashion_items))
+                if not serializer.is_valid():
+                    return Response(serializer.errors, status=400)
+
+                coordinate = serializer.save(render_status=RENDER_STATUS_RENDERING)
+                schedule_render(coordinate)
+                return Response(
+                    {"message": "作成を受け付けました", "id": coordinate.id, "render_status": coordinate.render_status},
+                    status=202,
+                )
+
+            # 画像を生成
+            data["image"] = render_coordinate_image(items_data, background, fashion_items)
+
+            serializer = self.get_serializer(data=data, context=self.get_serializer_context(fashion_items))
             if not serializer.is_valid():
                 return Response(serializer.errors, status=400)
 
@@ -286,10 +202,31 @@ class CustomCoordinateViewSet(ModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
-    def get_serializer_context(self):
-        """追加のコンテキストを提供"""
+    # 配置調整中のプレビュー画像（保存はせず、縮小した画像をそのまま返す）
+    @action(detail=False, methods=["POST"])
+    def preview(self, request):
+        start_time = time.time()
+        serializer = CoordinatePreviewSerializer(data=request.data.get("data", {}))
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        items_data = serializer.validated_data["items"]
+        image_format = serializer.validated_data["format"]
+        # ユーザーが所有するアイテムのみ描画
+        fashion_items = load_user_fashion_items(request.user, items_data)
+        image = render_preview_image(
+            items_data, serializer.validated_data["background"], fashion_items, image_format=image_format
+        )
+
+        response = HttpResponse(image, content_type=PREVIEW_FORMATS[image_format])
+        response["X-Process-Time"] = str(time.time() - start_time)
+        response["Cache-Control"] = "no-store"
+        return response
+
+    def get_serializer_context(self, fashion_items=None):
+        """追加のコンテキストを提供（取得済みのアイテムはバリデーションで再利用）"""
         context = super().get_serializer_context()
-        context.update({"request": self.request})
+        context.update({"request": self.request, "fashion_items": fashion_items})
         return context
 
     def update(self, request, *args, **kwargs):
@@ -309,7 +246,8 @@ class CustomCoordinateViewSet(ModelViewSet):
             # 背景色の処理
             if "background" in request_data:
                 data["background"] = request_data["background"]
-                background_updated = True
+                # 背景色が変わる場合のみ画像を再生成
+                background_updated = request_data["background"] != instance.background
 
             # アイテムの処理
             if "items" in request_data:
@@ -317,12 +255,23 @@ class CustomCoordinateViewSet(ModelViewSet):
                 items_updated = True
 
             # items または background が更新される場合、新しい画像を生成
-            if items_updated or background_updated:
+            fashion_items = None
+            # バックグラウンドで生成する場合（生成中のコーディネートは更新で生成結果が破棄されるため再度生成）
+            render_deferred = is_deferred_rendering() and (
+                items_updated or background_updated or instance.render_status == RENDER_STATUS_RENDERING
+            )
+            if render_deferred:
+                if items_updated:
+                    fashion_items = load_user_fashion_items(request.user, data["items"])
+            elif items_updated or background_updated:
                 try:
-                    items_data = data.get("items", [])
+                    # 背景色のみの変更では保存済みのアイテムレイヤーを再利用
+                    items_data = data["items"] if items_updated else coordinate_items_data(instance)
                     background = data.get("background", instance.background)
-                    generated_image = self._generate_coordinate_image(items_data, background)
+                    fashion_items = load_user_fashion_items(request.user, items_data)
+                    generated_image = render_coordinate_image(items_data, background, fashion_items, instance.pk)
                     data["image"] = generated_image
+                    instance.render_status = RENDER_STATUS_READY
                 except Exception as e:
                     return Response(
                         {"error": f"画像の生成中にエラーが発生しました: {str(e)}"}, status=status.HTTP_400_BAD_REQUEST
@@ -340,9 +289,15 @@ class CustomCoordinateViewSet(ModelViewSet):
 
             try:
                 # partial=Trueを指定して部分的な更新を許可
-                update_serializer = self.get_serializer(instance, data=data, partial=True)
+                update_serializer = self.get_serializer(
+                    instance, data=data, partial=True, context=self.get_serializer_context(fashion_items)
+                )
                 update_serializer.is_valid(raise_exception=True)
+                if render_deferred:
+                    instance.render_status = RENDER_STATUS_RENDERING
                 self.perform_update(update_serializer)
+                if render_deferred:
+                    schedule_render(instance)
             except serializers.ValidationError as e:
                 return Response(e.detail, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class FashionItemsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.fashion_items"
+
+    def ready(self):
+        # 登録時に必要なデータのキャッシュ・ブランド検索のインデックスの無効化
+        from . import signals  # noqa: F401
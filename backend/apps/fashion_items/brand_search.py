@@ -0,0 +1,193 @@
+"""
+ブランド検索（settings.BRAND_SEARCH_BACKEND で切り替え）
+
+memory: プロセス内のインデックス
+    ブランド名・カナ名を正規化（全角/半角・大文字/小文字・カタカナ/ひらがなを同一視）して保持し、
+    入力ごとの検索（オートコンプリート）をDBを参照せずに行う。
+    ブランドの保存・削除（loaddata を含む）時に共有のバージョンを更新し、次の検索時に各プロセスでインデックスを再構築する
+trigram: PostgreSQL の pg_trgm インデックス
+    インデックスの再構築を待たずに最新のブランドを検索できる（複数ノード構成向け）。入力のみを正規化して検索する
+"""
+
+import logging
+import threading
+import unicodedata
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramSimilarity
+from django.db import DatabaseError
+from django.db.models import Q
+from django.db.models.functions import Greatest
+
+from .metadata_cache import get_version
+from .models import Brand
+
+logger = logging.getLogger(__name__)
+
+BRAND_SEARCH_BACKEND_MEMORY = "memory"
+BRAND_SEARCH_BACKEND_TRIGRAM = "trigram"
+BRAND_SEARCH_INDEX_NAME = "brand_search"
+MAX_RESULTS = 20
+NGRAM_SIZE = 3
+
+# カタカナ（ァ〜ヶ）とひらがなの対応表
+_KATAKANA_TO_HIRAGANA = {code: code - 0x60 for code in range(ord("ァ"), ord("ヶ") + 1)}
+_HIRAGANA_TO_KATAKANA = {hiragana: katakana for katakana, hiragana in _KATAKANA_TO_HIRAGANA.items()}
+
+
+def normalize(text):
+    """検索用の正規化（NFKC で全角英数・半角カナを統一し、小文字・ひらがなに変換。空白は除く）"""
+    text = unicodedata.normalize("NFKC", text).lower().translate(_KATAKANA_TO_HIRAGANA)
+    return "".join(text.split())
+
+
+def ngrams(text, size=NGRAM_SIZE):
+    """文字列に含まれる n-gram（size より短い場合は文字列全体）"""
+    if len(text) <= size:
+        return {text}
+    return {text[i : i + size] for i in range(len(text) - size + 1)}
+
+
+@dataclass(frozen=True)
+class BrandEntry:
+    id: int
+    brand_name: str
+    brand_name_kana: str
+    is_popular: bool
+    keys: tuple  # 正規化したブランド名・カナ名
+
+    def to_dict(self):
+        """BrandSerializer と同じ形式"""
+        return {
+            "id": self.id,
+            "brand_name": self.brand_name,
+            "brand_name_kana": self.brand_name_kana,
+            "is_popular": self.is_popular,
+        }
+
+
+class BrandSearchIndex:
+    """
+    ブランドの部分一致検索のインデックス
+    3文字以上の入力は trigram の転置インデックスで候補を絞り込み、短い入力は1文字の転置インデックスで絞り込む
+    """
+
+    def __init__(self, brands, version=None):
+        self.version = version
+        self.entries = [
+            BrandEntry(
+                id=brand.id,
+                brand_name=brand.brand_name,
+                brand_name_kana=brand.brand_name_kana,
+                is_popular=brand.is_popular,
+                keys=(normalize(brand.brand_name), normalize(brand.brand_name_kana)),
+            )
+            for brand in brands
+        ]
+        # 空の入力の場合の並び順（人気ブランドを先頭にブランド名順）
+        self.default_order = sorted(self.entries, key=lambda entry: (not entry.is_popular, entry.brand_name))
+
+        self.postings = {}
+        for index, entry in enumerate(self.entries):
+            for key in entry.keys:
+                for gram in ngrams(key) | set(key):
+                    self.postings.setdefault(gram, set()).add(index)
+
+    def _candidates(self, query):
+        """クエリを含む可能性のあるブランドの番号（転置インデックスの積集合）"""
+        grams = ngrams(query) if len(query) >= NGRAM_SIZE else set(query)
+        candidates = None
+        for gram in sorted(grams, key=lambda gram: len(self.postings.get(gram, ()))):
+            posting = self.postings.get(gram)
+            if not posting:
+                return set()
+            candidates = set(posting) if candidates is None else candidates & posting
+        return candidates
+
+    def search(self, query, limit=MAX_RESULTS):
+        """
+        ブランド名・カナ名の部分一致で検索
+        並び順: 人気ブランド > 前方一致 > 部分一致（一致した位置が前のもの） > ブランド名が短いもの
+        """
+        query = normalize(query)
+        if not query:
+            return [entry.to_dict() for entry in self.default_order[:limit]]
+
+        ranked = []
+        for index in self._candidates(query):
+            entry = self.entries[index]
+            positions = [key.find(query) for key in entry.keys if query in key]
+            if not positions:
+                continue
+            position = min(positions)
+            ranked.append(
+                ((not entry.is_popular, position != 0, position, len(entry.brand_name), entry.brand_name), entry)
+            )
+
+        ranked.sort(key=lambda ranked_entry: ranked_entry[0])
+        return [entry.to_dict() for _, entry in ranked[:limit]]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_brand_index():
+    """最新のインデックスを取得（ブランドが変更された場合は再構築）"""
+    global _index
+    version = get_version(BRAND_SEARCH_INDEX_NAME)
+    index = _index
+    if index is not None and index.version == version:
+        return index
+
+    with _index_lock:
+        if _index is None or _index.version != version:
+            _index = BrandSearchIndex(Brand.objects.all(), version)
+        return _index
+
+
+def warm_brand_index():
+    """起動時にインデックスを構築（DBに接続できない場合は最初の検索時に構築）"""
+    if _get_backend() != BRAND_SEARCH_BACKEND_MEMORY:
+        return
+    try:
+        get_brand_index()
+    except DatabaseError as e:
+        logger.warning(f"Failed to build brand search index at startup: {e}")
+
+
+def search_brands_trigram(query, limit=MAX_RESULTS):
+    """
+    pg_trgm のインデックスを使用してブランド名・カナ名の部分一致で検索
+    並び順: 人気ブランド > 類似度（ブランド名・カナ名の高い方）
+    カナ名はカタカナで登録されているため、入力のひらがなはカタカナに変換して検索する
+    """
+    name_query = unicodedata.normalize("NFKC", query).strip()
+    brands = Brand.objects.all()
+    if name_query:
+        kana_query = name_query.translate(_HIRAGANA_TO_KATAKANA)
+        brands = (
+            brands.filter(Q(brand_name__icontains=name_query) | Q(brand_name_kana__icontains=kana_query))
+            .annotate(
+                similarity=Greatest(
+                    TrigramSimilarity("brand_name", name_query), TrigramSimilarity("brand_name_kana", kana_query)
+                )
+            )
+            .order_by("-is_popular", "-similarity", "brand_name")
+        )
+    else:
+        brands = brands.order_by("-is_popular", "brand_name")
+    return list(brands.values("id", "brand_name", "brand_name_kana", "is_popular")[:limit])
+
+
+def _get_backend():
+    return getattr(settings, "BRAND_SEARCH_BACKEND", BRAND_SEARCH_BACKEND_MEMORY)
+
+
+def search_brands(query, limit=None):
+    """ブランドを検索（BrandSerializer と同じ形式の辞書のリスト）"""
+    limit = limit or getattr(settings, "BRAND_SEARCH_LIMIT", MAX_RESULTS)
+    if _get_backend() == BRAND_SEARCH_BACKEND_TRIGRAM:
+        return search_brands_trigram(query, limit)
+    return get_brand_index().search(query, limit)
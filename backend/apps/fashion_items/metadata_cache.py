@@ -0,0 +1,101 @@
+"""
+登録時に必要なデータ（カテゴリー・シーズンなどのマスタデータ）のレスポンスのキャッシュ
+シリアライズ済みのデータとその内容のハッシュ（ETag）をプロセス内に保持し、
+If-None-Match が一致する場合はDBを参照せずに 304 を返す
+
+マスタデータの保存・削除（loaddata を含む）時にバージョンを更新し、各プロセスのキャッシュを無効にする。
+バージョンは複数のワーカー・loaddata を実行したプロセスの間で共有するため settings.METADATA_CACHE_ALIAS のキャッシュに保存する
+"""
+
+import hashlib
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+METADATA_CACHE_ALIAS = "default"
+METADATA_MAX_AGE = 60 * 60 * 24  # ブラウザで再検証せずに使用できる期間（秒）
+
+# 名前ごとの (バージョン, データ, ETag)
+_payloads = {}
+_payloads_lock = threading.Lock()
+
+
+def _get_cache():
+    return caches[getattr(settings, "METADATA_CACHE_ALIAS", METADATA_CACHE_ALIAS)]
+
+
+def _version_key(name):
+    return f"metadata:version:{name}"
+
+
+def get_version(name):
+    """現在のバージョンを取得（未設定の場合は新しく発行）"""
+    cache = _get_cache()
+    key = _version_key(name)
+    version = cache.get(key)
+    if version is None:
+        # 他のプロセスが同時に発行した場合はそちらを使用
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate(name):
+    """バージョンを更新し、すべてのプロセスのキャッシュを無効にする"""
+    _get_cache().set(_version_key(name), uuid.uuid4().hex, None)
+    with _payloads_lock:
+        _payloads.pop(name, None)
+
+
+def get_payload(name, build):
+    """
+    シリアライズ済みのデータと ETag を取得
+    build: キャッシュがない場合にデータ（serializer.data）を生成する関数
+    """
+    version = get_version(name)
+    with _payloads_lock:
+        entry = _payloads.get(name)
+    if entry is not None and entry[0] == version:
+        return entry[1], entry[2]
+
+    data = build()
+    etag = quote_etag(hashlib.sha256(JSONRenderer().render(data)).hexdigest()[:32])
+    with _payloads_lock:
+        _payloads[name] = (version, data, etag)
+    return data, etag
+
+
+def metadata_response(request, name, build):
+    """ETag・Cache-Control を付けたレスポンスを返す（クライアントのデータが最新の場合は 304）"""
+    data, etag = get_payload(name, build)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={getattr(settings, 'METADATA_MAX_AGE', METADATA_MAX_AGE)}",
+    }
+
+    # If-None-Match は弱い比較（W/ の有無を区別しない）
+    client_etags = [
+        client_etag.removeprefix("W/") for client_etag in parse_etags(request.headers.get("If-None-Match", ""))
+    ]
+    if "*" in client_etags or etag in client_etags:
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(data, headers=headers)
+
+
+def invalidate_on_change(name, models):
+    """モデルの保存・削除時（loaddata を含む）にキャッシュを無効にするシグナルを登録"""
+
+    def handler(sender, **kwargs):
+        invalidate(name)
+
+    for model in models:
+        uid = f"metadata:{name}:{model._meta.label}"
+        post_save.connect(handler, sender=model, weak=False, dispatch_uid=f"{uid}:save")
+        post_delete.connect(handler, sender=model, weak=False, dispatch_uid=f"{uid}:delete")
@@ -0,0 +1,32 @@
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("fashion_items", "0001_initial"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="brand",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("brand_name"), name="gin_trgm_ops"
+                ),
+                name="brand_name_trgm_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="brand",
+            index=django.contrib.postgres.indexes.GinIndex(
+                django.contrib.postgres.indexes.OpClass(
+                    django.db.models.functions.text.Upper("brand_name_kana"), name="gin_trgm_ops"
+                ),
+                name="brand_name_kana_trgm_idx",
+            ),
+        ),
+    ]
@@ -1,5 +1,7 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.core.files.storage import default_storage
 from django.db import models
+from django.db.models.functions import Upper
 
 from apps.accounts.models import CustomUser
 from core.mixins.timestamp_mixin import TimestampMixin
@@ -39,6 +41,12 @@ class Brand(models.Model):
 
     class Meta:
         ordering = ["brand_name"]  # brand_name でソート
+        indexes = [
+            # ブランド検索（BRAND_SEARCH_BACKEND = "trigram"）の部分一致検索用の pg_trgm インデックス
+            # icontains は UPPER(列) LIKE UPPER(入力) となるため UPPER(列) に作成する
+            GinIndex(OpClass(Upper("brand_name"), name="gin_trgm_ops"), name="brand_name_trgm_idx"),
+            GinIndex(OpClass(Upper("brand_name_kana"), name="gin_trgm_ops"), name="brand_name_kana_trgm_idx"),
+        ]
 
     def __str__(self):
         return self.brand_name
@@ -82,6 +90,14 @@ class PriceRange(models.Model):
 
 
 # ファッションアイテム
+class FashionItemQuerySet(models.QuerySet):
+    def with_details(self):
+        """詳細シリアライザーで返す関連データをまとめて取得（アイテム数によらずクエリ数を一定にする）"""
+        return self.select_related("sub_category", "brand", "price_range", "design", "main_color").prefetch_related(
+            "seasons"
+        )
+
+
 class FashionItem(TimestampMixin, models.Model):
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE)  # ユーザーとの関連付け
     sub_category = models.ForeignKey(SubCategory, on_delete=models.DO_NOTHING)
@@ -94,8 +110,14 @@ class FashionItem(TimestampMixin, models.Model):
     is_owned = models.BooleanField(default=True)
     is_old_clothes = models.BooleanField(default=False)
 
+    objects = FashionItemQuerySet.as_manager()
+
     class Meta:
-        ordering = ["-created_at"]  # 作成日時の降順でソート
+        ordering = ["-created_at", "-id"]  # 作成日時の降順でソート（同じ作成日時は id の降順）
+        indexes = [
+            # 一覧のキーセットによるページネーション（KeysetPagination）用
+            models.Index(fields=["user", "-created_at", "-id"], name="fashion_item_user_created_idx"),
+        ]
 
     def __str__(self):
         brand_name = self.brand.brand_name if self.brand else "No Brand"
@@ -0,0 +1,9 @@
+from .brand_search import BRAND_SEARCH_INDEX_NAME
+from .metadata_cache import invalidate_on_change
+from .models import Brand, Category, Color, Design, PriceRange, Season, SubCategory
+
+# 登録時に必要なデータのキャッシュをマスタデータの変更時に無効にする
+invalidate_on_change("fashion_items", [Category, SubCategory, Season, Design, Color, PriceRange, Brand])
+
+# ブランド検索のインデックスをブランドの変更時に再構築する
+invalidate_on_change(BRAND_SEARCH_INDEX_NAME, [Brand])
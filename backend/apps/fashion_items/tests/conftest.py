@@ -4,11 +4,15 @@ import uuid
 
 import pytest
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from PIL import Image
 from rest_framework.test import APIClient, APIRequestFactory
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from apps.accounts.models import CustomUser
+from apps.fashion_items.brand_search import BRAND_SEARCH_INDEX_NAME
+from apps.fashion_items.metadata_cache import invalidate
 from apps.fashion_items.models import Brand, Category, Color, Design, FashionItem, PriceRange, Season, SubCategory
 
 
@@ -44,6 +48,14 @@ def generate_unique_id():
     return uuid.uuid4().hex[:8]
 
 
+@pytest.fixture(autouse=True)
+def metadata_cache(settings):
+    """登録時に必要なデータのキャッシュをテストごとに初期化（プロセス内のキャッシュに保存）"""
+    settings.METADATA_CACHE_ALIAS = "default"
+    invalidate("fashion_items")
+    invalidate(BRAND_SEARCH_INDEX_NAME)
+
+
 @pytest.fixture
 def user():
     """テスト用ユーザーを作成"""
@@ -126,6 +138,54 @@ def fashion_item(user, subcategory, brand, season, design, color, price_range, s
     return item
 
 
+@pytest.fixture
+def create_fashion_items(user, subcategory, brand, season, design, color, price_range, sample_image):
+    """関連データをすべて設定したファッションアイテムを指定した件数作成するヘルパー"""
+
+    def create(count):
+        items = []
+        for _ in range(count):
+            item = FashionItem.objects.create(
+                user=user,
+                sub_category=subcategory,
+                brand=brand,
+                price_range=price_range,
+                design=design,
+                main_color=color,
+                image=sample_image,
+            )
+            item.seasons.add(season)
+            items.append(item)
+        return items
+
+    return create
+
+
+@pytest.fixture
+def assert_constant_page_queries(auth_client, create_fashion_items):
+    """
+    ページ内のアイテム数によらず、GET リクエストで発行されるクエリ数が一定であることを確認するヘルパー
+    page_sizes の件数までアイテムを増やしながら url を取得し、SELECT の数を比較する
+    （ATOMIC_REQUESTS が有効な場合の SAVEPOINT などはデータの取得ではないため数えない）
+    """
+
+    def check(url, page_sizes=(1, 10)):
+        query_counts = []
+        created = 0
+        for page_size in page_sizes:
+            create_fashion_items(page_size - created)
+            created = page_size
+
+            with CaptureQueriesContext(connection) as queries:
+                response = auth_client.get(url)
+            assert response.status_code == 200
+            query_counts.append(sum(query["sql"].startswith("SELECT") for query in queries.captured_queries))
+
+        assert len(set(query_counts)) == 1, f"クエリ数がアイテム数によって変わっています: {query_counts}"
+
+    return check
+
+
 @pytest.fixture
 def api_client():
     """未認証APIクライアント"""
@@ -0,0 +1,123 @@
+import pytest
+from django.db import connection
+
+from apps.fashion_items import brand_search
+from apps.fashion_items.brand_search import (
+    BrandSearchIndex,
+    get_brand_index,
+    normalize,
+    search_brands,
+    search_brands_trigram,
+)
+from apps.fashion_items.models import Brand
+
+
+def make_index(*brands):
+    """(ブランド名, カナ名, 人気ブランドか) からインデックスを作成"""
+    return BrandSearchIndex(
+        Brand(id=index, brand_name=name, brand_name_kana=kana, is_popular=is_popular)
+        for index, (name, kana, is_popular) in enumerate(brands, start=1)
+    )
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ("ユニクロ", "ゆにくろ"),
+        ("ﾕﾆｸﾛ", "ゆにくろ"),
+        ("ＵＮＩＱＬＯ", "uniqlo"),
+        ("Beams Plus", "beamsplus"),
+        ("ヴィヴィアン", "ゔぃゔぃあん"),
+    ],
+)
+def test_normalize(text, expected):
+    """全角/半角・大文字/小文字・カタカナ/ひらがなの正規化のテスト"""
+    assert normalize(text) == expected
+
+
+def test_search_normalized_query():
+    """表記の異なる入力でも一致することのテスト"""
+    index = make_index(("Uniqlo", "ユニクロ", True), ("GU", "ジーユー", True))
+
+    for query in ["ゆにく", "ﾕﾆｸ", "ＵＮＩ", "niq", "ク"]:
+        assert [brand["brand_name"] for brand in index.search(query)] == ["Uniqlo"], query
+
+
+def test_search_ranking():
+    """人気ブランド > 前方一致 > 部分一致の順に並ぶことのテスト"""
+    index = make_index(
+        ("Nano Universe", "ナノユニバース", False),
+        ("Universal Works", "ユニバーサルワークス", False),
+        ("Uniqlo", "ユニクロ", True),
+        ("Sunny Uni", "サニーユニ", True),
+    )
+
+    assert [brand["brand_name"] for brand in index.search("uni")] == [
+        "Uniqlo",
+        "Sunny Uni",
+        "Universal Works",
+        "Nano Universe",
+    ]
+    assert index.search("") == sorted(index.search(""), key=lambda brand: not brand["is_popular"])
+
+
+def test_search_limit():
+    """検索結果の上限のテスト"""
+    index = make_index(*[(f"Test Brand {i}", f"テストブランド{i}", False) for i in range(25)])
+
+    assert len(index.search("test", limit=20)) == 20
+    assert index.search("xyz") == []
+
+
+@pytest.mark.django_db
+def test_search_without_queries(brand, django_assert_num_queries):
+    """インデックスの構築後はDBを参照せずに検索することのテスト"""
+    get_brand_index()
+
+    with django_assert_num_queries(0):
+        results = search_brands(brand.brand_name_kana[:4])
+
+    assert results[0] == {
+        "id": brand.id,
+        "brand_name": brand.brand_name,
+        "brand_name_kana": brand.brand_name_kana,
+        "is_popular": brand.is_popular,
+    }
+
+
+@pytest.mark.django_db
+def test_index_refreshed_on_change(brand):
+    """ブランドの変更時にインデックスが再構築されることのテスト"""
+    assert search_brands("ビームス") == []
+
+    created = Brand.objects.create(brand_name="BEAMS", brand_name_kana="ビームス")
+    assert [result["id"] for result in search_brands("びーむ")] == [created.id]
+
+    created.delete()
+    assert search_brands("びーむ") == []
+
+
+@pytest.mark.django_db
+def test_trigram_backend_selected_by_setting(settings, mocker):
+    """settings.BRAND_SEARCH_BACKEND・BRAND_SEARCH_LIMIT で検索方法と件数を切り替えられることのテスト"""
+    search_trigram = mocker.patch.object(brand_search, "search_brands_trigram", return_value=[])
+    settings.BRAND_SEARCH_BACKEND = "trigram"
+    settings.BRAND_SEARCH_LIMIT = 5
+
+    assert search_brands("uni") == []
+    search_trigram.assert_called_once_with("uni", 5)
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != "postgresql", reason="pg_trgm は PostgreSQL のみ")
+def test_search_brands_trigram():
+    """pg_trgm による検索が同じ形式で人気ブランド・類似度の順に返すことのテスト"""
+    Brand.objects.create(brand_name="Universal Works", brand_name_kana="ユニバーサルワークス")
+    Brand.objects.create(brand_name="Uni", brand_name_kana="ユニ")
+    uniqlo = Brand.objects.create(brand_name="Uniqlo", brand_name_kana="ユニクロ", is_popular=True)
+
+    assert [brand["brand_name"] for brand in search_brands_trigram("uni")] == ["Uniqlo", "Uni", "Universal Works"]
+    assert search_brands_trigram("ゆにくろ") == [
+        {"id": uniqlo.id, "brand_name": "Uniqlo", "brand_name_kana": "ユニクロ", "is_popular": True}
+    ]
+    assert search_brands_trigram("ﾕﾆｸﾛ", limit=1)[0]["id"] == uniqlo.id
@@ -1,10 +1,13 @@
 import pytest
 from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIRequestFactory, force_authenticate
 
-from apps.fashion_items.models import Brand, FashionItem
+from apps.fashion_items.models import Brand, Category, Color, Design, FashionItem, PriceRange, Season, SubCategory
 from apps.fashion_items.views import FashionItemCountView
 
 
@@ -34,6 +37,46 @@ class TestMetaDataView:
         assert "popular_brands" in response.data
         assert all(brand["is_popular"] for brand in response.data["popular_brands"])
 
+    def test_not_modified(self, auth_client, category, color):
+        """ETag が一致する場合はマスタデータを参照せずに 304 を返すことのテスト"""
+        url = reverse("fashion_item_metadata")
+        response = auth_client.get(url)
+        etag = response["ETag"]
+        assert "max-age" in response["Cache-Control"]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = auth_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response["ETag"] == etag
+
+        master_tables = [
+            model._meta.db_table for model in [Category, SubCategory, Season, Design, Color, PriceRange, Brand]
+        ]
+        assert not [
+            query["sql"]
+            for query in queries.captured_queries
+            if query["sql"].startswith("SELECT") and any(f'"{table}"' in query["sql"] for table in master_tables)
+        ]
+
+    def test_invalidated_on_change(self, auth_client, category):
+        """マスタデータの変更時にキャッシュが無効になることのテスト"""
+        url = reverse("fashion_item_metadata")
+        etag = auth_client.get(url)["ETag"]
+
+        Color.objects.create(id="black", color_name="黒", color_code="#000000")
+
+        response = auth_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == status.HTTP_200_OK
+        assert response["ETag"] != etag
+        assert "black" in [color["id"] for color in response.data["colors"]]
+
+        # フィクスチャの再読み込み
+        call_command("loaddata", "initial_season_data", verbosity=0)
+
+        response = auth_client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["seasons"]
+
 
 @pytest.mark.django_db
 class TestBrandSearchView:
@@ -121,6 +164,68 @@ class TestFashionItemViewSet:
         assert response.status_code == status.HTTP_200_OK
         assert len(response.data) >= 1
 
+    def test_list_queries(self, assert_constant_page_queries):
+        """一覧取得のクエリ数がアイテム数によらず一定であることのテスト"""
+        assert_constant_page_queries(reverse("fashionitem-list"))
+
+    def test_by_category_queries(self, assert_constant_page_queries, category):
+        """カテゴリー別・最近のアイテム取得のクエリ数がアイテム数によらず一定であることのテスト"""
+        url = reverse("fashionitem-by-category")
+        assert_constant_page_queries(f"{url}?category_id={category.id}")
+        assert_constant_page_queries(f"{url}?category_id=recent", page_sizes=(10, 20))
+
+    def test_cursor_pagination(self, auth_client, create_fashion_items):
+        """キーセットによるページネーションで同じ作成日時のアイテムも重複・抜けなく取得できることのテスト"""
+        items = create_fashion_items(25)
+        FashionItem.objects.filter(id__in=[item.id for item in items[5:15]]).update(created_at=items[0].created_at)
+        expected = list(FashionItem.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+
+        url = f"{reverse('fashionitem-list')}?cursor="
+        received = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = auth_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            assert "count" not in response.data
+            assert not any("COUNT(" in query["sql"].upper() for query in queries.captured_queries)
+            received.extend(item["id"] for item in response.data["results"])
+            url = response.data["next"]
+
+        assert received == expected
+
+    def test_cursor_pagination_by_category(self, auth_client, create_fashion_items, category):
+        """カテゴリー別のアイテム取得でのキーセットによるページネーションのテスト"""
+        items = create_fashion_items(11)
+        url = reverse("fashionitem-by-category")
+
+        response = auth_client.get(f"{url}?category_id={category.id}&cursor=")
+        assert len(response.data["results"]) == 10
+        response = auth_client.get(response.data["next"])
+        assert [item["id"] for item in response.data["results"]] == [items[0].id]
+        assert response.data["next"] is None
+
+    def test_invalid_cursor(self, auth_client):
+        """不正なカーソルのテスト"""
+        response = auth_client.get(f"{reverse('fashionitem-list')}?cursor=invalid")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_retrieve_queries(self, auth_client, create_fashion_items):
+        """個別取得で関連データをまとめて取得する（シーズンの数によらずクエリ数が一定である）ことのテスト"""
+        item, item_with_seasons = create_fashion_items(2)
+        item_with_seasons.seasons.add(*[Season.objects.create(id=f"season_{i}", season_name=f"S{i}") for i in range(3)])
+
+        query_counts = []
+        for fashion_item in [item, item_with_seasons]:
+            url = reverse("fashionitem-detail", kwargs={"pk": fashion_item.id})
+            with CaptureQueriesContext(connection) as queries:
+                response = auth_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            assert response.data["brand"]["id"] == fashion_item.brand_id
+            query_counts.append(sum(query["sql"].startswith("SELECT") for query in queries.captured_queries))
+
+        assert len(response.data["seasons"]) == 4
+        assert query_counts[0] == query_counts[1]
+
     def test_get_recent_items(self, auth_client, fashion_item):
         """最近のアイテム取得テスト"""
         url = reverse("fashionitem-by-category")
@@ -1,4 +1,3 @@
-from django.db.models import Q
 from django.utils import timezone
 from rest_framework import generics, status, viewsets
 from rest_framework.decorators import action
@@ -6,6 +5,10 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from core.utils.pagination import KeysetPagination
+
+from .brand_search import search_brands
+from .metadata_cache import metadata_response
 from .models import Brand, Category, Color, Design, FashionItem, PriceRange, Season
 from .serializers import (
     BrandSerializer,
@@ -24,8 +27,13 @@ class MetaDataView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
+        # マスタデータが変更されるまではシリアライズ済みのデータを返す（ETag が一致する場合は 304）
+        return metadata_response(request, "fashion_items", self.build)
+
+    @staticmethod
+    def build():
         data = {
-            "categories": Category.objects.all(),
+            "categories": Category.objects.prefetch_related("subcategories"),
             "seasons": Season.objects.all(),
             "designs": Design.objects.all(),
             "colors": Color.objects.all(),
@@ -34,24 +42,29 @@ class MetaDataView(APIView):
         }
 
         serializer = MetaDataSerializer(data)
-        return Response(serializer.data)
+        return serializer.data
 
 
 class BrandSearchView(generics.ListAPIView):
-    """ブランド検索ビュー"""
+    """
+    ブランド検索ビュー
+    入力ごとに呼ばれるため、プロセス内のインデックスで検索する（DBは参照しない）
+    """
 
     serializer_class = BrandSerializer
     permission_classes = [IsAuthenticated]
     pagination_class = None  # ページネーションを無効化
 
-    def get_queryset(self):
-        query = self.request.query_params.get("query", "")
-        return Brand.objects.filter(Q(brand_name__icontains=query) | Q(brand_name_kana__icontains=query))[:20]
+    def list(self, request, *args, **kwargs):
+        query = request.query_params.get("query", "")
+        # インデックスの結果は BrandSerializer と同じ形式
+        return Response(search_brands(query))
 
 
 class FashionItemViewSet(viewsets.ModelViewSet):
     queryset = FashionItem.objects.all()
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination  # ?cursor= でキーセットによるページネーション
 
     # 使用シリアライザーの決定
     def get_serializer_class(self):
@@ -61,7 +74,11 @@ class FashionItemViewSet(viewsets.ModelViewSet):
 
     # ユーザーが所有するアイテムのみをフィルタリング
     def get_queryset(self):
-        return FashionItem.objects.filter(user=self.request.user)
+        queryset = FashionItem.objects.filter(user=self.request.user)
+        # 詳細シリアライザーで返す一覧・個別取得では関連データをまとめて取得
+        if self.action in ["list", "retrieve", "by_category"]:
+            queryset = queryset.with_details()
+        return queryset
 
     # ファッションアイテム作成
     def perform_create(self, serializer):
@@ -88,14 +105,14 @@ class FashionItemViewSet(viewsets.ModelViewSet):
             recent_items = (
                 self.get_queryset()
                 .filter(created_at__gte=timezone.now() - timezone.timedelta(days=30))
-                .order_by("-created_at")
+                .order_by("-created_at", "-id")
             )
             page = self.paginate_queryset(recent_items)
             serializer = self.get_serializer(page, many=True)
             return self.get_paginated_response(serializer.data)
 
         # 通常のカテゴリー処理
-        items = self.get_queryset().filter(sub_category__category_id=category_id).order_by("-created_at")
+        items = self.get_queryset().filter(sub_category__category_id=category_id).order_by("-created_at", "-id")
         page = self.paginate_queryset(items)
         serializer = self.get_serializer(page, many=True)
         return self.get_paginated_response(serializer.data)
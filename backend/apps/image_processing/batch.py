@@ -0,0 +1,88 @@
+"""
+複数画像の一括背景除去
+ワーカープロセスの空き枠に順次登録し、完了した順に結果を返す
+"""
+
+import logging
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from .exceptions import ImageProcessingError, JobTimeoutError, PoolBusyError
+from .executor import get_pool
+from .pipeline import remove_background
+from .result_cache import find_cached_result, store_result
+
+logger = logging.getLogger(__name__)
+
+# 他のリクエストで枠が埋まっている場合の再登録の間隔（秒）
+SUBMIT_RETRY_INTERVAL = 0.1
+
+
+def iter_batch_results(images, options):
+    """
+    画像ごとの背景除去結果を完了した順に返すジェネレーター
+    (index, result, error) を返し、成功時は error が None、失敗時は result が None
+    """
+    pool = get_pool()
+    pending = deque()
+
+    # キャッシュ済みの結果は画像処理を待たずに返す
+    for index, image_bytes in enumerate(images):
+        cache_key, result = find_cached_result(image_bytes, options)
+        if result is not None:
+            yield index, result, None
+        else:
+            pending.append((index, image_bytes, cache_key))
+
+    running = {}
+    busy_since = None
+
+    try:
+        while pending or running:
+            # 待ち行列に空きがある分だけ登録（プール全体の上限は他のリクエストと共有）
+            while pending:
+                index, image_bytes, cache_key = pending[0]
+                try:
+                    future = pool.submit(remove_background, image_bytes, **options)
+                except PoolBusyError:
+                    break
+                pending.popleft()
+                running[future] = (index, cache_key)
+                busy_since = None
+
+            if not running:
+                # 他のリクエストの処理が終わるまで待ち、制限時間を超えた場合は残りを 503 とする
+                busy_since = busy_since or time.monotonic()
+                if pool.job_timeout and time.monotonic() - busy_since > pool.job_timeout:
+                    while pending:
+                        yield pending.popleft()[0], None, PoolBusyError()
+                else:
+                    time.sleep(SUBMIT_RETRY_INTERVAL)
+                continue
+
+            done, _ = wait(running, timeout=pool.job_timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # 制限時間内に1件も完了しない場合は実行中のものをタイムアウトとする
+                for future, (index, _) in list(running.items()):
+                    future.cancel()
+                    del running[future]
+                    yield index, None, JobTimeoutError()
+                continue
+
+            for future in done:
+                index, cache_key = running.pop(future)
+                try:
+                    result = future.result()
+                except ImageProcessingError as e:
+                    yield index, None, e
+                except Exception as e:
+                    logger.error(f"Batch background removal failed: {e}", exc_info=True)
+                    yield index, None, ImageProcessingError(str(e))
+                else:
+                    store_result(cache_key, result)
+                    yield index, result, None
+    finally:
+        # クライアントの切断などで途中終了した場合は未実行のジョブを取り消す
+        for future in running:
+            future.cancel()
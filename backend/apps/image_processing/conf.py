@@ -0,0 +1,35 @@
+from django.conf import settings
+
+# settings.IMAGE_PROCESSING で上書き可能な設定値
+DEFAULTS = {
+    "WORKERS": 2,  # 背景除去を実行するワーカープロセス数
+    "CV2_THREADS": 1,  # ワーカープロセスごとのOpenCV内部スレッド数
+    "MAX_QUEUE_SIZE": 8,  # 実行待ちにできるジョブ数（超えた場合は503を返す）
+    "JOB_TIMEOUT": 30,  # 1ジョブあたりの制限時間（秒）
+    "JOB_CACHE_ALIAS": "default",  # ジョブの状態・結果を保存するキャッシュ
+    "JOB_TTL": 60 * 10,  # ジョブの保持期間（秒）
+    "MAX_BATCH_SIZE": 20,  # 一括背景除去で1リクエストに含められる画像の枚数
+    "STRATEGY_MODE": "fallback",  # 背景除去戦略の選択モード（fallback / scored）
+    "GOOD_ENOUGH_SCORE": 0.6,  # scored モードでGrabCutを省略するスコアの閾値
+    "GRABCUT_MODE": "full",  # GrabCutの実行モード（full / pyramid）
+    # 背景除去結果のキャッシュ（None の場合は無効）
+    # BACKEND: "disk"（LOCATION に保存） / "django"（CACHE_ALIAS のキャッシュに保存）
+    # RESCAN_INTERVAL: 他のプロセスが保存した結果を容量の判定に取り込み直す最短の間隔（秒、デフォルト60）
+    "RESULT_CACHE": None,
+    # 段階ごとの処理時間のヒストグラムをプロセスごとに書き出すディレクトリ（None の場合は集計しない）
+    "TIMING_HISTOGRAM_DIR": None,
+}
+
+
+def get_setting(name):
+    """画像処理の設定値を取得（未設定の場合はデフォルト値）"""
+    return getattr(settings, "IMAGE_PROCESSING", {}).get(name, DEFAULTS[name])
+
+
+def get_pipeline_options():
+    """背景除去パイプラインに渡すオプション"""
+    return {
+        "strategy_mode": get_setting("STRATEGY_MODE"),
+        "good_enough_score": get_setting("GOOD_ENOUGH_SCORE"),
+        "grabcut_mode": get_setting("GRABCUT_MODE"),
+    }
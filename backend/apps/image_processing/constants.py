@@ -0,0 +1,29 @@
+import cv2
+
+# 背景除去処理
+MAX_SIZE = 650
+QUALITY_PARAM = [cv2.IMWRITE_WEBP_QUALITY, 75]
+MIN_FOREGROUND_RATIO = 0.01  # 前景検出の最小比率
+MAX_FOREGROUND_RATIO = 0.95  # 前景検出の最大比率（これ以上は背景ごと前景と判定したとみなす）
+MAX_BORDER_FOREGROUND_RATIO = 0.5  # 画像の外周の前景比率の上限（これを超えるマスクは前景と背景が反転しているとみなす）
+# JPEGのデコード時の縮小率と対応するフラグ（縮小率の大きい順）
+REDUCED_DECODE_FLAGS = [
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+]
+
+# GrabCutの実行モード
+GRABCUT_MODE_FULL = "full"  # 前処理後の解像度でGrabCutを実行
+GRABCUT_MODE_PYRAMID = "pyramid"  # 縮小画像でGrabCutを実行し、境界付近のみ元解像度で再判定
+PYRAMID_MIN_SIZE = 80  # 縮小後の画像の短辺の最小値
+GMM_COMPONENTS = 5  # GrabCutが使用するGMMの混合数
+
+# 背景除去戦略の選択モード
+STRATEGY_MODE_FALLBACK = "fallback"  # GrabCutから順に試し、前景が検出できた時点で採用
+STRATEGY_MODE_SCORED = "scored"  # 軽量な手法から順に採点し、十分なスコアならGrabCutを省略
+
+# 非同期ジョブ
+JOB_STATUS_PENDING = "pending"
+JOB_STATUS_SUCCESS = "success"
+JOB_STATUS_ERROR = "error"
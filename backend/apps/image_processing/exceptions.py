@@ -0,0 +1,34 @@
+"""
+背景除去処理で発生する例外
+ワーカープロセスから送り返されるため、Django/DRFに依存しない通常の例外として定義する
+"""
+
+
+class ImageProcessingError(Exception):
+    status_code = 500
+    default_message = "Image processing failed"
+    retry_after = None  # Retry-After ヘッダーの値（秒）
+
+    def __init__(self, message=None):
+        super().__init__(message or self.default_message)
+
+
+class InvalidImageError(ImageProcessingError):
+    status_code = 400
+    default_message = "Failed to load image"
+
+
+class BackgroundRemovalError(ImageProcessingError):
+    status_code = 500
+    default_message = "All background removal methods failed"
+
+
+class PoolBusyError(ImageProcessingError):
+    status_code = 503
+    default_message = "Image processing is busy. Please try again later"
+    retry_after = 5
+
+
+class JobTimeoutError(ImageProcessingError):
+    status_code = 504
+    default_message = "Image processing timed out"
@@ -0,0 +1,187 @@
+"""
+背景除去処理用のプロセスプール
+同時実行数・待ち行列の長さ・処理時間を制限し、アップロードの集中によるCPU/メモリの枯渇を防ぐ
+"""
+
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from .conf import get_setting
+from .exceptions import JobTimeoutError, PoolBusyError
+from .pipeline import init_worker, warm_up
+
+logger = logging.getLogger(__name__)
+
+# 実行時間を監視する間隔（秒）
+WATCHDOG_INTERVAL = 0.2
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class SegmentationPool:
+    """
+    プロセス数と待ち行列を制限したプロセスプール
+    実行中のジョブが job_timeout を超えた場合はワーカープロセスを停止してプールを作り直し、
+    処理が終わらないジョブが枠とワーカーを占有し続けないようにする
+    """
+
+    def __init__(self, workers, cv2_threads=1, max_queue_size=0, job_timeout=None):
+        self.workers = workers
+        self.cv2_threads = cv2_threads
+        self.job_timeout = job_timeout
+        # 実行中 + 待機中のジョブ数の上限
+        self._slots = threading.BoundedSemaphore(workers + max_queue_size)
+        self._lock = threading.Lock()
+        # 実行中のジョブと実行の開始を検知した時刻
+        self._started_at = {}
+        # 制限時間を超えたために停止したジョブ
+        self._timed_out = set()
+        self._executor = self._create_executor()
+
+        self._stopped = threading.Event()
+        if job_timeout:
+            threading.Thread(target=self._watch, name="segmentation-watchdog", daemon=True).start()
+
+    def _create_executor(self):
+        # fork だと親プロセスのスレッド状態を引き継ぐため spawn を使用
+        executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+            initargs=(self.cv2_threads,),
+        )
+
+        # 最初のリクエストを待たずにワーカープロセスを起動しておく
+        for _ in range(self.workers):
+            executor.submit(warm_up)
+        return executor
+
+    def submit(self, fn, *args, **kwargs):
+        """ジョブを登録（待ち行列が一杯の場合は PoolBusyError）"""
+        if not self._slots.acquire(blocking=False):
+            raise PoolBusyError()
+
+        try:
+            with self._lock:
+                inner = self._executor.submit(fn, *args, **kwargs)
+                self._started_at[inner] = None
+        except Exception:
+            self._slots.release()
+            raise
+
+        # 呼び出し元には停止時の例外を変換して伝えるため別の Future を返す
+        future = Future()
+        future.add_done_callback(lambda _: future.cancelled() and inner.cancel())
+        # 枠はワーカーでの処理が実際に終わった時点で解放する
+        inner.add_done_callback(lambda _: self._on_done(inner, future))
+        return future
+
+    def _on_done(self, inner, future):
+        with self._lock:
+            self._started_at.pop(inner, None)
+            timed_out = inner in self._timed_out
+            self._timed_out.discard(inner)
+        self._slots.release()
+
+        if not future.set_running_or_notify_cancel():
+            return
+        if inner.cancelled():
+            future.set_exception(PoolBusyError())
+            return
+
+        error = inner.exception()
+        if isinstance(error, BrokenProcessPool):
+            # 停止したジョブはタイムアウト、巻き添えで停止したジョブは再試行可能なエラーとする
+            error = JobTimeoutError() if timed_out else PoolBusyError()
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(inner.result())
+
+    def _watch(self):
+        """実行時間が job_timeout を超えたジョブがあればプールを作り直す"""
+        while not self._stopped.wait(WATCHDOG_INTERVAL):
+            now = time.monotonic()
+            with self._lock:
+                expired = []
+                for inner, started_at in self._started_at.items():
+                    if started_at is None:
+                        if inner.running():
+                            self._started_at[inner] = now
+                    elif now - started_at > self.job_timeout:
+                        expired.append(inner)
+            if expired:
+                self._recycle(expired)
+
+    def _recycle(self, expired):
+        """ワーカープロセスを停止し、新しいプールに切り替える（停止したプールのジョブは失敗として完了する）"""
+        logger.warning(f"Segmentation job exceeded {self.job_timeout}s; restarting worker processes")
+        with self._lock:
+            self._timed_out.update(expired)
+            old_executor = self._executor
+            self._executor = self._create_executor()
+            for inner in expired:
+                self._started_at.pop(inner, None)
+
+        # ProcessPoolExecutor は実行中のジョブを中断できないため、ワーカープロセスを直接停止する
+        for process in _worker_processes(old_executor):
+            process.terminate()
+        old_executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, fn, *args, **kwargs):
+        """ジョブを登録して結果を待つ（タイムアウトした場合は JobTimeoutError）"""
+        future = self.submit(fn, *args, **kwargs)
+
+        try:
+            return future.result(timeout=self.job_timeout)
+        except FuturesTimeoutError as e:
+            # 実行待ちのジョブは取り消し、実行中のジョブは監視スレッドがワーカーごと停止する
+            future.cancel()
+            raise JobTimeoutError() from e
+
+    def shutdown(self, wait=True):
+        self._stopped.set()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def _worker_processes(executor):
+    """
+    ProcessPoolExecutor のワーカープロセスの一覧を取得
+    公開APIがないため非公開属性 _processes（PID -> Process の辞書、CPython 3.11 で確認）を参照する。
+    Python の更新で属性がなくなった場合は停止できない旨をログに出力する
+    （tests/executor/test_segmentation_pool.py の test_worker_processes_available で検知する）
+    """
+    processes = getattr(executor, "_processes", None)
+    if processes is None:
+        if not hasattr(executor, "_processes"):
+            logger.error("ProcessPoolExecutor._processes is unavailable; timed-out workers cannot be terminated")
+        return []
+    return list(processes.values())
+
+
+def get_pool():
+    """プロセス内で共有するプールを取得（起動時に start_pool で生成していない場合は初回呼び出し時に生成）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SegmentationPool(
+                workers=get_setting("WORKERS"),
+                cv2_threads=get_setting("CV2_THREADS"),
+                max_queue_size=get_setting("MAX_QUEUE_SIZE"),
+                job_timeout=get_setting("JOB_TIMEOUT"),
+            )
+        return _pool
+
+
+def start_pool():
+    """ワーカーの起動時にプールとワーカープロセスを起動（最初のアップロードを待たせない）"""
+    try:
+        get_pool()
+    except Exception as e:
+        logger.warning(f"Failed to start segmentation pool at startup: {e}")
@@ -0,0 +1,112 @@
+"""
+背景除去の非同期ジョブ管理
+OpenCVの処理はワーカープロセスで実行し、状態と結果はキャッシュに保存する
+"""
+
+import logging
+import time
+import uuid
+from functools import partial
+
+from django.core.cache import caches
+
+from .conf import get_pipeline_options, get_setting
+from .constants import JOB_STATUS_ERROR, JOB_STATUS_PENDING, JOB_STATUS_SUCCESS
+from .exceptions import ImageProcessingError
+from .executor import get_pool
+from .metrics import record_timings
+from .pipeline import remove_background
+from .result_cache import find_cached_result, store_result
+
+logger = logging.getLogger(__name__)
+
+
+def _get_cache():
+    return caches[get_setting("JOB_CACHE_ALIAS")]
+
+
+def _job_key(job_id):
+    return f"image_processing:job:{job_id}"
+
+
+def _result_key(job_id):
+    return f"image_processing:job:{job_id}:result"
+
+
+def _save_job(job_id, job):
+    _get_cache().set(_job_key(job_id), job, get_setting("JOB_TTL"))
+
+
+def _save_result(job_id, user_id, result):
+    """完了したジョブの結果を保存"""
+    _get_cache().set(_result_key(job_id), result["image"], get_setting("JOB_TTL"))
+    _save_job(
+        job_id,
+        {
+            "user_id": user_id,
+            "status": JOB_STATUS_SUCCESS,
+            "strategy": result["strategy"],
+            "strategy_timings": result["strategy_timings"],
+            "process_time": result.get("process_time", 0.0),
+        },
+    )
+
+
+def _on_job_done(job_id, user_id, cache_key, submitted_at, future):
+    """ジョブ完了時に状態と結果を保存"""
+    try:
+        result = future.result()
+    except ImageProcessingError as e:
+        job = {"user_id": user_id, "status": JOB_STATUS_ERROR, "message": str(e), "status_code": e.status_code}
+    except Exception as e:
+        logger.error(f"Background removal job failed: {e}", exc_info=True)
+        job = {"user_id": user_id, "status": JOB_STATUS_ERROR, "message": str(e), "status_code": 500}
+    else:
+        store_result(cache_key, result)
+        _save_result(job_id, user_id, result)
+        record_timings("job", result, time.time() - submitted_at)
+        return
+
+    _save_job(job_id, job)
+
+
+def submit_job(image_bytes, user_id):
+    """背景除去ジョブを登録し、ジョブIDを返す"""
+    job_id = uuid.uuid4().hex
+    user_id = str(user_id)
+
+    options = get_pipeline_options()
+
+    # 同じ画像・同じ設定の結果があれば即時に完了させる
+    submitted_at = time.time()
+    cache_key, result = find_cached_result(image_bytes, options)
+    if result is not None:
+        _save_result(job_id, user_id, result)
+        record_timings("job", result, time.time() - submitted_at)
+        return job_id
+
+    # 待ち行列が一杯の場合は PoolBusyError を送出し、ジョブは登録しない
+    pool = get_pool()
+    future = pool.submit(remove_background, image_bytes, **options)
+
+    # 完了コールバックより先に状態を保存しておく
+    _save_job(job_id, {"status": JOB_STATUS_PENDING, "user_id": user_id, "submitted_at": submitted_at})
+    future.add_done_callback(partial(_on_job_done, job_id, user_id, cache_key, submitted_at))
+    return job_id
+
+
+def get_job(job_id, user_id):
+    """
+    ジョブの状態を取得（存在しない、または他ユーザーのジョブの場合はNone）
+    実行時間の制限はプール（SegmentationPool）が実行の開始から計測し、超えた場合は JobTimeoutError で完了する
+    """
+    job = _get_cache().get(_job_key(job_id))
+    if job is None or job["user_id"] != str(user_id):
+        return None
+
+    return job
+
+
+def get_job_result(job_id):
+    """完了したジョブのWebP画像を取得"""
+    return _get_cache().get(_result_key(job_id))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from apps.image_processing.conf import get_setting
+from apps.image_processing.metrics import HISTOGRAM_BUCKETS, PERCENTILES, get_histograms, reset_histograms, summarize
+
+
+def format_bucket(upper):
+    """パーセンタイルが含まれる階級を表示用に変換（最大の階級を超えた場合は None）"""
+    return f">{HISTOGRAM_BUCKETS[-1]}" if upper is None else f"<={upper}"
+
+
+class Command(BaseCommand):
+    help = "Show p50/p95/p99 of background removal timings per stage"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true", help="集計したヒストグラムを削除する")
+
+    def handle(self, *args, **options):
+        if not get_setting("TIMING_HISTOGRAM_DIR"):
+            self.stdout.write("処理時間の集計が無効です（IMAGE_PROCESSING_TIMING_HISTOGRAMS を有効にしてください）")
+            return
+
+        if options["reset"]:
+            reset_histograms()
+            self.stdout.write("処理時間の集計を削除しました")
+            return
+
+        histograms = get_histograms()
+        if not histograms:
+            self.stdout.write("集計データがありません")
+            return
+
+        header = f"{'stage':<14}{'count':>8}" + "".join(f"{f'p{p} ms':>10}" for p in PERCENTILES)
+        self.stdout.write(header)
+        for stage, counts in histograms.items():
+            summary = summarize(counts)
+            values = "".join(f"{format_bucket(summary[f'p{p}']):>10}" for p in PERCENTILES)
+            self.stdout.write(f"{stage:<14}{summary['count']:>8}{values}")
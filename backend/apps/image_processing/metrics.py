@@ -0,0 +1,223 @@
+"""
+背景除去の段階ごとの処理時間の計測結果
+Server-Timing ヘッダー・構造化ログ・集計用のヒストグラムとして出力する
+
+ヒストグラムはプロセスごとにメモリ上で集計し、TIMING_HISTOGRAM_DIR にプロセスごとのファイルとして書き出す。
+各ファイルの書き込みは1プロセスのみのため、複数のワーカーが同時に集計しても件数が失われない。
+出力時（manage.py image_processing_timings）にすべてのファイルを合算する
+
+リクエストごとのファイル入出力を避けるため、ファイルへの書き出し（集計の削除の確認を含む）は
+HISTOGRAM_FLUSH_EVERY 件ごと、または前回の書き出しから HISTOGRAM_FLUSH_INTERVAL 秒以上経過した時点と
+プロセスの終了時に行う。そのため他のプロセスの直近の件数は出力に含まれない場合がある
+"""
+
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from .conf import get_setting
+
+logger = logging.getLogger(__name__)
+
+# ヒストグラムの階級の上限（ミリ秒）。最後の階級は上限なし
+HISTOGRAM_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000]
+PERCENTILES = [50, 95, 99]
+# 集計対象の段階（パイプライン内の段階 + リクエスト全体）
+STAGES = ["decode", "resize", "segmentation", "morphology", "median_blur", "encode", "total"]
+# 集計の削除を各プロセスに伝えるファイル（内容が変わった場合にプロセス内の集計を破棄する）
+RESET_MARKER = ".reset"
+# ファイルへ書き出す間隔（件数・秒）
+HISTOGRAM_FLUSH_EVERY = 20
+HISTOGRAM_FLUSH_INTERVAL = 10
+
+# このプロセスの段階ごとの各階級の件数（書き出し済み・未書き出し）
+_counts = {}
+_pending_counts = {}
+_pending_observations = 0
+_last_flush = 0.0
+_counts_lock = threading.Lock()
+# (プロセスID, ディレクトリ, ファイル名) フォーク後のプロセスでは別のファイルに書き出す
+_process = None
+_reset_marker = None
+
+
+def format_server_timing(stage_timings):
+    """段階ごとの処理時間（秒）を Server-Timing ヘッダーの値に変換"""
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in stage_timings.items())
+
+
+def record_timings(source, result, total_time):
+    """
+    処理時間を構造化ログに出力し、有効な場合はヒストグラムに集計
+    source: 呼び出し元（sync / job / batch）
+    """
+    stage_timings = {**result.get("stage_timings", {}), "total": total_time}
+    cached = result.get("cached", False)
+
+    logger.info(
+        json.dumps(
+            {
+                "event": "remove_bg_timing",
+                "source": source,
+                "strategy": result["strategy"],
+                "cached": cached,
+                "stages_ms": {name: round(seconds * 1000, 1) for name, seconds in stage_timings.items()},
+            }
+        )
+    )
+
+    # キャッシュヒット時は画像処理を行っていないため集計しない
+    if not cached:
+        _observe(stage_timings)
+    return stage_timings
+
+
+def _get_histogram_dir():
+    return get_setting("TIMING_HISTOGRAM_DIR")
+
+
+def _bucket_index(milliseconds):
+    for index, upper in enumerate(HISTOGRAM_BUCKETS):
+        if milliseconds <= upper:
+            return index
+    return len(HISTOGRAM_BUCKETS)
+
+
+def _read_reset_marker(directory):
+    try:
+        with open(os.path.join(directory, RESET_MARKER)) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _write_file(directory, filename, content):
+    """書き込み途中のファイルを読まれないよう一時ファイルから置き換える"""
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+        os.replace(tmp_path, os.path.join(directory, filename))
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+def _observe(stage_timings):
+    """処理時間をこのプロセスのヒストグラムの該当する階級に加算し、一定の件数・時間ごとにファイルに書き出す"""
+    global _process, _reset_marker, _pending_observations, _last_flush
+    directory = _get_histogram_dir()
+    if directory is None:
+        return
+
+    with _counts_lock:
+        # フォーク後のプロセス・出力先の変更後は親プロセス・変更前の件数を引き継がない
+        if _process is None or _process[:2] != (os.getpid(), directory):
+            _process = (os.getpid(), directory, f"{uuid.uuid4().hex}.json")
+            _reset_marker = _read_reset_marker(directory)
+            _counts.clear()
+            _pending_counts.clear()
+            _pending_observations = 0
+            _last_flush = time.monotonic()
+
+        for stage, seconds in stage_timings.items():
+            if stage not in STAGES:
+                continue
+            counts = _pending_counts.setdefault(stage, [0] * (len(HISTOGRAM_BUCKETS) + 1))
+            counts[_bucket_index(seconds * 1000)] += 1
+        _pending_observations += 1
+
+        if _pending_observations >= HISTOGRAM_FLUSH_EVERY or time.monotonic() - _last_flush >= HISTOGRAM_FLUSH_INTERVAL:
+            _flush(directory)
+
+
+def _flush(directory):
+    """未書き出しの件数を加算してプロセスごとのファイルに書き出す（_counts_lock の取得中に呼び出す）"""
+    global _reset_marker, _pending_observations, _last_flush
+    # 集計の削除後は削除前の件数を破棄し、前回の書き出し以降の件数のみを残す
+    reset_marker = _read_reset_marker(directory)
+    if reset_marker != _reset_marker:
+        _reset_marker = reset_marker
+        _counts.clear()
+
+    for stage, pending in _pending_counts.items():
+        counts = _counts.setdefault(stage, [0] * (len(HISTOGRAM_BUCKETS) + 1))
+        for index, count in enumerate(pending):
+            counts[index] += count
+    _pending_counts.clear()
+    _pending_observations = 0
+    _last_flush = time.monotonic()
+
+    try:
+        _write_file(directory, _process[2], json.dumps(_counts))
+    except OSError as e:
+        logger.warning(f"Failed to write timing histogram: {e}")
+
+
+@atexit.register
+def flush_histograms():
+    """このプロセスの未書き出しの件数をファイルに書き出す"""
+    directory = _get_histogram_dir()
+    with _counts_lock:
+        if _process is not None and _process[:2] == (os.getpid(), directory) and _pending_observations:
+            _flush(directory)
+
+
+def get_histograms():
+    """段階ごとのヒストグラム（各階級の件数）をすべてのプロセスについて合算して取得"""
+    flush_histograms()
+    directory = _get_histogram_dir()
+    if directory is None or not os.path.isdir(directory):
+        return {}
+
+    histograms = {}
+    for filename in sorted(os.listdir(directory)):
+        if filename.startswith(".") or not filename.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as f:
+                process_counts = json.load(f)
+        except (FileNotFoundError, ValueError):
+            continue
+        for stage, counts in process_counts.items():
+            merged = histograms.setdefault(stage, [0] * (len(HISTOGRAM_BUCKETS) + 1))
+            for index, count in enumerate(counts[: len(merged)]):
+                merged[index] += count
+
+    return {stage: histograms[stage] for stage in STAGES if any(histograms.get(stage, ()))}
+
+
+def summarize(counts):
+    """ヒストグラムから件数とパーセンタイル（階級の上限値、ミリ秒）を算出"""
+    total = sum(counts)
+    summary = {"count": total}
+    for percentile in PERCENTILES:
+        threshold = total * percentile / 100
+        cumulative = 0
+        for index, count in enumerate(counts):
+            cumulative += count
+            if cumulative >= threshold:
+                # 上限のない最後の階級は None（最大の階級を超えた）とする
+                summary[f"p{percentile}"] = HISTOGRAM_BUCKETS[index] if index < len(HISTOGRAM_BUCKETS) else None
+                break
+    return summary
+
+
+def reset_histograms():
+    """集計したヒストグラムを削除（実行中のプロセスも次の集計時に件数を破棄する）"""
+    directory = _get_histogram_dir()
+    if directory is None:
+        return
+    _write_file(directory, RESET_MARKER, uuid.uuid4().hex)
+    for filename in os.listdir(directory):
+        if filename.endswith(".json"):
+            try:
+                os.remove(os.path.join(directory, filename))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,409 @@
+"""
+背景除去の画像処理パイプライン
+ワーカープロセスからも呼び出されるため、Djangoに依存しないように実装する
+"""
+
+import io
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Tuple
+
+import cv2
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+from .constants import (
+    GMM_COMPONENTS,
+    GRABCUT_MODE_FULL,
+    GRABCUT_MODE_PYRAMID,
+    MAX_BORDER_FOREGROUND_RATIO,
+    MAX_FOREGROUND_RATIO,
+    MAX_SIZE,
+    MIN_FOREGROUND_RATIO,
+    PYRAMID_MIN_SIZE,
+    QUALITY_PARAM,
+    REDUCED_DECODE_FLAGS,
+    STRATEGY_MODE_FALLBACK,
+    STRATEGY_MODE_SCORED,
+)
+from .exceptions import BackgroundRemovalError, InvalidImageError
+
+
+def init_worker(cv2_threads):
+    """ワーカープロセスの初期化（OpenCVの内部スレッド数を制限してCPUの過剰使用を防ぐ）"""
+    cv2.setNumThreads(cv2_threads)
+
+
+def warm_up():
+    """ワーカープロセスの起動を促すための空処理"""
+
+
+# キャッシュサイズを増やしてヒット率を向上
+@lru_cache(maxsize=256)
+def get_kernel(size: Tuple[int, int] = (3, 3)):
+    """カーネルの生成をキャッシュ"""
+    return np.ones(size, np.uint8)
+
+
+def threshold_removal(img):
+    """閾値処理による背景除去"""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)  # グレースケール変換: 画像をグレースケールに変換
+    blurred = cv2.medianBlur(gray, 3)  # メディアンブラーに変更（ノイズに強い）
+    return cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+
+
+def color_distance_removal(img: np.ndarray) -> np.ndarray:
+    """色距離による背景除去"""
+    # エッジサンプリングを効率化
+    edges = np.concatenate(
+        [
+            img[0:1].reshape(-1, 3),  # 上端
+            img[-1:].reshape(-1, 3),  # 下端
+            img[:, 0:1].reshape(-1, 3),  # 左端
+            img[:, -1:].reshape(-1, 3),  # 右端
+        ]
+    )
+    background_color = np.median(edges, axis=0).astype(np.float32)
+
+    # 二乗距離をチャンネルごとに float32 のバッファへ加算し、画像サイズの一時配列を2つに抑える
+    distance = np.zeros(img.shape[:2], np.float32)
+    channel = np.empty(img.shape[:2], np.float32)
+    for c in range(3):
+        np.subtract(img[..., c], background_color[c], out=channel)
+        np.multiply(channel, channel, out=channel)
+        np.add(distance, channel, out=distance)
+    np.sqrt(distance, out=distance)
+
+    # 平均・標準偏差は一時配列を生成しないOpenCVで計算
+    mean, std = cv2.meanStdDev(distance)
+    threshold = float(mean[0, 0] + std[0, 0])
+    return cv2.compare(distance, threshold, cv2.CMP_GT)
+
+
+def _grabcut_with_rect(img, iterations=3):
+    """矩形で初期化したGrabCutを実行し、マスクと前景・背景のGMMを返す"""
+    # マスクとモデルを初期化
+    mask = np.zeros(img.shape[:2], np.uint8)
+    bgd_model = np.zeros((1, 65), np.float64)
+    fgd_model = np.zeros((1, 65), np.float64)
+
+    # マージンを調整
+    margin = int(min(img.shape[0], img.shape[1]) * 0.02)
+    rect = (margin, margin, img.shape[1] - 2 * margin, img.shape[0] - 2 * margin)
+
+    cv2.grabCut(img, mask, rect, bgd_model, fgd_model, iterations, cv2.GC_INIT_WITH_RECT)
+    return np.where((mask == 2) | (mask == 0), 0, 1).astype(np.uint8), bgd_model, fgd_model
+
+
+def grabcut_removal(img):
+    """GrabCut処理"""
+    # イテレーション回数を3回に抑えて処理を軽量化
+    mask, _, _ = _grabcut_with_rect(img, 3)
+    return mask
+
+
+def gmm_likelihood(pixels, model):
+    """
+    GrabCutが学習したGMM（cv2.grabCut の bgdModel / fgdModel）における各画素の尤度
+    model は重み(5) + 平均(5x3) + 共分散(5x3x3) の65要素
+    """
+    weights = model[0, :GMM_COMPONENTS]
+    means = model[0, GMM_COMPONENTS : GMM_COMPONENTS * 4].reshape(GMM_COMPONENTS, 3)
+    covs = model[0, GMM_COMPONENTS * 4 :].reshape(GMM_COMPONENTS, 3, 3)
+
+    likelihood = np.zeros(len(pixels), np.float64)
+    for weight, mean, cov in zip(weights, means, covs):
+        det = np.linalg.det(cov)
+        if weight <= 0 or det <= 0:
+            continue
+        diff = pixels - mean
+        mahalanobis = np.einsum("ij,jk,ik->i", diff, np.linalg.inv(cov), diff)
+        likelihood += weight / np.sqrt(det) * np.exp(-0.5 * mahalanobis)
+    return likelihood
+
+
+def fit_gmm(pixels):
+    """
+    GrabCutと同じ形式（65要素）のGMMを画素から推定
+    GrabCutの初期化と同様に k-means でクラスタリングし、各クラスタの重み・平均・共分散を求める
+    """
+    model = np.zeros((1, 65), np.float64)
+    components = min(GMM_COMPONENTS, len(pixels))
+    criteria = (cv2.TERM_CRITERIA_MAX_ITER, 10, 0)
+    _, labels, _ = cv2.kmeans(pixels.astype(np.float32), components, None, criteria, 1, cv2.KMEANS_PP_CENTERS)
+    labels = labels.ravel()
+
+    for ci in range(components):
+        component = pixels[labels == ci]
+        if len(component) < 2:
+            continue
+        model[0, ci] = len(component) / len(pixels)
+        model[0, GMM_COMPONENTS + 3 * ci : GMM_COMPONENTS + 3 * (ci + 1)] = component.mean(axis=0)
+        # 特異行列にならないようにGrabCutと同様に分散を加える
+        cov = np.cov(component.T) + np.eye(3) * 0.01
+        model[0, GMM_COMPONENTS * 4 + 9 * ci : GMM_COMPONENTS * 4 + 9 * (ci + 1)] = cov.ravel()
+    return model
+
+
+def grabcut_pyramid_removal(img, levels=2):
+    """
+    多重解像度GrabCut
+    縮小した画像でGrabCutを実行してマスクを拡大し、境界付近の帯状領域のみを元解像度で再判定する
+    GrabCutが処理する画素数は縮小率の2乗分の1になり、再判定は境界付近の画素に限られる
+    """
+    small = img
+    for _ in range(levels):
+        if min(small.shape[:2]) // 2 < PYRAMID_MIN_SIZE:
+            break
+        small = cv2.pyrDown(small)
+
+    # 十分に縮小できない小さな画像は通常のGrabCutで処理
+    if small is img:
+        return grabcut_removal(img)
+
+    coarse_mask, bgd_model, fgd_model = _grabcut_with_rect(small, 3)
+
+    # 元解像度へ拡大（縮小による境界のずれを含むよう、拡大率の2倍の幅の境界帯を再判定対象とする）
+    height, width = img.shape[:2]
+    mask = cv2.resize(coarse_mask, (width, height), interpolation=cv2.INTER_NEAREST)
+    band_size = 4 * int(np.ceil(width / small.shape[1])) + 1
+    kernel = get_kernel((band_size, band_size))
+    band = cv2.dilate(mask, kernel) != cv2.erode(mask, kernel)
+    if not band.any():
+        return mask
+
+    # 縮小画像で学習したGMMはノイズが平滑化されているため、
+    # 境界帯の内側・外側に接する元解像度の画素からGMMを学習し直す
+    ring = (cv2.dilate(band.astype(np.uint8), kernel) > 0) & ~band
+    fgd_pixels = img[ring & (mask > 0)].astype(np.float64)
+    bgd_pixels = img[ring & (mask == 0)].astype(np.float64)
+    if len(fgd_pixels) >= GMM_COMPONENTS * 2:
+        fgd_model = fit_gmm(fgd_pixels)
+    if len(bgd_pixels) >= GMM_COMPONENTS * 2:
+        bgd_model = fit_gmm(bgd_pixels)
+
+    ys, xs = np.nonzero(band)
+    pixels = img[ys, xs].astype(np.float64)
+    mask[ys, xs] = gmm_likelihood(pixels, fgd_model) > gmm_likelihood(pixels, bgd_model)
+    return mask
+
+
+def preprocess_image(img):
+    """画像の前処理"""
+    height, width = img.shape[:2]
+    if max(height, width) > MAX_SIZE:
+        scale = MAX_SIZE / max(height, width)
+        new_size = (int(width * scale), int(height * scale))
+        # INTER_AREA を使用して画質を維持しながらリサイズ
+        return cv2.resize(img, new_size, interpolation=cv2.INTER_AREA)
+    return img
+
+
+def improve_mask(mask):
+    """マスクの品質改善"""
+    kernel = get_kernel((3, 3))
+    # モルフォロジー演算を1回の実行に最適化
+    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    return cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+
+
+def get_decode_flag(image_bytes):
+    """
+    デコード時の縮小率を選択
+    JPEGは長辺が MAX_SIZE を下回らない範囲で最大の縮小率でデコードし、フル解像度の展開を避ける
+    """
+    try:
+        # ヘッダーのみを読み込み、画素データはデコードしない
+        with Image.open(io.BytesIO(image_bytes)) as header:
+            image_format = header.format
+            long_side = max(header.size)
+    except (UnidentifiedImageError, OSError):
+        # 判定できない画像はOpenCVのデコード結果に任せる
+        return cv2.IMREAD_COLOR
+
+    # JPEG以外は全体をデコードしてから縮小されるため効果がない
+    if image_format != "JPEG":
+        return cv2.IMREAD_COLOR
+
+    for factor, flag in REDUCED_DECODE_FLAGS:
+        if long_side // factor >= MAX_SIZE:
+            return flag
+    return cv2.IMREAD_COLOR
+
+
+def decode_image(image_bytes):
+    """アップロードされた画像データをデコード"""
+    img_array = np.frombuffer(image_bytes, np.uint8)
+    img = cv2.imdecode(img_array, get_decode_flag(image_bytes))
+
+    if img is None:
+        raise InvalidImageError()
+    return img
+
+
+def detect_edges(img):
+    """マスク採点用のエッジ画像を生成（境界の多少のずれを許容するため膨張させる）"""
+    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(gray, 50, 150)
+    return cv2.dilate(edges, get_kernel((3, 3)))
+
+
+def border_foreground_ratio(mask):
+    """画像の外周のうち前景と判定された画素の割合"""
+    border = np.concatenate([mask[0], mask[-1], mask[1:-1, 0], mask[1:-1, -1]])
+    return float(np.count_nonzero(border)) / len(border)
+
+
+def orient_mask(mask):
+    """
+    外周の大半が前景のマスクは前景と背景が反転しているとみなして反転する
+    （明るい背景の暗い被写体を閾値処理すると、背景側が前景になるため）
+    """
+    binary = (mask > 0).astype(np.uint8)
+    if border_foreground_ratio(binary) > MAX_BORDER_FOREGROUND_RATIO:
+        return 1 - binary
+    return binary
+
+
+def score_mask(mask, edges):
+    """
+    マスクの品質スコア（0〜1）
+    前景比率が妥当な範囲にあるか、マスクの輪郭が画像のエッジと一致しているかで採点し、
+    画像の外周に接する前景が多いほど（背景を前景と判定しているほど）減点する
+    """
+    binary = (mask > 0).astype(np.uint8)
+    ratio = float(np.mean(binary))
+
+    if ratio <= MIN_FOREGROUND_RATIO or ratio >= MAX_FOREGROUND_RATIO:
+        return 0.0
+
+    # 前景比率: 極端に小さい／大きいマスクほど減点
+    ratio_score = min(1.0, ratio / 0.1, (MAX_FOREGROUND_RATIO - ratio) / 0.1)
+
+    # エッジの整合性: マスクの輪郭のうち画像のエッジ上にある割合
+    contour = cv2.morphologyEx(binary, cv2.MORPH_GRADIENT, get_kernel((3, 3)))
+    contour_pixels = np.count_nonzero(contour)
+    coherence = np.count_nonzero(contour & (edges > 0)) / contour_pixels if contour_pixels else 0.0
+
+    return (0.5 * ratio_score + 0.5 * coherence) * (1.0 - border_foreground_ratio(binary))
+
+
+@contextmanager
+def measure(timings, name):
+    """ブロックの処理時間（秒）を timings[name] に記録"""
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - start_time
+
+
+def _run_strategy(removal_func, method_name, img, timings):
+    """背景除去手法を実行し、処理時間を記録"""
+    with measure(timings, method_name):
+        return removal_func(img)
+
+
+def select_mask_fallback(img, timings, grabcut_func=grabcut_removal):
+    """GrabCutから順に試し、前景が検出できた最初のマスクを採用"""
+    methods = [
+        (grabcut_func, "GrabCut"),
+        (threshold_removal, "Threshold"),
+        (color_distance_removal, "ColorDistance"),
+    ]
+
+    for removal_func, method_name in methods:
+        try:
+            mask = _run_strategy(removal_func, method_name, img, timings)
+            mask_ratio = np.sum(mask) / (img.shape[0] * img.shape[1])
+
+            if mask_ratio > MIN_FOREGROUND_RATIO:
+                return mask, method_name
+        except Exception:
+            continue
+
+    return None, None
+
+
+def select_mask_scored(img, timings, good_enough_score, grabcut_func=grabcut_removal):
+    """
+    軽量な手法を先に実行して採点し、十分なスコアのマスクがあればGrabCutを省略
+    最もスコアの高いマスクを採用する（閾値処理などで前景と背景が反転したマスクは反転してから採点する）
+    """
+    methods = [
+        (threshold_removal, "Threshold"),
+        (color_distance_removal, "ColorDistance"),
+        (grabcut_func, "GrabCut"),
+    ]
+    edges = detect_edges(img)
+
+    best_mask, best_method, best_score = None, None, 0.0
+    for removal_func, method_name in methods:
+        if best_score >= good_enough_score:
+            break
+        try:
+            mask = orient_mask(_run_strategy(removal_func, method_name, img, timings))
+        except Exception:
+            continue
+
+        score = score_mask(mask, edges)
+        if score > best_score:
+            best_mask, best_method, best_score = mask, method_name, score
+
+    return best_mask, best_method
+
+
+def remove_background(
+    image_bytes, strategy_mode=STRATEGY_MODE_FALLBACK, good_enough_score=0.6, grabcut_mode=GRABCUT_MODE_FULL
+):
+    """
+    背景除去処理全体の流れ
+    WebP画像のバイト列と、採用された手法名・手法ごと／段階ごとの処理時間・全体の処理時間を返す
+    """
+    start_time = time.time()
+    # 段階ごとの処理時間（デコード・リサイズ・領域分割・モルフォロジー・メディアンフィルタ・エンコード）
+    stage_timings = {}
+
+    # 効率的な画像読み込みと前処理
+    with measure(stage_timings, "decode"):
+        img = decode_image(image_bytes)
+    with measure(stage_timings, "resize"):
+        img = preprocess_image(img)
+
+    # 背景除去戦略
+    timings = {}
+    grabcut_func = grabcut_pyramid_removal if grabcut_mode == GRABCUT_MODE_PYRAMID else grabcut_removal
+    with measure(stage_timings, "segmentation"):
+        if strategy_mode == STRATEGY_MODE_SCORED:
+            final_mask, strategy = select_mask_scored(img, timings, good_enough_score, grabcut_func)
+        else:
+            final_mask, strategy = select_mask_fallback(img, timings, grabcut_func)
+
+    if final_mask is None:
+        raise BackgroundRemovalError()
+
+    # マスクの改善と適用（手法によって 0/1 と 0/255 が混在するため 0/1 に揃える）
+    with measure(stage_timings, "morphology"):
+        final_mask = improve_mask((final_mask > 0).astype(np.uint8))
+    foreground = cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+    foreground[:, :, 3] = final_mask * 255
+
+    # エッジの改善（軽量化）
+    with measure(stage_timings, "median_blur"):
+        foreground[:, :, 3] = cv2.medianBlur(foreground[:, :, 3], 3)
+
+    # WebP形式で圧縮
+    with measure(stage_timings, "encode"):
+        is_success, buffer = cv2.imencode(".webp", foreground, QUALITY_PARAM)
+
+    if not is_success:
+        raise BackgroundRemovalError("Failed to encode image")
+
+    return {
+        "image": buffer.tobytes(),
+        "strategy": strategy,
+        "strategy_timings": timings,
+        "stage_timings": stage_timings,
+        "process_time": time.time() - start_time,
+    }
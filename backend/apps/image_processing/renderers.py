@@ -0,0 +1,23 @@
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class WebPRenderer(BaseRenderer):
+    """
+    WebP画像をそのまま返すレンダラー
+    Accept: image/webp での content negotiation に使用する
+    """
+
+    media_type = "image/webp"
+    format = "webp"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, bytes):
+            return data
+
+        # 認証エラー等の画像以外のレスポンスはJSONで返す
+        response = (renderer_context or {}).get("response")
+        if response is not None:
+            response["Content-Type"] = JSONRenderer.media_type
+        return JSONRenderer().render(data)
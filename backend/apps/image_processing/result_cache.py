@@ -0,0 +1,270 @@
+"""
+背景除去結果のキャッシュ
+同じ画像・同じパイプライン設定の結果を保存し、再アップロード時にOpenCVの処理を省略する
+
+保存形式は固定のヘッダー（識別子・手法名の長さ・手法名）に続けてWebP画像のバイト列を並べたもの。
+共有ディレクトリに置かれたデータを読み込むため、pickle などの任意のオブジェクトを復元する形式は使用しない
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.signals import setting_changed
+
+from .conf import get_setting
+from .constants import MAX_SIZE, QUALITY_PARAM
+
+# 保存データの先頭の識別子（形式を変更した場合は古いデータを読まないよう変更する）
+RESULT_MAGIC = b"VCRB1"
+# 他のプロセスが保存した結果を索引に取り込み直す最短の間隔（秒）
+INDEX_RESCAN_INTERVAL = 60
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def encode_result(image, strategy):
+    """WebP画像と採用された手法名を保存用のバイト列に変換"""
+    strategy_bytes = strategy.encode("ascii")
+    return RESULT_MAGIC + bytes([len(strategy_bytes)]) + strategy_bytes + image
+
+
+def decode_result(value):
+    """保存用のバイト列から (WebP画像, 手法名) を取り出す（形式が異なる場合はNone）"""
+    header_size = len(RESULT_MAGIC) + 1
+    if not isinstance(value, bytes) or len(value) <= header_size or not value.startswith(RESULT_MAGIC):
+        return None
+    strategy_end = header_size + value[len(RESULT_MAGIC)]
+    image = value[strategy_end:]
+    if not image:
+        return None
+    try:
+        strategy = value[header_size:strategy_end].decode("ascii")
+    except UnicodeDecodeError:
+        return None
+    return image, strategy
+
+
+class DiskResultBackend:
+    """ローカルディスクに結果を保存するバックエンド（同一ノードのプロセス間で共有）"""
+
+    def __init__(self, location):
+        self.location = location
+        os.makedirs(location, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.location, key[:2], key)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+            # 最終利用日時を更新（LRUの順序に使用）
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return value
+
+    def set(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 書き込み途中のファイルを読まれないよう一時ファイルから置き換える
+        fd, tmp_path = tempfile.mkstemp(prefix=".tmp", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except Exception:
+            os.remove(tmp_path)
+            raise
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def entries(self):
+        """保存済みのキーとサイズを古い順に返す"""
+        entries = []
+        for directory, _, filenames in os.walk(self.location):
+            for filename in filenames:
+                if filename.startswith("."):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(directory, filename))
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, filename, stat.st_size))
+        return [(key, size) for _, key, size in sorted(entries)]
+
+
+class DjangoCacheResultBackend:
+    """
+    Djangoのキャッシュフレームワークに結果を保存するバックエンド
+    キャッシュの中身は列挙できないため、容量（MAX_BYTES）はプロセスごとに自身が保存・使用した結果のみで管理する。
+    全体の容量は最大で「プロセス数 × MAX_BYTES」となり、再起動時には管理対象から外れるため、
+    全体の上限はキャッシュ側の設定（Redis の maxmemory、ファイルベースの MAX_ENTRIES など）で制限する
+    """
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def _key(self, key):
+        return f"image_processing:result:{key}"
+
+    def get(self, key):
+        return self.cache.get(self._key(key))
+
+    def set(self, key, value):
+        self.cache.set(self._key(key), value, None)
+
+    def delete(self, key):
+        self.cache.delete(self._key(key))
+
+    def entries(self):
+        # キャッシュの中身は列挙できないため、プロセス内で記録したもののみ管理する（クラスの説明を参照）
+        return []
+
+
+class ResultCache:
+    """
+    容量（バイト数）を上限とするLRUキャッシュ
+    他のプロセスが保存した結果は、容量を超えた際に rescan_interval 秒以上の間隔をあけて索引に取り込み直す
+    （一覧の取得はディレクトリ全体を走査するため、保存のたびには行わない）
+    """
+
+    def __init__(self, backend, max_bytes, rescan_interval=INDEX_RESCAN_INTERVAL):
+        self.backend = backend
+        self.max_bytes = max_bytes
+        self.rescan_interval = rescan_interval
+        self._lock = threading.Lock()
+        self._index = OrderedDict()
+        self._total_bytes = 0
+        self._last_load = None
+        self._load_index()
+
+    @staticmethod
+    def make_key(image_bytes, options):
+        """画像データとパイプラインの設定からキーを生成"""
+        digest = hashlib.sha256(image_bytes)
+        params = (MAX_SIZE, tuple(QUALITY_PARAM), sorted(options.items()))
+        digest.update(repr(params).encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """キャッシュされた結果を取得（ない場合はNone）"""
+        value = self.backend.get(key)
+
+        with self._lock:
+            if value is None:
+                self._forget(key)
+                return None
+            self._track(key, len(value))
+
+        decoded = decode_result(value)
+        if decoded is None:
+            # 形式の異なるデータは使用せずに削除
+            self.delete(key)
+            return None
+
+        image, strategy = decoded
+        # 手法ごとの処理時間はキャッシュ元の処理のものなので返さない
+        return {"image": image, "strategy": strategy, "strategy_timings": {}, "cached": True}
+
+    def set(self, key, result):
+        """結果を保存し、容量を超えた分を古いものから削除"""
+        value = encode_result(result["image"], result["strategy"])
+        if len(value) > self.max_bytes:
+            return
+
+        self.backend.set(key, value)
+        with self._lock:
+            self._track(key, len(value))
+            if self._total_bytes > self.max_bytes and time.monotonic() - self._last_load >= self.rescan_interval:
+                # 他のプロセスが保存した分も含めて判定するため一覧を取り直す
+                self._load_index()
+            while self._total_bytes > self.max_bytes and self._index:
+                evicted_key, evicted_size = self._index.popitem(last=False)
+                self._total_bytes -= evicted_size
+                self.backend.delete(evicted_key)
+
+    def delete(self, key):
+        """結果を削除"""
+        self.backend.delete(key)
+        with self._lock:
+            self._forget(key)
+
+    def _load_index(self):
+        """バックエンドに保存済みの結果を索引に取り込む"""
+        self._last_load = time.monotonic()
+        entries = self.backend.entries()
+        if not entries:
+            return
+        # 他のプロセスが保存した結果は古い順、このプロセスで使用した結果はその後ろに並べる
+        # （ファイルの更新日時は粒度が粗いため、プロセス内の順序を優先する）
+        index = OrderedDict((key, size) for key, size in entries if key not in self._index)
+        stored_keys = {key for key, _ in entries}
+        index.update((key, size) for key, size in self._index.items() if key in stored_keys)
+        self._index = index
+        self._total_bytes = sum(index.values())
+
+    def _track(self, key, size):
+        self._forget(key)
+        self._index[key] = size
+        self._total_bytes += size
+
+    def _forget(self, key):
+        self._total_bytes -= self._index.pop(key, 0)
+
+
+def get_result_cache():
+    """プロセス内で共有する結果キャッシュを取得（無効な場合はNone）"""
+    global _result_cache
+    config = get_setting("RESULT_CACHE")
+    if not config:
+        return None
+
+    with _result_cache_lock:
+        if _result_cache is None:
+            if config["BACKEND"] == "django":
+                backend = DjangoCacheResultBackend(config.get("CACHE_ALIAS", "default"))
+            else:
+                backend = DiskResultBackend(config["LOCATION"])
+            _result_cache = ResultCache(
+                backend, config["MAX_BYTES"], config.get("RESCAN_INTERVAL", INDEX_RESCAN_INTERVAL)
+            )
+        return _result_cache
+
+
+def find_cached_result(image_bytes, options):
+    """キャッシュ済みの結果を検索し、キャッシュのキーと結果（ない場合はNone）を返す"""
+    result_cache = get_result_cache()
+    if result_cache is None:
+        return None, None
+
+    cache_key = result_cache.make_key(image_bytes, options)
+    return cache_key, result_cache.get(cache_key)
+
+
+def store_result(cache_key, result):
+    """背景除去の結果をキャッシュに保存"""
+    result_cache = get_result_cache()
+    if result_cache is not None and cache_key is not None:
+        result_cache.set(cache_key, result)
+
+
+def _reset_result_cache(setting, **kwargs):
+    """設定が変更された場合（テスト時など）はキャッシュを作り直す"""
+    global _result_cache
+    if setting == "IMAGE_PROCESSING":
+        _result_cache = None
+
+
+setting_changed.connect(_reset_result_cache)
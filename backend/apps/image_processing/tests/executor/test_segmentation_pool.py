@@ -0,0 +1,65 @@
+import multiprocessing
+import time
+
+import pytest
+
+from apps.image_processing.exceptions import JobTimeoutError, PoolBusyError
+from apps.image_processing.executor import SegmentationPool, _worker_processes
+
+
+@pytest.fixture
+def pool():
+    """ワーカー1つ・待ち行列なしのプール"""
+    pool = SegmentationPool(workers=1, max_queue_size=0, job_timeout=0.5)
+    yield pool
+    pool.shutdown(wait=False)
+
+
+def test_run_returns_result(pool):
+    """ワーカープロセスで実行した結果が返ることを確認"""
+    assert pool.run(abs, -3) == 3
+
+
+def test_submit_raises_when_queue_is_full(pool):
+    """待ち行列が一杯の場合に PoolBusyError が送出されることを確認"""
+    future = pool.submit(time.sleep, 0.3)
+
+    with pytest.raises(PoolBusyError):
+        pool.submit(time.sleep, 0)
+
+    # 処理が終われば再び登録できる
+    future.result()
+    time.sleep(0.05)
+    assert pool.submit(abs, -1).result() == 1
+
+
+def test_run_raises_on_timeout(pool):
+    """制限時間を超えた場合に JobTimeoutError が送出されることを確認"""
+    with pytest.raises(JobTimeoutError):
+        pool.run(time.sleep, 2)
+
+
+def test_timeout_stops_worker_and_releases_slot(pool):
+    """制限時間を超えたジョブはワーカーごと停止され、枠が解放されて次のジョブを実行できることを確認"""
+    future = pool.submit(time.sleep, 30)
+
+    with pytest.raises(JobTimeoutError):
+        future.result(timeout=10)
+
+    # 30秒の処理の完了を待たずに新しいワーカーで実行できる
+    started_at = time.monotonic()
+    assert pool.run(abs, -2) == 2
+    assert time.monotonic() - started_at < 10
+
+
+def test_worker_processes_available(pool):
+    """
+    制限時間を超えたワーカーの停止に使用する ProcessPoolExecutor の非公開属性が参照できることを確認
+    （Python の更新で属性がなくなった場合はこのテストが失敗する）
+    """
+    assert pool.run(abs, -1) == 1
+
+    assert isinstance(pool._executor._processes, dict)
+    processes = _worker_processes(pool._executor)
+    assert len(processes) == 1
+    assert all(isinstance(process, multiprocessing.process.BaseProcess) and process.pid for process in processes)
@@ -0,0 +1,105 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from apps.image_processing import metrics
+from apps.image_processing.metrics import format_server_timing, get_histograms, record_timings, summarize
+
+
+@pytest.fixture
+def histogram_settings(settings, tmp_path):
+    """一時ディレクトリにヒストグラムを集計"""
+    settings.IMAGE_PROCESSING = {**settings.IMAGE_PROCESSING, "TIMING_HISTOGRAM_DIR": str(tmp_path)}
+    return tmp_path
+
+
+def make_result(decode, segmentation, cached=False):
+    return {
+        "strategy": "GrabCut",
+        "stage_timings": {"decode": decode, "segmentation": segmentation},
+        "cached": cached,
+    }
+
+
+def test_format_server_timing():
+    """Server-Timing ヘッダーの形式（ミリ秒）に変換されることを確認"""
+    assert format_server_timing({"decode": 0.0123, "total": 0.5}) == "decode;dur=12.3, total;dur=500.0"
+
+
+def test_summarize_percentiles():
+    """ヒストグラムからパーセンタイルが算出されることを確認"""
+    # 1ms以下: 90件、100ms以下: 9件、上限超過: 1件
+    counts = [90, 0, 0, 0, 0, 0, 9, 0, 0, 0, 0, 0, 0, 0, 1]
+
+    assert summarize(counts) == {"count": 100, "p50": 1, "p95": 100, "p99": 100}
+    assert summarize([0] * 14 + [1])["p99"] is None
+
+
+def test_record_timings_builds_histograms(histogram_settings):
+    """処理時間が段階ごとのヒストグラムに集計され、キャッシュヒットは除外されることを確認"""
+    record_timings("sync", make_result(0.004, 0.3), 0.35)
+    record_timings("sync", make_result(0.004, 0.6), 0.65)
+    record_timings("sync", make_result(0, 0, cached=True), 0.01)
+
+    histograms = get_histograms()
+
+    assert set(histograms) == {"decode", "segmentation", "total"}
+    assert summarize(histograms["decode"]) == {"count": 2, "p50": 5, "p95": 5, "p99": 5}
+    assert summarize(histograms["segmentation"])["p99"] == 1000
+
+
+def test_histograms_merged_across_processes(histogram_settings):
+    """プロセスごとに書き出したヒストグラムが合算され、集計の削除後はプロセス内の件数も破棄されることを確認"""
+    record_timings("sync", make_result(0.004, 0.3), 0.35)
+    # 別のプロセスが書き出したヒストグラム（5ms以下: 3件）
+    other_process = [0] * 15
+    other_process[2] = 3
+    (histogram_settings / "other.json").write_text(json.dumps({"decode": other_process}))
+
+    assert summarize(get_histograms()["decode"])["count"] == 4
+
+    call_command("image_processing_timings", "--reset", stdout=StringIO())
+    record_timings("sync", make_result(0.004, 0.3), 0.35)
+    assert summarize(get_histograms()["decode"])["count"] == 1
+
+
+def test_histograms_flushed_in_batches(histogram_settings, monkeypatch):
+    """ヒストグラムのファイルへの書き出しが処理ごとではなく一定の件数ごとに行われることを確認"""
+    monkeypatch.setattr(metrics, "HISTOGRAM_FLUSH_EVERY", 3)
+    monkeypatch.setattr(metrics, "HISTOGRAM_FLUSH_INTERVAL", 3600)
+    written = []
+    original_write_file = metrics._write_file
+    monkeypatch.setattr(metrics, "_write_file", lambda *args: written.append(args) or original_write_file(*args))
+
+    for _ in range(2):
+        record_timings("sync", make_result(0.004, 0.3), 0.35)
+    assert written == []
+
+    record_timings("sync", make_result(0.004, 0.3), 0.35)
+    assert len(written) == 1
+    assert json.loads(written[0][2])["decode"][2] == 3
+
+
+def test_record_timings_logs_stages(caplog):
+    """段階ごとの処理時間が構造化ログに出力されることを確認"""
+    with caplog.at_level("INFO", logger="apps.image_processing.metrics"):
+        stage_timings = record_timings("job", make_result(0.004, 0.3), 0.35)
+
+    assert stage_timings == {"decode": 0.004, "segmentation": 0.3, "total": 0.35}
+    assert '"source": "job"' in caplog.text
+    assert '"segmentation": 300.0' in caplog.text
+
+
+def test_timings_command(histogram_settings):
+    """管理コマンドでパーセンタイルの表が出力され、--reset で削除されることを確認"""
+    record_timings("sync", make_result(0.004, 0.3), 0.35)
+
+    out = StringIO()
+    call_command("image_processing_timings", stdout=out)
+    assert "segmentation" in out.getvalue()
+    assert "<=500" in out.getvalue()
+
+    call_command("image_processing_timings", "--reset", stdout=StringIO())
+    assert get_histograms() == {}
@@ -0,0 +1,17 @@
+import cv2
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def product_image():
+    """明るい背景の中央に暗い被写体がある商品画像風のBGR画像"""
+    img = np.full((400, 320, 3), 235, np.uint8)
+    cv2.rectangle(img, (80, 90), (240, 330), (60, 40, 150), -1)
+    return img
+
+
+@pytest.fixture
+def product_image_bytes(product_image):
+    """product_image をJPEGにエンコードしたバイト列"""
+    return cv2.imencode(".jpg", product_image)[1].tobytes()
@@ -0,0 +1,23 @@
+import numpy as np
+
+from apps.image_processing.pipeline import color_distance_removal
+
+
+def color_distance_removal_float64(img):
+    """float64 で計算する従来の実装"""
+    edges = np.concatenate([img[0:1].reshape(-1, 3), img[-1:].reshape(-1, 3), img[:, 0].reshape(-1, 3), img[:, -1]])
+    diff = np.sqrt(np.sum((img - np.median(edges, axis=0)) ** 2, axis=2))
+    return (diff > np.mean(diff) + np.std(diff)).astype(np.uint8) * 255
+
+
+def test_matches_float64_implementation(product_image):
+    """float32 での計算結果が従来の実装と一致することを確認"""
+    rng = np.random.default_rng(0)
+    noisy = np.clip(product_image + rng.integers(-15, 15, product_image.shape), 0, 255).astype(np.uint8)
+
+    mask = color_distance_removal(noisy)
+
+    assert mask.dtype == np.uint8
+    assert mask.shape == noisy.shape[:2]
+    assert set(np.unique(mask)) <= {0, 255}
+    assert np.mean(mask == color_distance_removal_float64(noisy)) > 0.999
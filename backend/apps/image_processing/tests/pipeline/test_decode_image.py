@@ -0,0 +1,48 @@
+import cv2
+import numpy as np
+import pytest
+
+from apps.image_processing.constants import MAX_SIZE
+from apps.image_processing.exceptions import InvalidImageError
+from apps.image_processing.pipeline import decode_image, get_decode_flag
+
+
+def encode(width, height, ext=".jpg"):
+    img = np.full((height, width, 3), 200, dtype=np.uint8)
+    cv2.rectangle(img, (width // 4, height // 4), (width * 3 // 4, height * 3 // 4), (60, 40, 150), -1)
+    return cv2.imencode(ext, img)[1].tobytes()
+
+
+@pytest.mark.parametrize(
+    ("width", "height", "expected"),
+    [
+        (4000, 3000, cv2.IMREAD_REDUCED_COLOR_4),
+        (3000, 4000, cv2.IMREAD_REDUCED_COLOR_4),
+        (1300, 900, cv2.IMREAD_REDUCED_COLOR_2),
+        (1299, 900, cv2.IMREAD_COLOR),
+        (400, 300, cv2.IMREAD_COLOR),
+    ],
+)
+def test_decode_flag_keeps_max_size(width, height, expected):
+    """長辺が MAX_SIZE を下回らない最大の縮小率が選択されることを確認"""
+    assert get_decode_flag(encode(width, height)) == expected
+
+
+def test_decode_reduces_large_jpeg():
+    """大きなJPEGは縮小してデコードされ、長辺が MAX_SIZE 以上であることを確認"""
+    img = decode_image(encode(4000, 3000))
+
+    assert img.shape == (750, 1000, 3)
+    assert max(img.shape[:2]) >= MAX_SIZE
+
+
+def test_decode_png_at_full_resolution():
+    """JPEG以外の画像は元の解像度でデコードされることを確認"""
+    img = decode_image(encode(1400, 1000, ext=".png"))
+    assert img.shape == (1000, 1400, 3)
+
+
+def test_decode_invalid_image():
+    """無効な画像データの場合は InvalidImageError が送出されることを確認"""
+    with pytest.raises(InvalidImageError):
+        decode_image(b"invalid image content")
@@ -0,0 +1,36 @@
+import cv2
+import numpy as np
+
+from apps.image_processing.constants import GRABCUT_MODE_PYRAMID
+from apps.image_processing.pipeline import grabcut_pyramid_removal, grabcut_removal, remove_background
+
+
+def test_pyramid_mask_matches_full_grabcut(product_image):
+    """多重解像度GrabCutのマスクが通常のGrabCutとほぼ一致することを確認"""
+    rng = np.random.default_rng(0)
+    noisy = np.clip(product_image.astype(np.int16) + rng.integers(-10, 10, product_image.shape), 0, 255)
+    noisy = noisy.astype(np.uint8)
+
+    full_mask = grabcut_removal(noisy)
+    pyramid_mask = grabcut_pyramid_removal(noisy)
+
+    assert pyramid_mask.shape == full_mask.shape
+    intersection = np.logical_and(full_mask, pyramid_mask).sum()
+    union = np.logical_or(full_mask, pyramid_mask).sum()
+    assert intersection / union > 0.98
+
+
+def test_pyramid_small_image_uses_full_grabcut(product_image):
+    """縮小できない小さな画像は通常のGrabCutと同じ結果になることを確認"""
+    small = cv2.resize(product_image, (120, 150))
+
+    np.testing.assert_array_equal(grabcut_pyramid_removal(small), grabcut_removal(small))
+
+
+def test_remove_background_pyramid_mode(product_image_bytes):
+    """pyramid モードでも元の解像度のWebPが生成されることを確認"""
+    result = remove_background(product_image_bytes, grabcut_mode=GRABCUT_MODE_PYRAMID)
+
+    decoded = cv2.imdecode(np.frombuffer(result["image"], np.uint8), cv2.IMREAD_UNCHANGED)
+    assert decoded.shape == (400, 320, 4)
+    assert result["strategy"] == "GrabCut"
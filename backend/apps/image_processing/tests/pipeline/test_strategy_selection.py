@@ -0,0 +1,72 @@
+import cv2
+import numpy as np
+
+from apps.image_processing.constants import STRATEGY_MODE_FALLBACK, STRATEGY_MODE_SCORED
+from apps.image_processing.pipeline import detect_edges, orient_mask, remove_background, score_mask
+
+
+def decode_alpha(image_bytes):
+    """WebP画像のアルファチャンネル"""
+    return cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_UNCHANGED)[:, :, 3]
+
+
+def test_score_mask_prefers_object_outline(product_image):
+    """被写体の輪郭に沿ったマスクのスコアが高くなることを確認"""
+    edges = detect_edges(product_image)
+
+    good_mask = np.zeros(product_image.shape[:2], np.uint8)
+    good_mask[90:331, 80:241] = 1
+    shifted_mask = np.zeros(product_image.shape[:2], np.uint8)
+    shifted_mask[20:150, 10:120] = 1
+
+    assert score_mask(good_mask, edges) > score_mask(shifted_mask, edges)
+
+
+def test_score_mask_rejects_empty_and_full_masks(product_image):
+    """前景が空、または画像全体のマスクは0点になることを確認"""
+    edges = detect_edges(product_image)
+
+    assert score_mask(np.zeros(product_image.shape[:2], np.uint8), edges) == 0.0
+    assert score_mask(np.ones(product_image.shape[:2], np.uint8), edges) == 0.0
+
+
+def test_score_mask_penalizes_inverted_mask(product_image):
+    """背景側を前景と判定した（外周が前景の）マスクは減点され、反転すると被写体のマスクになることを確認"""
+    edges = detect_edges(product_image)
+
+    mask = np.zeros(product_image.shape[:2], np.uint8)
+    mask[90:331, 80:241] = 1
+    inverted = 1 - mask
+
+    assert score_mask(inverted, edges) < score_mask(mask, edges)
+    assert np.array_equal(orient_mask(inverted * 255), mask)
+    assert np.array_equal(orient_mask(mask), mask)
+
+
+def test_scored_mode_skips_grabcut(product_image_bytes):
+    """軽量な手法で十分なスコアが得られればGrabCutを実行しないことを確認"""
+    result = remove_background(product_image_bytes, strategy_mode=STRATEGY_MODE_SCORED, good_enough_score=0.6)
+
+    assert result["strategy"] in ("Threshold", "ColorDistance")
+    assert "GrabCut" not in result["strategy_timings"]
+    assert result["image"][8:12] == b"WEBP"
+
+    # 被写体の中央は不透明、背景（四隅）は透明
+    alpha = decode_alpha(result["image"])
+    assert alpha[210, 160] == 255
+    assert alpha[0, 0] == alpha[0, -1] == alpha[-1, 0] == alpha[-1, -1] == 0
+
+
+def test_scored_mode_runs_grabcut_when_needed(product_image_bytes):
+    """スコアの閾値を満たす手法がなければGrabCutも実行することを確認"""
+    result = remove_background(product_image_bytes, strategy_mode=STRATEGY_MODE_SCORED, good_enough_score=1.1)
+
+    assert set(result["strategy_timings"]) == {"Threshold", "ColorDistance", "GrabCut"}
+
+
+def test_fallback_mode_runs_grabcut_first(product_image_bytes):
+    """fallback モードではGrabCutが最初に実行されることを確認"""
+    result = remove_background(product_image_bytes, strategy_mode=STRATEGY_MODE_FALLBACK)
+
+    assert result["strategy"] == "GrabCut"
+    assert list(result["strategy_timings"]) == ["GrabCut"]
@@ -0,0 +1,116 @@
+import os
+import pickle
+
+import pytest
+
+from apps.image_processing.result_cache import DiskResultBackend, DjangoCacheResultBackend, ResultCache
+
+
+def make_result(size):
+    return {"image": b"x" * size, "strategy": "GrabCut", "strategy_timings": {"GrabCut": 0.1}}
+
+
+@pytest.fixture
+def disk_cache(tmp_path):
+    """容量2.5KBのディスクキャッシュ"""
+    return ResultCache(DiskResultBackend(str(tmp_path)), max_bytes=2500)
+
+
+def test_get_returns_stored_result(disk_cache):
+    """保存した結果が取得できることを確認"""
+    disk_cache.set("a" * 64, make_result(100))
+
+    result = disk_cache.get("a" * 64)
+    assert result["image"] == b"x" * 100
+    assert result["strategy"] == "GrabCut"
+    assert result["cached"] is True
+    assert disk_cache.get("b" * 64) is None
+
+
+def test_evicts_least_recently_used(disk_cache):
+    """容量を超えた場合に最も使われていない結果から削除されることを確認"""
+    disk_cache.set("a" * 64, make_result(1000))
+    disk_cache.set("b" * 64, make_result(1000))
+    disk_cache.get("a" * 64)
+    disk_cache.set("c" * 64, make_result(1000))
+
+    assert disk_cache.get("a" * 64) is not None
+    assert disk_cache.get("b" * 64) is None
+    assert disk_cache.get("c" * 64) is not None
+
+
+def test_index_is_restored_from_disk(tmp_path):
+    """再生成したキャッシュでもディスク上の結果を容量に含めることを確認"""
+    ResultCache(DiskResultBackend(str(tmp_path)), max_bytes=2500).set("a" * 64, make_result(1000))
+
+    cache = ResultCache(DiskResultBackend(str(tmp_path)), max_bytes=2500)
+    cache.set("b" * 64, make_result(1000))
+    cache.set("c" * 64, make_result(1000))
+
+    assert cache.get("a" * 64) is None
+    assert cache.get("c" * 64) is not None
+
+
+def test_rescan_is_throttled(tmp_path, mocker):
+    """容量の超過時にディレクトリ全体の走査を保存のたびには行わず、間隔をあけて行うことを確認"""
+    backend = DiskResultBackend(str(tmp_path))
+    cache = ResultCache(backend, max_bytes=2500, rescan_interval=60)
+    entries = mocker.spy(backend, "entries")
+
+    for key in "abcde":
+        cache.set(key * 64, make_result(1000))
+    assert entries.call_count == 0
+    assert cache.get("d" * 64) is not None
+    assert cache.get("c" * 64) is None
+
+    # 他のプロセスが保存した結果は間隔の経過後に取り込まれる
+    ResultCache(DiskResultBackend(str(tmp_path)), max_bytes=2500).set("f" * 64, make_result(1000))
+    cache._last_load -= 60
+    cache.set("g" * 64, make_result(1000))
+    assert entries.call_count == 1
+    assert {key for key, _ in backend.entries()} == {"e" * 64, "g" * 64}
+
+
+def test_django_cache_backend():
+    """Djangoのキャッシュフレームワークをバックエンドに使用できることを確認"""
+    cache = ResultCache(DjangoCacheResultBackend("default"), max_bytes=2500)
+    cache.set("a" * 64, make_result(1000))
+    cache.set("b" * 64, make_result(1000))
+    cache.set("c" * 64, make_result(1000))
+
+    assert cache.get("a" * 64) is None
+    assert cache.get("c" * 64)["image"] == b"x" * 1000
+
+
+def test_make_key_depends_on_options():
+    """パイプラインの設定が異なる場合は別のキーになることを確認"""
+    key_fallback = ResultCache.make_key(b"image", {"strategy_mode": "fallback"})
+    key_scored = ResultCache.make_key(b"image", {"strategy_mode": "scored"})
+
+    assert key_fallback != key_scored
+    assert key_fallback == ResultCache.make_key(b"image", {"strategy_mode": "fallback"})
+
+
+def test_stored_without_pickle(disk_cache, tmp_path):
+    """結果はヘッダーとWebP画像のバイト列で保存され、形式の異なるデータ（pickle など）は読み込まないことを確認"""
+    disk_cache.set("a" * 64, make_result(100))
+    with open(tmp_path / "aa" / ("a" * 64), "rb") as f:
+        assert f.read().endswith(b"x" * 100)
+
+    planted = tmp_path / "bb" / ("b" * 64)
+    planted.parent.mkdir()
+    planted.write_bytes(pickle.dumps({"image": b"x", "strategy": "GrabCut"}))
+
+    assert disk_cache.get("b" * 64) is None
+    assert not planted.exists()
+
+
+def test_disk_backend_removes_temp_file_on_failure(tmp_path, mocker):
+    """書き込みに失敗した場合は一時ファイルを残さないことを確認"""
+    backend = DiskResultBackend(str(tmp_path))
+    mocker.patch("apps.image_processing.result_cache.os.replace", side_effect=OSError("disk full"))
+
+    with pytest.raises(OSError):
+        backend.set("a" * 64, b"data")
+
+    assert os.listdir(tmp_path / "aa") == []
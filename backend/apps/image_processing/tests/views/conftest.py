@@ -0,0 +1,82 @@
+import io
+import shutil
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.accounts.models import CustomUser
+
+
+@pytest.fixture(autouse=True)
+def media_storage(settings, tmp_path):
+    """テスト用のメディアストレージをセットアップ"""
+    settings.MEDIA_ROOT = tmp_path / "media"
+    settings.MEDIA_URL = "/media/"
+    settings.MEDIA_ROOT.mkdir()
+
+    yield
+
+    shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+
+@pytest.fixture
+def user():
+    """テストユーザーを作成"""
+    return CustomUser.objects.create_user(
+        email="test@example.com",
+        password="testpass123",
+        username="testuser",
+        is_active=True,
+    )
+
+
+@pytest.fixture
+def test_image(media_storage):
+    """テスト用の画像を作成"""
+    file = io.BytesIO()
+    image = Image.new("RGB", (100, 100), "white")
+    image.save(file, "jpeg")
+    file.name = "test.jpg"
+    file.seek(0)
+    return SimpleUploadedFile(name=file.name, content=file.read(), content_type="image/jpeg")
+
+
+@pytest.fixture
+def api_client():
+    """未認証APIクライアント"""
+    return APIClient()
+
+
+@pytest.fixture
+def auth_token(user):
+    """JWT認証トークンを生成"""
+    refresh = RefreshToken.for_user(user)
+    return {
+        "refresh": str(refresh),
+        "access": str(refresh.access_token),
+    }
+
+
+@pytest.fixture
+def auth_client(api_client, auth_token):
+    """認証済みAPIクライアント"""
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {auth_token["access"]}')
+    return api_client
+
+
+@pytest.fixture(autouse=True)
+def disable_result_cache(settings):
+    """結果キャッシュを無効化（キャッシュのテストでは個別に有効化する）"""
+    settings.IMAGE_PROCESSING = {**settings.IMAGE_PROCESSING, "RESULT_CACHE": None}
+
+
+@pytest.fixture
+def result_cache_settings(settings, tmp_path):
+    """ディスクの結果キャッシュを有効化"""
+    settings.IMAGE_PROCESSING = {
+        **settings.IMAGE_PROCESSING,
+        "RESULT_CACHE": {"BACKEND": "disk", "LOCATION": str(tmp_path / "results"), "MAX_BYTES": 1024 * 1024},
+    }
@@ -0,0 +1,82 @@
+import json
+from io import BytesIO
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+
+from apps.image_processing.executor import SegmentationPool
+
+
+def read_lines(response):
+    """NDJSONのレスポンスを1行ずつ読み込む"""
+    content = b"".join(response.streaming_content).decode()
+    return [json.loads(line) for line in content.splitlines()]
+
+
+def make_image(name, color):
+    image = Image.new("RGB", (100, 100), color)
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+
+@pytest.mark.django_db
+def test_remove_bg_batch_authentication(api_client):
+    """未認証アクセスのテスト"""
+    response = api_client.post("/api/image/remove-bg/batch/")
+    assert response.status_code == 401
+
+
+@pytest.mark.django_db
+def test_remove_bg_batch_success(auth_client):
+    """正常系: すべての画像の結果が1行ずつ返ることのテスト"""
+    images = [make_image(f"item{i}.jpg", (255, 255 - i * 10, 255)) for i in range(3)]
+    invalid_file = SimpleUploadedFile("invalid.png", b"invalid image content", content_type="image/png")
+
+    response = auth_client.post("/api/image/remove-bg/batch/", {"images": [*images, invalid_file]}, format="multipart")
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "application/x-ndjson"
+
+    items = sorted(read_lines(response), key=lambda item: item["index"])
+    assert [item["name"] for item in items] == ["item0.jpg", "item1.jpg", "item2.jpg", "invalid.png"]
+    assert all(item["status"] == "success" and item["image"] for item in items[:3])
+    assert items[3]["status"] == "error"
+    assert items[3]["status_code"] == 400
+
+
+@pytest.mark.django_db
+def test_remove_bg_batch_no_image(auth_client):
+    """画像なしでのリクエストテスト"""
+    response = auth_client.post("/api/image/remove-bg/batch/")
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_remove_bg_batch_too_many_images(auth_client, settings):
+    """上限を超える枚数のリクエストテスト"""
+    settings.IMAGE_PROCESSING = {**settings.IMAGE_PROCESSING, "MAX_BATCH_SIZE": 1}
+    images = [make_image(f"item{i}.jpg", (255, 255, 255)) for i in range(2)]
+
+    response = auth_client.post("/api/image/remove-bg/batch/", {"images": images}, format="multipart")
+
+    assert response.status_code == 400
+    assert response.json()["status"] == "error"
+
+
+@pytest.mark.django_db
+def test_remove_bg_batch_exceeds_queue_size(auth_client, mocker):
+    """待ち行列の上限を超える枚数でも、空いた枠に順次登録してすべて処理されることのテスト"""
+    pool = SegmentationPool(workers=1, max_queue_size=0, job_timeout=30)
+    mocker.patch("apps.image_processing.batch.get_pool", return_value=pool)
+    images = [make_image(f"item{i}.jpg", (255, 255 - i * 10, 255)) for i in range(3)]
+
+    try:
+        response = auth_client.post("/api/image/remove-bg/batch/", {"images": images}, format="multipart")
+        items = read_lines(response)
+    finally:
+        pool.shutdown(wait=False)
+
+    assert sorted(item["index"] for item in items) == [0, 1, 2]
+    assert all(item["status"] == "success" for item in items)
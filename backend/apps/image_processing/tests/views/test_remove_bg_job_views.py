@@ -0,0 +1,98 @@
+import time
+from concurrent.futures import Future
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from apps.image_processing import jobs
+from apps.image_processing.exceptions import JobTimeoutError
+
+
+def wait_for_job(auth_client, job_id, timeout=30):
+    """ジョブが完了するまでポーリング"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        response = auth_client.get(f"/api/image/remove-bg/jobs/{job_id}/")
+        if response.json()["job_status"] != "pending":
+            return response
+        time.sleep(0.1)
+    raise TimeoutError("Job did not finish in time")
+
+
+@pytest.mark.django_db
+def test_remove_bg_job_authentication(api_client):
+    """未認証アクセスのテスト"""
+    response = api_client.post("/api/image/remove-bg/jobs/")
+    assert response.status_code == 401
+
+
+@pytest.mark.django_db
+def test_remove_bg_job_success(auth_client, test_image):
+    """正常系: ジョブ登録から結果取得までのテスト"""
+    response = auth_client.post("/api/image/remove-bg/jobs/", {"image": test_image}, format="multipart")
+
+    assert response.status_code == 202
+    job_id = response.json()["job_id"]
+
+    response = wait_for_job(auth_client, job_id)
+    assert response.json()["job_status"] == "success"
+    assert "process_time" in response.json()
+
+    response = auth_client.get(f"/api/image/remove-bg/jobs/{job_id}/result/")
+    assert response.status_code == 200
+    assert response["Content-Type"] == "image/webp"
+    assert response.content[8:12] == b"WEBP"
+
+
+@pytest.mark.django_db
+def test_remove_bg_job_no_image(auth_client):
+    """画像なしでのジョブ登録テスト"""
+    response = auth_client.post("/api/image/remove-bg/jobs/")
+    assert response.status_code == 400
+    assert response.json()["status"] == "error"
+
+
+@pytest.mark.django_db
+def test_remove_bg_job_invalid_image(auth_client):
+    """無効な画像データのジョブはエラー状態になることのテスト"""
+    invalid_file = SimpleUploadedFile("test.png", b"invalid image content", content_type="image/png")
+
+    response = auth_client.post("/api/image/remove-bg/jobs/", {"image": invalid_file}, format="multipart")
+    job_id = response.json()["job_id"]
+
+    response = wait_for_job(auth_client, job_id)
+    assert response.json()["job_status"] == "error"
+
+    response = auth_client.get(f"/api/image/remove-bg/jobs/{job_id}/result/")
+    assert response.status_code == 400
+
+
+@pytest.mark.django_db
+def test_remove_bg_job_not_found(auth_client):
+    """存在しないジョブの取得テスト"""
+    response = auth_client.get("/api/image/remove-bg/jobs/unknown/")
+    assert response.status_code == 404
+
+
+@pytest.mark.django_db
+def test_remove_bg_job_timeout_measured_by_pool(auth_client, test_image, mocker):
+    """待ち行列での待ち時間はタイムアウトに含めず、プールがタイムアウトとしたジョブのみ 504 になることのテスト"""
+    future = Future()
+    mocker.patch.object(jobs, "get_pool").return_value.submit.return_value = future
+    mocker.patch.object(jobs, "find_cached_result", return_value=(None, None))
+
+    response = auth_client.post("/api/image/remove-bg/jobs/", {"image": test_image}, format="multipart")
+    job_id = response.json()["job_id"]
+
+    # 登録から制限時間を過ぎても実行待ちの間は pending のまま
+    job = jobs._get_cache().get(jobs._job_key(job_id))
+    jobs._save_job(job_id, {**job, "submitted_at": job["submitted_at"] - 3600})
+    response = auth_client.get(f"/api/image/remove-bg/jobs/{job_id}/")
+    assert response.json()["job_status"] == "pending"
+
+    future.set_exception(JobTimeoutError())
+    response = auth_client.get(f"/api/image/remove-bg/jobs/{job_id}/")
+    assert response.json()["job_status"] == "error"
+
+    response = auth_client.get(f"/api/image/remove-bg/jobs/{job_id}/result/")
+    assert response.status_code == 504
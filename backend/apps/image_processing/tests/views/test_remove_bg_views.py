@@ -1,70 +1,7 @@
-import io
-import shutil
-
 import pytest
 from django.core.files.uploadedfile import SimpleUploadedFile
-from PIL import Image
-from rest_framework.test import APIClient
-from rest_framework_simplejwt.tokens import RefreshToken
-
-from apps.accounts.models import CustomUser
-
-
-@pytest.fixture(autouse=True)
-def media_storage(settings, tmp_path):
-    """テスト用のメディアストレージをセットアップ"""
-    settings.MEDIA_ROOT = tmp_path / "media"
-    settings.MEDIA_URL = "/media/"
-    settings.MEDIA_ROOT.mkdir()
-
-    yield
-
-    shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
-
-
-@pytest.fixture
-def user():
-    """テストユーザーを作成"""
-    return CustomUser.objects.create_user(
-        email="test@example.com",
-        password="testpass123",
-        username="testuser",
-        is_active=True,
-    )
-
-
-@pytest.fixture
-def test_image(media_storage):
-    """テスト用の画像を作成"""
-    file = io.BytesIO()
-    image = Image.new("RGB", (100, 100), "white")
-    image.save(file, "jpeg")
-    file.name = "test.jpg"
-    file.seek(0)
-    return SimpleUploadedFile(name=file.name, content=file.read(), content_type="image/jpeg")
-
 
-@pytest.fixture
-def api_client():
-    """未認証APIクライアント"""
-    return APIClient()
-
-
-@pytest.fixture
-def auth_token(user):
-    """JWT認証トークンを生成"""
-    refresh = RefreshToken.for_user(user)
-    return {
-        "refresh": str(refresh),
-        "access": str(refresh.access_token),
-    }
-
-
-@pytest.fixture
-def auth_client(api_client, auth_token):
-    """認証済みAPIクライアント"""
-    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {auth_token["access"]}')
-    return api_client
+from apps.image_processing.exceptions import PoolBusyError
 
 
 @pytest.mark.django_db
@@ -83,6 +20,7 @@ def test_remove_bg_success(auth_client, test_image):
     assert response.json()["status"] == "success"
     assert "image" in response.json()
     assert "process_time" in response.json()
+    assert "Accept" in response["Vary"]
 
 
 @pytest.mark.django_db
@@ -102,3 +40,65 @@ def test_remove_bg_invalid_image(auth_client):
 
     assert response.status_code == 400
     assert response.json()["status"] == "error"
+
+
+@pytest.mark.django_db
+def test_remove_bg_busy(auth_client, test_image, mocker):
+    """プールの待ち行列が一杯の場合のテスト"""
+    mocker.patch("apps.image_processing.views.get_pool").return_value.run.side_effect = PoolBusyError()
+
+    response = auth_client.post("/api/image/remove-bg/", {"image": test_image}, format="multipart")
+
+    assert response.status_code == 503
+    assert response.json()["status"] == "error"
+    assert "Retry-After" in response
+
+
+@pytest.mark.django_db
+def test_remove_bg_webp_response(auth_client, test_image):
+    """Accept: image/webp の場合はWebP画像をそのまま返すことのテスト"""
+    response = auth_client.post(
+        "/api/image/remove-bg/", {"image": test_image}, format="multipart", HTTP_ACCEPT="image/webp"
+    )
+
+    assert response.status_code == 200
+    assert response["Content-Type"] == "image/webp"
+    assert response.content[8:12] == b"WEBP"
+    assert float(response["X-Process-Time"]) > 0
+    assert response["X-Removal-Strategy"]
+    assert "Accept" in response["Vary"]
+
+
+@pytest.mark.django_db
+def test_remove_bg_webp_response_error(api_client):
+    """Accept: image/webp でもエラーはJSONで返すことのテスト"""
+    response = api_client.post("/api/image/remove-bg/", HTTP_ACCEPT="image/webp")
+
+    assert response.status_code == 401
+    assert response["Content-Type"] == "application/json"
+
+
+@pytest.mark.django_db
+def test_remove_bg_cache_hit(auth_client, test_image, result_cache_settings, mocker):
+    """同じ画像の再アップロード時は画像処理を行わずキャッシュを返すことのテスト"""
+    first = auth_client.post("/api/image/remove-bg/", {"image": test_image}, format="multipart")
+    assert first.json()["cached"] is False
+
+    get_pool = mocker.patch("apps.image_processing.views.get_pool")
+    test_image.seek(0)
+    second = auth_client.post("/api/image/remove-bg/", {"image": test_image}, format="multipart")
+
+    assert second.status_code == 200
+    assert second.json()["cached"] is True
+    assert second.json()["image"] == first.json()["image"]
+    get_pool.assert_not_called()
+
+
+@pytest.mark.django_db
+def test_remove_bg_server_timing(auth_client, test_image):
+    """段階ごとの処理時間が Server-Timing ヘッダーで返ることのテスト"""
+    response = auth_client.post("/api/image/remove-bg/", {"image": test_image}, format="multipart")
+
+    assert response.status_code == 200
+    stages = [entry.split(";")[0] for entry in response["Server-Timing"].split(", ")]
+    assert stages == ["decode", "resize", "segmentation", "morphology", "median_blur", "encode", "total"]
@@ -1,7 +1,11 @@
 from django.urls import path
 
-from .views import remove_bg
+from .views import remove_bg, remove_bg_batch, remove_bg_job_create, remove_bg_job_detail, remove_bg_job_result
 
 urlpatterns = [
     path("remove-bg/", remove_bg, name="remove_bg"),
+    path("remove-bg/batch/", remove_bg_batch, name="remove_bg_batch"),
+    path("remove-bg/jobs/", remove_bg_job_create, name="remove_bg_job_create"),
+    path("remove-bg/jobs/<str:job_id>/", remove_bg_job_detail, name="remove_bg_job_detail"),
+    path("remove-bg/jobs/<str:job_id>/result/", remove_bg_job_result, name="remove_bg_job_result"),
 ]
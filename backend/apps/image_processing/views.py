@@ -1,154 +1,211 @@
 import base64
+import json
 import time
-from functools import lru_cache
-from typing import Tuple
 
-import cv2
-import numpy as np
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
 from django.views.decorators.csrf import csrf_exempt
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.settings import api_settings
 
-# 定数の定義
-MAX_SIZE = 650
-QUALITY_PARAM = [cv2.IMWRITE_WEBP_QUALITY, 75]
-MIN_FOREGROUND_RATIO = 0.01  # 前景検出の最小比率
+from .batch import iter_batch_results
+from .conf import get_pipeline_options, get_setting
+from .constants import JOB_STATUS_ERROR, JOB_STATUS_SUCCESS
+from .exceptions import ImageProcessingError
+from .executor import get_pool
+from .jobs import get_job, get_job_result, submit_job
+from .metrics import format_server_timing, record_timings
+from .pipeline import remove_background
+from .renderers import WebPRenderer
+from .result_cache import find_cached_result, store_result
 
+# JSON に加えて Accept: image/webp でのバイナリ応答を受け付ける
+IMAGE_RENDERER_CLASSES = [*api_settings.DEFAULT_RENDERER_CLASSES, WebPRenderer]
 
-# キャッシュサイズを増やしてヒット率を向上
-@lru_cache(maxsize=256)
-def get_kernel(size: Tuple[int, int] = (3, 3)):
-    """カーネルの生成をキャッシュ"""
-    return np.ones(size, np.uint8)
 
+def _error_response(error):
+    """画像処理の例外をエラーレスポンスに変換"""
+    response = JsonResponse({"status": "error", "message": str(error)}, status=error.status_code)
+    if error.retry_after is not None:
+        response["Retry-After"] = str(error.retry_after)
+    return response
 
-def threshold_removal(img):
-    """閾値処理による背景除去"""
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)  # グレースケール変換: 画像をグレースケールに変換
-    blurred = cv2.medianBlur(gray, 3)  # メディアンブラーに変更（ノイズに強い）
-    return cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
-
-
-def color_distance_removal(img: np.ndarray) -> np.ndarray:
-    """色距離による背景除去"""
-    # エッジサンプリングを効率化
-    edges = np.concatenate(
-        [
-            img[0:1].reshape(-1, 3),  # 上端
-            img[-1:].reshape(-1, 3),  # 下端
-            img[:, 0:1].reshape(-1, 3),  # 左端
-            img[:, -1:].reshape(-1, 3),  # 右端
-        ]
-    )
-
-    background_color = np.median(edges, axis=0)  # 各ピクセルと背景色の距離を計算
-    diff = np.sqrt(np.sum((img - background_color) ** 2, axis=2))  # ベクトル化された計算
-    threshold = np.mean(diff) + np.std(diff)
-    return (diff > threshold).astype(np.uint8) * 255
 
+# 処理全体の流れ
+@csrf_exempt
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+@renderer_classes(IMAGE_RENDERER_CLASSES)
+def remove_bg(request):
+    """
+    背景除去エンドポイント
+    Accept: image/webp の場合はWebP画像をそのまま返し、処理情報はレスポンスヘッダーに含める
+    """
+    if request.method != "POST":
+        return JsonResponse({"status": "error", "message": "Invalid request"}, status=400)
 
-def grabcut_removal(img):
-    """GrabCut処理"""
-    # マスクとモデルを初期化
-    mask = np.zeros(img.shape[:2], np.uint8)
-    bgd_model = np.zeros((1, 65), np.float64)
-    fgd_model = np.zeros((1, 65), np.float64)
+    start_time = time.time()
+    image_file = request.FILES.get("image")
 
-    # マージンを調整
-    margin = int(min(img.shape[0], img.shape[1]) * 0.02)
-    rect = (margin, margin, img.shape[1] - 2 * margin, img.shape[0] - 2 * margin)
+    if not image_file:
+        return JsonResponse({"status": "error", "message": "No image provided"}, status=400)
 
-    # イテレーション回数を2回に減らして処理を軽量化
-    cv2.grabCut(img, mask, rect, bgd_model, fgd_model, 3, cv2.GC_INIT_WITH_RECT)
-    return np.where((mask == 2) | (mask == 0), 0, 1).astype(np.uint8)
+    try:
+        image_bytes = image_file.read()
+        options = get_pipeline_options()
+
+        # 同じ画像・同じ設定の結果があれば画像処理を省略
+        cache_key, result = find_cached_result(image_bytes, options)
+
+        if result is None:
+            # OpenCVの処理はリクエストスレッドではなくワーカープロセスで実行
+            result = get_pool().run(remove_background, image_bytes, **options)
+            store_result(cache_key, result)
+
+        if request.accepted_renderer.format == WebPRenderer.format:
+            # base64 変換を行わず、エンコード済みのバイト列をそのまま返す
+            response = HttpResponse(result["image"], content_type=WebPRenderer.media_type)
+            process_time = time.time() - start_time
+            response["X-Process-Time"] = str(process_time)
+            response["X-Removal-Strategy"] = result["strategy"]
+            response["X-Cache"] = "HIT" if result.get("cached") else "MISS"
+        else:
+            img_str = base64.b64encode(result["image"]).decode()
+            process_time = time.time() - start_time
+
+            response = JsonResponse(
+                {
+                    "status": "success",
+                    "image": img_str,
+                    "process_time": process_time,
+                    "strategy": result["strategy"],
+                    "strategy_timings": result["strategy_timings"],
+                    "cached": result.get("cached", False),
+                }
+            )
+
+        # 同じURLで Accept によって形式が変わるため、共有キャッシュが形式を取り違えないようにする
+        patch_vary_headers(response, ["Accept"])
+
+        # 段階ごとの処理時間をヘッダーとログに出力
+        stage_timings = record_timings("sync", result, process_time)
+        response["Server-Timing"] = format_server_timing(stage_timings)
+        return response
+
+    except ImageProcessingError as e:
+        return _error_response(e)
+    except Exception as e:
+        return JsonResponse({"status": "error", "message": str(e)}, status=500)
 
 
-def preprocess_image(img):
-    """画像の前処理"""
-    height, width = img.shape[:2]
-    if max(height, width) > MAX_SIZE:
-        scale = MAX_SIZE / max(height, width)
-        new_size = (int(width * scale), int(height * scale))
-        # INTER_AREA を使用して画質を維持しながらリサイズ
-        return cv2.resize(img, new_size, interpolation=cv2.INTER_AREA)
-    return img
+@csrf_exempt
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def remove_bg_batch(request):
+    """
+    一括背景除去エンドポイント
+    images で受け取った複数の画像を並列に処理し、完了した順に1件1行のJSON（NDJSON）で返す
+    """
+    image_files = request.FILES.getlist("images")
+
+    if not image_files:
+        return JsonResponse({"status": "error", "message": "No image provided"}, status=400)
 
+    max_batch_size = get_setting("MAX_BATCH_SIZE")
+    if len(image_files) > max_batch_size:
+        return JsonResponse(
+            {"status": "error", "message": f"Too many images (max {max_batch_size})"},
+            status=400,
+        )
 
-def improve_mask(mask):
-    """マスクの品質改善"""
-    kernel = get_kernel((3, 3))
-    # モルフォロジー演算を1回の実行に最適化
-    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
-    return cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+    start_time = time.time()
+    # レスポンスの送信中はアップロードファイルが閉じられる可能性があるため先に読み込む
+    names = [image_file.name for image_file in image_files]
+    images = [image_file.read() for image_file in image_files]
+    options = get_pipeline_options()
+
+    def stream():
+        for index, result, error in iter_batch_results(images, options):
+            item = {"index": index, "name": names[index]}
+            if result is not None:
+                record_timings("batch", result, time.time() - start_time)
+            if error is not None:
+                item.update({"status": "error", "message": str(error), "status_code": error.status_code})
+            else:
+                item.update(
+                    {
+                        "status": "success",
+                        "image": base64.b64encode(result["image"]).decode(),
+                        "process_time": time.time() - start_time,
+                        "strategy": result["strategy"],
+                        "strategy_timings": result["strategy_timings"],
+                        "cached": result.get("cached", False),
+                    }
+                )
+            yield json.dumps(item) + "\n"
+
+    response = StreamingHttpResponse(stream(), content_type="application/x-ndjson")
+    # プロキシでのバッファリングを無効化し、1件ずつクライアントに届ける
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
-# 処理全体の流れ
 @csrf_exempt
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
-def remove_bg(request):
-    """背景除去エンドポイント"""
-    if request.method != "POST":
-        return JsonResponse({"status": "error", "message": "Invalid request"}, status=400)
-
-    start_time = time.time()
+def remove_bg_job_create(request):
+    """背景除去ジョブ登録エンドポイント（ジョブIDを即時に返す）"""
     image_file = request.FILES.get("image")
 
     if not image_file:
         return JsonResponse({"status": "error", "message": "No image provided"}, status=400)
 
     try:
-        # 効率的な画像読み込み
-        img_array = np.frombuffer(image_file.read(), np.uint8)
-        img = cv2.imdecode(img_array, cv2.IMREAD_COLOR)
-
-        if img is None:
-            return JsonResponse({"status": "error", "message": "Failed to load image"}, status=400)
+        job_id = submit_job(image_file.read(), request.user.pk)
+    except ImageProcessingError as e:
+        return _error_response(e)
 
-        # 前処理
-        img = preprocess_image(img)
+    return JsonResponse({"status": "success", "job_id": job_id}, status=202)
 
-        # フォールバックを含む背景除去戦略
-        final_mask = None
-        methods = [
-            (grabcut_removal, "GrabCut"),
-            (threshold_removal, "Threshold"),
-            (color_distance_removal, "ColorDistance"),
-        ]
 
-        for removal_func, _method_name in methods:
-            try:
-                mask = removal_func(img)
-                mask_ratio = np.sum(mask) / (img.shape[0] * img.shape[1])
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def remove_bg_job_detail(request, job_id):
+    """背景除去ジョブの状態確認エンドポイント"""
+    job = get_job(job_id, request.user.pk)
 
-                if mask_ratio > MIN_FOREGROUND_RATIO:
-                    final_mask = mask
-                    break
-            except Exception:
-                continue
+    if job is None:
+        return JsonResponse({"status": "error", "message": "Job not found"}, status=404)
 
-        if final_mask is None:
-            raise Exception("All background removal methods failed")
+    data = {"status": "success", "job_id": job_id, "job_status": job["status"]}
+    if job["status"] == JOB_STATUS_SUCCESS:
+        data["process_time"] = job["process_time"]
+        data["strategy"] = job["strategy"]
+        data["strategy_timings"] = job["strategy_timings"]
+    elif job["status"] == JOB_STATUS_ERROR:
+        data["message"] = job["message"]
 
-        # マスクの改善と適用
-        final_mask = improve_mask(final_mask)
-        foreground = cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
-        foreground[:, :, 3] = final_mask * 255
+    return JsonResponse(data)
 
-        # エッジの改善（軽量化）
-        foreground[:, :, 3] = cv2.medianBlur(foreground[:, :, 3], 3)
 
-        # WebP形式で圧縮
-        is_success, buffer = cv2.imencode(".webp", foreground, QUALITY_PARAM)
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+@renderer_classes(IMAGE_RENDERER_CLASSES)
+def remove_bg_job_result(request, job_id):
+    """背景除去ジョブの結果取得エンドポイント（WebP画像を返す）"""
+    job = get_job(job_id, request.user.pk)
 
-        if not is_success:
-            raise Exception("Failed to encode image")
+    if job is None:
+        return JsonResponse({"status": "error", "message": "Job not found"}, status=404)
 
-        img_str = base64.b64encode(buffer).decode()
-        process_time = time.time() - start_time
+    if job["status"] == JOB_STATUS_ERROR:
+        return JsonResponse({"status": "error", "message": job["message"]}, status=job["status_code"])
 
-        return JsonResponse({"status": "success", "image": img_str, "process_time": process_time})
+    image = get_job_result(job_id) if job["status"] == JOB_STATUS_SUCCESS else None
+    if image is None:
+        return JsonResponse(
+            {"status": "error", "message": "Job is not finished", "job_status": job["status"]}, status=409
+        )
 
-    except Exception as e:
-        return JsonResponse({"status": "error", "message": str(e)}, status=500)
+    return HttpResponse(image, content_type="image/webp")
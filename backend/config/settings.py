@@ -26,6 +26,9 @@ else:  # 本番環境
     CSRF_TRUSTED_ORIGINS = env.list("CSRF_TRUSTED_ORIGINS")
 
 
+# フロントエンドから参照できるレスポンスヘッダー（背景除去の処理情報）
+CORS_EXPOSE_HEADERS = ["X-Process-Time", "X-Removal-Strategy", "X-Cache"]
+
 # 自動的にURLにスラッシュを入れてくれる設定
 APPEND_SLASH = True
 
@@ -36,6 +39,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",  # pg_trgm によるブランド検索
     # 追加
     "corsheaders",
     # 認証系
@@ -162,6 +166,85 @@ WSGI_APPLICATION = "config.wsgi.application"
 # アップロードするファイルサイズの最大値(2MB)
 MAX_FILE_SIZE_LIMIT = 2000000
 
+# -------------------- キャッシュ設定 --------------------
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    # 背景除去ジョブの状態・結果（gunicornの複数ワーカー間で共有するためファイルベース）
+    "image_jobs": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": env("IMAGE_JOB_CACHE_DIR", default="/tmp/virtual_closet/image_jobs"),
+    },
+    # 登録時に必要なデータのキャッシュのバージョン（複数ワーカー・loaddata を実行したプロセスの間で共有）
+    "metadata": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": env("METADATA_CACHE_DIR", default="/tmp/virtual_closet/metadata"),
+    },
+}
+METADATA_CACHE_ALIAS = "metadata"
+
+# -------------------- ブランド検索設定 --------------------
+# memory: プロセス内のインデックス / trigram: PostgreSQL の pg_trgm インデックス（複数ノード構成向け）
+BRAND_SEARCH_BACKEND = env("BRAND_SEARCH_BACKEND", default="memory")
+BRAND_SEARCH_LIMIT = env.int("BRAND_SEARCH_LIMIT", default=20)  # 検索結果の最大件数
+
+# -------------------- 画像処理設定 --------------------
+IMAGE_PROCESSING = {
+    "WORKERS": env.int("IMAGE_PROCESSING_WORKERS", default=2),  # 背景除去のワーカープロセス数
+    "CV2_THREADS": env.int("IMAGE_PROCESSING_CV2_THREADS", default=1),  # ワーカーごとのOpenCVスレッド数
+    "MAX_QUEUE_SIZE": env.int("IMAGE_PROCESSING_MAX_QUEUE_SIZE", default=8),  # 実行待ちにできるジョブ数
+    "JOB_TIMEOUT": env.int("IMAGE_PROCESSING_JOB_TIMEOUT", default=30),  # 1ジョブあたりの制限時間（秒）
+    "JOB_CACHE_ALIAS": "image_jobs",
+    "JOB_TTL": 60 * 10,  # ジョブの保持期間（秒）
+    "MAX_BATCH_SIZE": env.int("IMAGE_PROCESSING_MAX_BATCH_SIZE", default=20),  # 一括背景除去の最大枚数
+    "STRATEGY_MODE": env("IMAGE_PROCESSING_STRATEGY_MODE", default="fallback"),  # fallback / scored
+    "GOOD_ENOUGH_SCORE": 0.6,  # scored モードでGrabCutを省略するスコアの閾値
+    "GRABCUT_MODE": env("IMAGE_PROCESSING_GRABCUT_MODE", default="full"),  # full / pyramid
+    # 背景除去結果のキャッシュ（同じ画像の再アップロード時に画像処理を省略）
+    "RESULT_CACHE": {
+        "BACKEND": env("IMAGE_RESULT_CACHE_BACKEND", default="disk"),  # disk / django
+        "LOCATION": env("IMAGE_RESULT_CACHE_DIR", default="/tmp/virtual_closet/remove_bg_results"),
+        # BACKEND が django の場合に使用するキャッシュ
+        # （MAX_BYTES はプロセスごとの管理になるため、全体の上限はキャッシュ側の設定で制限する）
+        "CACHE_ALIAS": "default",
+        "MAX_BYTES": env.int("IMAGE_RESULT_CACHE_MAX_BYTES", default=256 * 1024 * 1024),
+        "RESCAN_INTERVAL": 60,  # 他のプロセスが保存した結果を容量の判定に取り込み直す間隔（秒）
+    },
+    # 段階ごとの処理時間のヒストグラム（manage.py image_processing_timings で出力）
+    "TIMING_HISTOGRAM_DIR": env(
+        "IMAGE_PROCESSING_TIMING_HISTOGRAM_DIR", default="/tmp/virtual_closet/remove_bg_timings"
+    )
+    if env.bool("IMAGE_PROCESSING_TIMING_HISTOGRAMS", default=False)
+    else None,
+}
+
+# コーディネート画像の合成に使用するアイテム画像のサムネイルの保存先
+COORDINATE_THUMBNAIL_CACHE_DIR = env("COORDINATE_THUMBNAIL_CACHE_DIR", default="/tmp/virtual_closet/item_thumbnails")
+# 背景色を除いたコーディネートのアイテムレイヤーの保存先（背景色のみの変更時に再利用）
+COORDINATE_LAYER_CACHE_DIR = env("COORDINATE_LAYER_CACHE_DIR", default="/tmp/virtual_closet/coordinate_layers")
+
+# コーディネート画像の生成モード（sync: リクエスト内で生成 / deferred: 保存後にバックグラウンドで生成）
+COORDINATE_RENDER_MODE = env("COORDINATE_RENDER_MODE", default="sync")
+COORDINATE_RENDER_WORKERS = env.int("COORDINATE_RENDER_WORKERS", default=2)
+# アイテム画像の合成処理の実装（pil / numpy）
+COORDINATE_COMPOSITOR = env("COORDINATE_COMPOSITOR", default="pil")
+
+# -------------------- ログ設定 --------------------
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        # 背景除去の段階ごとの処理時間（1リクエスト1行のJSON）
+        "apps.image_processing.metrics": {"handlers": ["console"], "level": "INFO", "propagate": False},
+        # コーディネート画像の圧縮（品質・エンコード回数）
+        "apps.coordinate.rendering": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
+
 # -------------------- 環境別設定 --------------------
 if DEBUG:  # 開発環境
     # -------------------- データベース設定（開発環境） --------------------
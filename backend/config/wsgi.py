@@ -5,3 +5,13 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
 application = get_wsgi_application()
+
+# ブランド検索のインデックスをワーカーの起動時に構築（最初の検索を待たせない）
+from apps.fashion_items.brand_search import warm_brand_index  # noqa: E402
+
+warm_brand_index()
+
+# 背景除去のワーカープロセスをワーカーの起動時に起動（最初のアップロードを待たせない）
+from apps.image_processing.executor import start_pool  # noqa: E402
+
+start_pool()
@@ -0,0 +1,74 @@
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    (created_at, id) のキーセットによるページネーション
+    クエリパラメータ cursor がある場合（空の場合は先頭ページ）は直前のページの最後の行より後の行を取得し、
+    件数の取得（COUNT）・OFFSET を行わない。cursor がない場合は従来どおりページ番号で取得する
+
+    並び順は作成日時の降順（同じ作成日時は id の降順）で固定し、ページ間の重複・抜けを防ぐ
+    """
+
+    cursor_query_param = "cursor"
+    ordering = ("-created_at", "-id")
+    invalid_cursor_message = "不正なカーソルです"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        cursor = self.decode_cursor(request.query_params[self.cursor_query_param])
+        if cursor is not None:
+            created_at, pk = cursor
+            queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+
+        # 1件多く取得して次のページの有無を判定
+        rows = list(queryset[: page_size + 1])
+        self.page = rows[:page_size]
+        self.has_next = len(rows) > page_size
+        return self.page
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(last.created_at, last.pk))
+
+    def encode_cursor(self, created_at, pk):
+        return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{pk}".encode()).decode()
+
+    def decode_cursor(self, encoded):
+        """カーソルを (作成日時, id) に変換（空の場合は None）"""
+        if not encoded:
+            return None
+        try:
+            created_at, pk = base64.urlsafe_b64decode(encoded.encode()).decode().split("|")
+            created_at = parse_datetime(created_at)
+            pk = int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+            raise NotFound(self.invalid_cursor_message) from e
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk
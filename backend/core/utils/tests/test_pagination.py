@@ -0,0 +1,24 @@
+import pytest
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+
+from core.utils.pagination import KeysetPagination
+
+
+def test_cursor_round_trip():
+    """カーソルの変換で作成日時（マイクロ秒・タイムゾーンを含む）と id が保持されることを確認"""
+    pagination = KeysetPagination()
+    created_at = timezone.now()
+    assert pagination.decode_cursor(pagination.encode_cursor(created_at, 42)) == (created_at, 42)
+
+
+def test_empty_cursor():
+    """空のカーソルは先頭ページ"""
+    assert KeysetPagination().decode_cursor("") is None
+
+
+@pytest.mark.parametrize("cursor", ["invalid", "bm90LWEtZGF0ZXwx", "MjAyNC0wMS0wMVQwMDowMDowMHxh"])
+def test_invalid_cursor(cursor):
+    """不正なカーソルは 404"""
+    with pytest.raises(NotFound):
+        KeysetPagination().decode_cursor(cursor)
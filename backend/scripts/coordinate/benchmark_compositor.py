@@ -0,0 +1,69 @@
+"""
+アイテム画像の合成処理のベンチマーク
+PIL（Image.alpha_composite）と NumPy（アルファ乗算済みの配列への合成）の処理時間と、
+背景色に重ねた結果の画素値の差を表示する
+
+使い方（backend ディレクトリで実行）:
+    python scripts/coordinate/benchmark_compositor.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from apps.coordinate.compositor import COMPOSITORS  # noqa: E402
+from apps.coordinate.constants import REFERENCE_HEIGHT, REFERENCE_WIDTH  # noqa: E402
+
+CANVAS_SIZE = (REFERENCE_WIDTH, REFERENCE_HEIGHT)
+ITEM_COUNTS = [2, 5, 10]
+REPEAT = 100
+
+
+def make_placements(count, seed=0):
+    """サムネイル相当の大きさのアイテム画像と貼り付け位置（キャンバスからはみ出すものを含む）"""
+    rng = np.random.default_rng(seed)
+    placements = []
+    for _ in range(count):
+        scale = rng.uniform(0.5, 2.0)
+        width, height = int(160 * scale), int(200 * scale)
+        image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+        color = tuple(int(v) for v in rng.integers(0, 255, 3)) + (255,)
+        ImageDraw.Draw(image).ellipse((5, 5, width - 5, height - 5), fill=color)
+        image = image.rotate(int(rng.integers(-45, 45)), expand=True, resample=Image.Resampling.BICUBIC)
+        x = int(rng.integers(-image.width // 2, REFERENCE_WIDTH - image.width // 2))
+        y = int(rng.integers(-image.height // 2, REFERENCE_HEIGHT - image.height // 2))
+        placements.append((image, x, y))
+    return placements
+
+
+def flatten(layer):
+    """背景色に重ねたRGB画像の配列"""
+    background = Image.new("RGBA", layer.size, "#e0f2fe")
+    return np.asarray(Image.alpha_composite(background, layer).convert("RGB"), dtype=np.int16)
+
+
+def measure(func, *args):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        func(*args)
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def main():
+    names = list(COMPOSITORS)
+    print(f"{'items':>5} | " + " | ".join(f"{name:>8} ms" for name in names) + " | max diff")
+    for count in ITEM_COUNTS:
+        placements = make_placements(count)
+        layers = [COMPOSITORS[name](CANVAS_SIZE, placements) for name in names]
+        timings = [measure(COMPOSITORS[name], CANVAS_SIZE, placements) for name in names]
+        max_diff = max(np.abs(flatten(layer) - flatten(layers[0])).max() for layer in layers)
+        print(f"{count:>5} | " + " | ".join(f"{ms:>11.3f}" for ms in timings) + f" | {max_diff:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+アイテム画像のスケーリング・回転のベンチマーク
+リサイズ + 回転で2回再サンプリングする従来の処理と、1回のアフィン変換にまとめた処理を比較し、
+解析的に描画した正解画像との誤差と処理時間を表示する
+
+使い方（backend ディレクトリで実行）:
+    python scripts/coordinate/benchmark_item_transform.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from apps.coordinate.rendering import rotation_affine, transform_item_image  # noqa: E402
+
+THUMBNAIL_SIZE = (160, 200)
+SUPERSAMPLING = 8
+CASES = [(1.0, 15), (1.0, 45), (1.5, 30), (2.0, 10), (0.7, -20), (0.4, 90), (0.3, 33)]
+REPEAT = 200
+
+
+def shape(x, y):
+    """元画像の座標での被写体（楕円と矩形）の色と不透明度（RGBa, 0〜1）"""
+    width, height = THUMBNAIL_SIZE
+    ellipse = ((x - width / 2) / (width * 0.45)) ** 2 + ((y - height / 2) / (height * 0.45)) ** 2 <= 1
+    rect = (np.abs(x - width * 0.45) < width * 0.15) & (np.abs(y - height * 0.4) < height * 0.2)
+    rgba = np.zeros(x.shape + (4,))
+    rgba[ellipse] = (0.8, 0.1, 0.1, 1.0)
+    rgba[rect] = (0.1, 0.5, 0.8, 1.0)
+    return rgba
+
+
+def render(size, to_source):
+    """出力画像の各画素を超解像度でサンプリングして描画（アルファ乗算済み）"""
+    width, height = size
+    offsets = (np.arange(SUPERSAMPLING) + 0.5) / SUPERSAMPLING
+    xs = (np.arange(width)[:, None] + offsets[None, :]).ravel()
+    ys = (np.arange(height)[:, None] + offsets[None, :]).ravel()
+    grid_x, grid_y = np.meshgrid(xs, ys)
+    source_x, source_y = to_source(grid_x, grid_y)
+    samples = shape(source_x, source_y)
+    return samples.reshape(height, SUPERSAMPLING, width, SUPERSAMPLING, 4).mean(axis=(1, 3)) * 255
+
+
+def to_pil(premultiplied):
+    return Image.fromarray(np.round(premultiplied).astype(np.uint8), "RGBa").convert("RGBA")
+
+
+def legacy_transform(item_image, scale, rotate):
+    """従来の処理（LANCZOS でリサイズしてから BICUBIC で回転）"""
+    width, height = item_image.size
+    if scale != 1:
+        item_image = item_image.resize((int(width * scale), int(height * scale)), Image.Resampling.LANCZOS)
+    if rotate:
+        item_image = item_image.rotate(-rotate, expand=True, resample=Image.Resampling.BICUBIC)
+    return item_image
+
+
+def error(image, expected):
+    """アルファ乗算済みの画素値の平均絶対誤差"""
+    actual = np.asarray(image.convert("RGBa"), dtype=np.float64)
+    return np.abs(actual - expected).mean()
+
+
+def measure(func, *args):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        func(*args)
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def main():
+    thumbnail = to_pil(render(THUMBNAIL_SIZE, lambda x, y: (x, y)))
+    print(f"{'scale':>5} {'rotate':>6} | {'legacy err':>10} {'ms':>6} | {'affine err':>10} {'ms':>6}")
+    for scale, rotate in CASES:
+        scaled_size = (int(THUMBNAIL_SIZE[0] * scale), int(THUMBNAIL_SIZE[1] * scale))
+        output_size, matrix = rotation_affine(THUMBNAIL_SIZE, scaled_size, rotate)
+        a, b, c, d, e, f = matrix
+        expected = render(output_size, lambda x, y: (a * x + b * y + c, d * x + e * y + f))  # noqa: B023
+
+        legacy = legacy_transform(thumbnail, scale, rotate)
+        affine = transform_item_image(thumbnail, scale, rotate)
+        print(
+            f"{scale:>5} {rotate:>6} | {error(legacy, expected):>10.3f} {measure(legacy_transform, thumbnail, scale, rotate):>6.3f} | "
+            f"{error(affine, expected):>10.3f} {measure(transform_item_image, thumbnail, scale, rotate):>6.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
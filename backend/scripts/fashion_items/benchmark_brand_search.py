@@ -0,0 +1,101 @@
+"""
+ブランド検索のベンチマーク（PostgreSQL が必要）
+ブランドを 100,000 件に増やした状態で、従来の icontains による検索と pg_trgm のインデックスを使用した検索の
+処理時間・実行計画を比較する（追加したブランドは最後にロールバックする）
+
+使い方（backend ディレクトリで実行。マイグレーション適用済みのDBを使用）:
+    python scripts/fashion_items/benchmark_brand_search.py
+"""
+
+import os
+import random
+import sys
+import time
+
+import django
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django.setup()
+
+from django.db import connection, transaction  # noqa: E402
+from django.db.models import Q  # noqa: E402
+
+from apps.fashion_items.brand_search import search_brands_trigram  # noqa: E402
+from apps.fashion_items.models import Brand  # noqa: E402
+
+TOTAL_BRANDS = 100_000
+QUERIES = ["uni", "ユニ", "ゆにくろ", "beams", "ー", "zz"]
+LIMIT = 20
+REPEAT = 20
+
+SYLLABLES = [
+    ("ka", "カ"),
+    ("mi", "ミ"),
+    ("ro", "ロ"),
+    ("su", "ス"),
+    ("na", "ナ"),
+    ("to", "ト"),
+    ("re", "レ"),
+    ("ni", "ニ"),
+]
+
+
+def make_brands(count, seed=0):
+    """ランダムな音節を並べた架空のブランド"""
+    rng = random.Random(seed)
+    brands = []
+    for index in range(count):
+        syllables = [rng.choice(SYLLABLES) for _ in range(rng.randint(2, 6))]
+        name = "".join(latin for latin, _ in syllables).capitalize()
+        kana = "ー".join(kana for _, kana in syllables)
+        brands.append(Brand(brand_name=f"{name} {index}", brand_name_kana=kana, is_popular=index % 500 == 0))
+    return brands
+
+
+def legacy_search(query, limit=LIMIT):
+    """従来の検索（icontains）"""
+    return list(
+        Brand.objects.filter(Q(brand_name__icontains=query) | Q(brand_name_kana__icontains=query)).values(
+            "id", "brand_name", "brand_name_kana", "is_popular"
+        )[:limit]
+    )
+
+
+def measure(func, query):
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        func(query, LIMIT)
+    return (time.perf_counter() - start) / REPEAT * 1000
+
+
+def uses_trigram_index(query):
+    """pg_trgm のインデックスが実行計画に含まれるか"""
+    plan = Brand.objects.filter(Q(brand_name__icontains=query) | Q(brand_name_kana__icontains=query)).explain()
+    return "trgm_idx" in plan
+
+
+def main():
+    if connection.vendor != "postgresql":
+        sys.exit("PostgreSQL のデータベースで実行してください")
+
+    with transaction.atomic():
+        existing = Brand.objects.count()
+        Brand.objects.bulk_create(make_brands(max(TOTAL_BRANDS - existing, 0)), batch_size=5000)
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Brand._meta.db_table}")
+
+        print(f"brands: {Brand.objects.count()}")
+        print(f"{'query':<10} | {'icontains ms':>12} | {'trigram ms':>10} | {'index':>5} | {'hits':>4}")
+        for query in QUERIES:
+            print(
+                f"{query:<10} | {measure(legacy_search, query):>12.2f} | {measure(search_brands_trigram, query):>10.2f} | "
+                f"{'yes' if uses_trigram_index(query) else 'no':>5} | {len(search_brands_trigram(query, LIMIT)):>4}"
+            )
+
+        # 追加したブランドを残さない
+        transaction.set_rollback(True)
+
+
+if __name__ == "__main__":
+    main()
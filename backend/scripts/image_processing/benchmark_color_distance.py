@@ -0,0 +1,80 @@
+"""
+color_distance_removal のベンチマーク
+float64 で計算していた従来の実装と比較し、処理時間とピークメモリを表示する
+
+使い方（backend ディレクトリで実行）:
+    python scripts/image_processing/benchmark_color_distance.py
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from apps.image_processing.pipeline import color_distance_removal  # noqa: E402
+
+SIZES = [(650, 520), (1300, 1040), (2600, 2080)]
+REPEAT = 20
+
+
+def color_distance_removal_float64(img):
+    """従来の実装（比較用）"""
+    edges = np.concatenate(
+        [
+            img[0:1].reshape(-1, 3),
+            img[-1:].reshape(-1, 3),
+            img[:, 0:1].reshape(-1, 3),
+            img[:, -1:].reshape(-1, 3),
+        ]
+    )
+    background_color = np.median(edges, axis=0)
+    diff = np.sqrt(np.sum((img - background_color) ** 2, axis=2))
+    threshold = np.mean(diff) + np.std(diff)
+    return (diff > threshold).astype(np.uint8) * 255
+
+
+def make_image(width, height):
+    """明るい背景にノイズのある被写体を配置した画像"""
+    rng = np.random.default_rng(0)
+    img = np.full((height, width, 3), 235, np.uint8)
+    cv2.ellipse(img, (width // 2, height // 2), (width // 4, height // 3), 0, 0, 360, (60, 40, 150), -1)
+    noise = rng.integers(-10, 10, img.shape, dtype=np.int16)
+    return np.clip(img.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+def measure(func, img):
+    """平均処理時間（ミリ秒）とピークメモリ（MB）を計測"""
+    func(img)
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        func(img)
+    elapsed = (time.perf_counter() - start) / REPEAT * 1000
+
+    tracemalloc.start()
+    func(img)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+
+def main():
+    cv2.setNumThreads(1)
+    print(f"{'size':>11} | {'float64 ms':>10} {'MB':>7} | {'float32 ms':>10} {'MB':>7} | {'agreement':>9}")
+    for width, height in SIZES:
+        img = make_image(width, height)
+        old_time, old_peak = measure(color_distance_removal_float64, img)
+        new_time, new_peak = measure(color_distance_removal, img)
+        agreement = np.mean(color_distance_removal_float64(img) == color_distance_removal(img))
+        print(
+            f"{width:>5}x{height:<5} | {old_time:>10.2f} {old_peak:>7.1f} | "
+            f"{new_time:>10.2f} {new_peak:>7.1f} | {agreement:>9.5f}"
+        )
+
+
+if __name__ == "__main__":
+    main()